@@ -0,0 +1,49 @@
+"""Conditional GET support for cached read endpoints."""
+
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response, status
+
+from app.core.services.response_cache import ResponseCache
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match porównuje słabo, więc prefiks W/ nie przeszkadza
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_json_response(
+    request: Request,
+    cache: ResponseCache,
+    user_id: int,
+    build: Callable[[], Tuple[bytes, Dict[str, str]]]
+) -> Response:
+    """Serve a user's JSON listing from the response cache.
+
+    ``build`` loads and serializes the data and returns (body, extra
+    headers); it runs only when the cache has no body for the user's
+    current data version. A matching If-None-Match gets 304 without
+    touching the cache or the database.
+    """
+    key = f"{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+    version = cache.version(user_id)
+    headers = {
+        "ETag": cache.etag(user_id, key, version),
+        "Cache-Control": "private, no-cache"
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cached = cache.get(user_id, key, version)
+    if cached is None:
+        body, extra_headers = build()
+        cache.put(user_id, key, version, body, extra_headers)
+    else:
+        body, extra_headers = cached
+    return Response(content=body, media_type="application/json", headers={**headers, **extra_headers})
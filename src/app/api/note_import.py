@@ -0,0 +1,131 @@
+"""Streaming NDJSON note import."""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send
+
+from app.api.schemas.note import NoteCreate
+
+IMPORT_BATCH_SIZE = 500
+# Parsed batches waiting for the embedding stage; when full, the request body is not read further
+IMPORT_QUEUE_BATCHES = 2
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+
+ImportBatch = Callable[[List[dict]], Tuple[List[Any], List[dict]]]
+FinishImport = Callable[[], Optional[Any]]
+
+
+class FullDuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves ``receive`` to the request body reader.
+
+    On ASGI servers older than spec 2.4, StreamingResponse listens for
+    disconnects by calling ``receive`` itself and discards the body
+    messages it gets. A response that streams while the body is still
+    arriving must not do that; disconnects surface in ``request.stream()``
+    as ClientDisconnect instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _read_lines(request: Request) -> AsyncIterator[bytes]:
+    """Split the request body into lines without buffering the whole body."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            raise ValueError(f"Line longer than {MAX_IMPORT_LINE_BYTES} bytes")
+    if buffer:
+        yield buffer
+
+
+def stream_note_import(request: Request, import_batch: ImportBatch, finish_import: FinishImport) -> StreamingResponse:
+    """Parse NoteCreate lines from the request and import them in batches.
+
+    ``import_batch`` receives note dicts and returns (created notes,
+    failures indexed within the batch); ``finish_import`` runs once after
+    the last batch and may return a job. Both are blocking and run in the
+    threadpool. See POST /notes/import for the progress lines produced.
+    """
+    batches: asyncio.Queue = asyncio.Queue(maxsize=IMPORT_QUEUE_BATCHES)
+
+    async def parse_body():
+        # Kończy się zawsze wstawieniem None (lub wyjątku), żeby konsument nie czekał w nieskończoność
+        line_indexes, notes_data, parse_failures, received = [], [], [], 0
+        try:
+            async for line in _read_lines(request):
+                if not line.strip():
+                    continue
+                try:
+                    note = NoteCreate.model_validate_json(line)
+                    line_indexes.append(received)
+                    notes_data.append({"title": note.title, "content": note.content, "group_id": note.group_id})
+                except ValidationError as e:
+                    parse_failures.append({"index": received, "title": None, "error": str(e)})
+                received += 1
+                # Liczą się też odrzucone linie - inaczej błędy walidacji rosłyby bez limitu
+                if len(notes_data) + len(parse_failures) >= IMPORT_BATCH_SIZE:
+                    await batches.put((line_indexes, notes_data, parse_failures, received))
+                    line_indexes, notes_data, parse_failures = [], [], []
+            await batches.put((line_indexes, notes_data, parse_failures, received))
+            await batches.put(None)
+        except Exception as e:
+            await batches.put(e)
+
+    async def run_import() -> AsyncIterator[str]:
+        parser = asyncio.create_task(parse_body())
+        received = created = failed = batch_number = 0
+        error: Optional[Exception] = None
+        try:
+            while True:
+                item = await batches.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    error = item
+                    break
+                line_indexes, notes_data, parse_failures, received = item
+                created_notes, failed_notes = [], []
+                if notes_data:
+                    created_notes, failed_notes = await run_in_threadpool(import_batch, notes_data)
+                # Indeksy z serwisu są względne wobec partii - mapujemy na numer linii
+                failed_notes = parse_failures + [
+                    {**failure, "index": line_indexes[failure["index"]]} for failure in failed_notes
+                ]
+                created += len(created_notes)
+                failed += len(failed_notes)
+                batch_number += 1
+                yield json.dumps({
+                    "batch": batch_number,
+                    "received": received,
+                    "created_ids": [note.id for note in created_notes],
+                    "failed": failed_notes
+                }) + "\n"
+        finally:
+            parser.cancel()
+
+        recluster_job = await run_in_threadpool(finish_import) if created else None
+        if error is not None:
+            yield json.dumps({"done": False, "error": str(error), "received": received, "created": created}) + "\n"
+            return
+        yield json.dumps({
+            "done": True,
+            "received": received,
+            "created": created,
+            "failed": failed,
+            "recluster_job_id": recluster_job.id if recluster_job else None
+        }) + "\n"
+
+    return FullDuplexStreamingResponse(run_import(), media_type="application/x-ndjson")
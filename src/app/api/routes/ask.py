@@ -1,14 +1,20 @@
 """Ask routes."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from typing import Annotated
-from app.api.schemas.answer import AskRequest, AskResponse, AnswerResponse
+from app.api.schemas.answer import AskRequest, AskResponse, AnswerResponse, AnswerListItem
 from app.api.schemas.note import NoteResponse
-from typing import List
+from typing import List, Optional
 from app.core.services.answer_service import AnswerService
+from app.core.services.pagination import parse_fields
+from app.core.services.response_cache import ResponseCache
+from app.api.caching import cached_json_response
 from app.core.services.note_service import NoteService
 from app.core.domain.database import UserDB
-from app.dependencies import get_current_user, get_answer_service, get_note_service
+from app.dependencies import get_current_user, get_answer_service, get_note_service, get_response_cache
 
 router = APIRouter(prefix="/ask", tags=["ask"])
 
@@ -44,6 +50,45 @@ async def ask(
     )
 
 
+@router.post("/stream")
+async def ask_stream(
+    ask_request: AskRequest,
+    current_user: Annotated[UserDB, Depends(get_current_user)],
+    answer_service: Annotated[AnswerService, Depends(get_answer_service)]
+):
+    """Ask a question and stream the answer as Server-Sent Events.
+    
+    Events, each with a JSON `data` payload:
+    - `sources`: retrieved chunks, sent before generation starts
+    - `title`: the answer title
+    - `token`: the next piece of answer text, with final citation numbers
+    - `done`: `answer_id`, `title`, `answer_text` and `references` of the saved answer
+    - `error`: generation failed and nothing was saved
+    """
+    if not ask_request.query or not ask_request.query.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query cannot be empty"
+        )
+    
+    events = answer_service.stream_answer(
+        query=ask_request.query.strip(),
+        user_id=current_user.id,
+        k=ask_request.k or 10
+    )
+    
+    # Synchroniczny generator - StreamingResponse iteruje go w threadpoolu
+    def format_events():
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        format_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/answer/{answer_id}", response_model=AnswerResponse)
 async def get_answer(
     answer_id: int,
@@ -71,27 +116,45 @@ async def get_answer(
     )
 
 
-@router.get("/answers", response_model=List[AnswerResponse])
+MAX_PAGE_SIZE = 1000
+_answer_list_adapter = TypeAdapter(List[AnswerListItem])
+
+
+@router.get("/answers", response_model=List[AnswerListItem], response_model_exclude_unset=True)
 async def get_user_answers(
+    request: Request,
     current_user: Annotated[UserDB, Depends(get_current_user)],
-    answer_service: Annotated[AnswerService, Depends(get_answer_service)]
+    answer_service: Annotated[AnswerService, Depends(get_answer_service)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)],
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to list all answers")] = None,
+    cursor: Annotated[Optional[str], Query(description="X-Next-Cursor value from the previous page")] = None,
+    fields: Annotated[Optional[str], Query(description="Comma-separated fields to return besides id and created_at")] = None
 ):
-    """Get all answers for the current user."""
-    answers = answer_service.get_answers_by_user(current_user.id)
-    
-    return [
-        AnswerResponse(
-            id=answer.id,
-            user_id=answer.user_id,
-            question=answer.question,
-            answer_text=answer.answer_text,
-            title=answer.title,
-            references=answer.references,
-            created_at=answer.created_at,
-            updated_at=answer.updated_at
-        )
-        for answer in answers
-    ]
+    """Get the current user's answers, newest first.
+    
+    Paginated like GET /notes: pass `limit`, then follow the `X-Next-Cursor`
+    header. `fields` (e.g. `title,question`) skips loading answer texts and
+    references. Cached with ETags like GET /notes.
+    """
+    try:
+        field_names = parse_fields(fields, AnswerService.LIST_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    def build():
+        try:
+            answers, next_cursor = answer_service.get_answers_page(current_user.id, limit, cursor, field_names)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        returned_fields = ["id", "created_at", *(field_names if field_names is not None else AnswerService.LIST_FIELDS)]
+        items = [
+            AnswerListItem(**{name: getattr(answer, name) for name in returned_fields})
+            for answer in answers
+        ]
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return _answer_list_adapter.dump_json(items, exclude_unset=True), headers
+    
+    return cached_json_response(request, response_cache, current_user.id, build)
 
 
 @router.delete("/answer/{answer_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,35 +1,38 @@
 """Group routes."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Annotated, List
-from app.api.schemas.group import GroupResponse, GroupUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
+from typing import Annotated, List, Union
+from app.api.caching import cached_json_response
+from app.api.schemas.group import GroupResponse, GroupSummaryResponse, GroupUpdate
 from app.api.schemas.note import NoteResponse
-from app.core.domain.database import UserDB
+from app.core.domain.database import UserDB, GroupDB
 from app.core.domain.database import INoteRepository
 from app.core.services.note_service import NoteService
-from app.dependencies import get_repository, get_current_user, get_note_service
+from app.core.services.response_cache import ResponseCache
+from app.dependencies import get_repository, get_current_user, get_note_service, get_response_cache
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
+_group_list_adapter = TypeAdapter(List[GroupResponse])
+_group_summary_list_adapter = TypeAdapter(List[GroupSummaryResponse])
 
-def _group_db_to_response(group_db, repository: INoteRepository) -> GroupResponse:
+
+def _group_db_to_response(group_db: GroupDB) -> GroupResponse:
     """Convert GroupDB to GroupResponse."""
-    notes = []
-    for note in group_db.notes:
-        # Fetch full note details to get created_at and updated_at
-        full_note = repository.get_note(note.id)
-        if full_note:
-            notes.append(
-                NoteResponse(
-                    id=full_note.id,
-                    title=full_note.title,
-                    content=full_note.content,
-                    user_id=full_note.user_id,
-                    group_id=full_note.group_id,
-                    created_at=full_note.created_at,
-                    updated_at=full_note.updated_at
-                )
-            )
+    # The repository loads the notes with their timestamps, so no per-note lookup is needed
+    notes = [
+        NoteResponse(
+            id=note.id,
+            title=note.title,
+            content=note.content,
+            user_id=note.user_id,
+            group_id=note.group_id,
+            created_at=note.created_at,
+            updated_at=note.updated_at
+        )
+        for note in group_db.notes
+    ]
     return GroupResponse(
         id=group_db.id,
         user_id=group_db.user_id,
@@ -38,14 +41,31 @@ def _group_db_to_response(group_db, repository: INoteRepository) -> GroupRespons
     )
 
 
-@router.get("", response_model=List[GroupResponse])
+@router.get("", response_model=Union[List[GroupResponse], List[GroupSummaryResponse]])
 async def list_groups(
+    request: Request,
     current_user: Annotated[UserDB, Depends(get_current_user)],
-    repository: Annotated[INoteRepository, Depends(get_repository)]
+    repository: Annotated[INoteRepository, Depends(get_repository)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)],
+    summary_only: Annotated[bool, Query(description="Return only group IDs, labels and note counts")] = False
 ):
-    """List all groups for the current user."""
-    groups = repository.get_groups_by_user(current_user.id)
-    return [_group_db_to_response(group, repository) for group in groups]
+    """List all groups for the current user.
+    
+    With summary_only=true the notes are not loaded; each group comes with
+    its note count from a single aggregate query. Cached with ETags like
+    GET /notes.
+    """
+    def build():
+        if summary_only:
+            summaries = [
+                GroupSummaryResponse(id=group.id, summary=group.summary, note_count=group.note_count)
+                for group in repository.get_group_summaries(current_user.id)
+            ]
+            return _group_summary_list_adapter.dump_json(summaries), {}
+        groups = repository.get_groups_by_user(current_user.id)
+        return _group_list_adapter.dump_json([_group_db_to_response(group) for group in groups]), {}
+    
+    return cached_json_response(request, response_cache, current_user.id, build)
 
 
 @router.get("/{group_id}", response_model=GroupResponse)
@@ -66,7 +86,7 @@ async def get_group(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
-    return _group_db_to_response(group, repository)
+    return _group_db_to_response(group)
 
 
 @router.put("/{group_id}", response_model=GroupResponse)
@@ -74,7 +94,8 @@ async def update_group(
     group_id: int,
     group_data: GroupUpdate,
     current_user: Annotated[UserDB, Depends(get_current_user)],
-    repository: Annotated[INoteRepository, Depends(get_repository)]
+    repository: Annotated[INoteRepository, Depends(get_repository)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)]
 ):
     """Update a group."""
     group = repository.get_group(group_id)
@@ -99,6 +120,7 @@ async def update_group(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update group"
         )
+    response_cache.bump(current_user.id)
     
     updated_group = repository.get_group(updated_id)
     if updated_group is None:
@@ -107,14 +129,15 @@ async def update_group(
             detail="Failed to retrieve updated group"
         )
     
-    return _group_db_to_response(updated_group, repository)
+    return _group_db_to_response(updated_group)
 
 
 @router.delete("/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_group(
     group_id: int,
     current_user: Annotated[UserDB, Depends(get_current_user)],
-    repository: Annotated[INoteRepository, Depends(get_repository)]
+    repository: Annotated[INoteRepository, Depends(get_repository)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)]
 ):
     """Delete a group."""
     group = repository.get_group(group_id)
@@ -135,6 +158,7 @@ async def delete_group(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete group"
         )
+    response_cache.bump(current_user.id)
     return None
 
 
@@ -143,7 +167,15 @@ async def clusterize_notes(
     current_user: Annotated[UserDB, Depends(get_current_user)],
     note_service: Annotated[NoteService, Depends(get_note_service)]
 ):
-    """Manually trigger clustering of notes into groups."""
+    """Manually trigger clustering of notes into groups.
+    
+    With background jobs enabled, repeated triggers within the quiet window
+    are coalesced into one job; poll /jobs/{job_id} for the outcome.
+    """
+    job = note_service.schedule_recalculate_groups(current_user.id)
+    if job is not None:
+        return {"message": "Clustering has been scheduled", "job_id": job.id}
+    
     success = note_service.recalculate_groups(current_user.id)
     if not success:
         raise HTTPException(
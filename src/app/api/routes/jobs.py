@@ -0,0 +1,26 @@
+"""Background job routes."""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated
+from app.api.schemas.job import JobResponse
+from app.core.services.note_service import NoteService
+from app.core.domain.database import UserDB
+from app.dependencies import get_note_service, get_current_user
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    current_user: Annotated[UserDB, Depends(get_current_user)],
+    note_service: Annotated[NoteService, Depends(get_note_service)]
+):
+    """Get the status of a background job (vectorstore sync or re-clustering)."""
+    job = note_service.get_job(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return JobResponse.model_validate(job)
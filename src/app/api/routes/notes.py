@@ -1,11 +1,18 @@
 """Note routes."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Annotated, List
-from app.api.schemas.note import NoteCreate, NoteResponse, NoteUpdate, BulkNoteCreate, BulkNoteResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
+from typing import Annotated, List, Optional, Union
+from app.api.schemas.note import (
+    NoteCreate, NoteResponse, NoteUpdate, NoteListItem, BulkNoteCreate, BulkNoteResponse, BulkNoteIdsResponse
+)
+from app.api.caching import cached_json_response
+from app.api.note_import import stream_note_import
 from app.core.services.note_service import NoteService
+from app.core.services.pagination import parse_fields
+from app.core.services.response_cache import ResponseCache
 from app.core.domain.database import UserDB
-from app.dependencies import get_note_service, get_current_user
+from app.dependencies import get_note_service, get_current_user, get_response_cache
 
 router = APIRouter(prefix="/notes", tags=["notes"])
 
@@ -16,7 +23,11 @@ async def create_note(
     current_user: Annotated[UserDB, Depends(get_current_user)],
     note_service: Annotated[NoteService, Depends(get_note_service)]
 ):
-    """Create a new note."""
+    """Create a new note.
+    
+    When background jobs are enabled, the note is synced to the vectorstore
+    asynchronously; poll /jobs/{sync_job_id} to see when it is searchable.
+    """
     note_id = note_service.create_note(
         title=note_data.title,
         content=note_data.content,
@@ -29,6 +40,7 @@ async def create_note(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create note"
         )
+    sync_job = note_service.get_sync_job(note.id)
     return NoteResponse(
         id=note.id,
         title=note.title,
@@ -36,18 +48,29 @@ async def create_note(
         user_id=note.user_id,
         group_id=note.group_id,
         references=note.references,
+        sync_job_id=sync_job.id if sync_job else None,
         created_at=note.created_at,
         updated_at=note.updated_at
     )
 
 
-@router.post("/bulk", response_model=BulkNoteResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/bulk",
+    response_model=Union[BulkNoteResponse, BulkNoteIdsResponse],
+    status_code=status.HTTP_201_CREATED
+)
 async def bulk_create_notes(
     bulk_data: BulkNoteCreate,
     current_user: Annotated[UserDB, Depends(get_current_user)],
-    note_service: Annotated[NoteService, Depends(get_note_service)]
+    note_service: Annotated[NoteService, Depends(get_note_service)],
+    ids_only: Annotated[bool, Query(description="Return only the created note IDs")] = False
 ):
-    """Create multiple notes in a single request."""
+    """Create multiple notes in a single request.
+    
+    All notes are inserted in one transaction; rows that fail are reported
+    in `failed` with their index. Use ids_only=true to skip echoing the
+    notes back for large imports.
+    """
     # Convert NoteCreate objects to dicts for the service method
     notes_data = [
         {
@@ -58,38 +81,19 @@ async def bulk_create_notes(
         for note in bulk_data.notes
     ]
     
-    created_ids, failed_notes = note_service.bulk_create_notes(notes_data, current_user.id)
+    created_notes, failed_notes, jobs = note_service.bulk_create_notes(notes_data, current_user.id)
+    jobs_by_kind = {job.kind: job.id for job in jobs}
     
-    # Fetch created notes to return in response
-    created_note_responses = []
-    for note_id in created_ids:
-        note = note_service.get_note(note_id, current_user.id)
-        if note:
-            created_note_responses.append(NoteResponse(
-                id=note.id,
-                title=note.title,
-                content=note.content,
-                user_id=note.user_id,
-                group_id=note.group_id,
-                references=note.references,
-                created_at=note.created_at,
-                updated_at=note.updated_at
-            ))
+    if ids_only:
+        return BulkNoteIdsResponse(
+            created_ids=[note.id for note in created_notes],
+            failed=failed_notes,
+            sync_job_id=jobs_by_kind.get(NoteService.SYNC_NOTES_JOB),
+            recluster_job_id=jobs_by_kind.get(NoteService.RECLUSTER_JOB)
+        )
     
-    return BulkNoteResponse(
-        created=created_note_responses,
-        failed=failed_notes
-    )
-
-
-@router.get("", response_model=List[NoteResponse])
-async def list_notes(
-    current_user: Annotated[UserDB, Depends(get_current_user)],
-    note_service: Annotated[NoteService, Depends(get_note_service)]
-):
-    """List all notes for the current user."""
-    notes = note_service.get_notes_by_user(current_user.id)
-    return [
+    # The service returns the stored rows, so no per-note re-fetch is needed
+    created_note_responses = [
         NoteResponse(
             id=note.id,
             title=note.title,
@@ -100,8 +104,84 @@ async def list_notes(
             created_at=note.created_at,
             updated_at=note.updated_at
         )
-        for note in notes
+        for note in created_notes
     ]
+    
+    return BulkNoteResponse(
+        created=created_note_responses,
+        failed=failed_notes,
+        sync_job_id=jobs_by_kind.get(NoteService.SYNC_NOTES_JOB),
+        recluster_job_id=jobs_by_kind.get(NoteService.RECLUSTER_JOB)
+    )
+
+
+@router.post("/import", status_code=status.HTTP_200_OK)
+async def import_notes(
+    request: Request,
+    current_user: Annotated[UserDB, Depends(get_current_user)],
+    note_service: Annotated[NoteService, Depends(get_note_service)]
+):
+    """Import notes from a newline-delimited JSON stream.
+    
+    Each non-empty line is a NoteCreate object. Notes are inserted and
+    embedded in batches of IMPORT_BATCH_SIZE while the body is still
+    arriving, and one NDJSON progress line is streamed back per batch:
+    `{"batch", "received", "created_ids", "failed"}`. The last line is
+    `{"done": true, "received", "created", "failed", "recluster_job_id"}`,
+    or `{"done": false, "error"}` if the stream could not be read.
+    `index` in failures is the 0-based position among non-empty lines.
+    Groups are recalculated once, after the last batch.
+    """
+    return stream_note_import(
+        request,
+        lambda notes_data: note_service.import_notes_batch(notes_data, current_user.id),
+        lambda: note_service.finish_import(current_user.id)
+    )
+
+
+MAX_PAGE_SIZE = 1000
+_note_list_adapter = TypeAdapter(List[NoteListItem])
+
+
+@router.get("", response_model=List[NoteListItem], response_model_exclude_unset=True)
+async def list_notes(
+    request: Request,
+    current_user: Annotated[UserDB, Depends(get_current_user)],
+    note_service: Annotated[NoteService, Depends(get_note_service)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)],
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to list all notes")] = None,
+    cursor: Annotated[Optional[str], Query(description="X-Next-Cursor value from the previous page")] = None,
+    fields: Annotated[Optional[str], Query(description="Comma-separated fields to return besides id, e.g. title,group_id")] = None
+):
+    """List the current user's notes in ID order.
+    
+    With `limit`, the response is one page and the `X-Next-Cursor` header
+    carries the cursor for the next one (absent on the last page). `fields`
+    limits which columns are read and returned, so listing titles does not
+    load note contents.
+    
+    Responses carry an ETag; a repeated request with a matching
+    If-None-Match gets 304 until the user's data changes.
+    """
+    try:
+        field_names = parse_fields(fields, NoteService.LIST_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    def build():
+        try:
+            notes, next_cursor = note_service.get_notes_page(current_user.id, limit, cursor, field_names)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        returned_fields = ["id", *(field_names if field_names is not None else NoteService.LIST_FIELDS)]
+        items = [
+            NoteListItem(**{name: getattr(note, name) for name in returned_fields})
+            for note in notes
+        ]
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return _note_list_adapter.dump_json(items, exclude_unset=True), headers
+    
+    return cached_json_response(request, response_cache, current_user.id, build)
 
 
 @router.get("/{note_id}", response_model=NoteResponse)
@@ -155,6 +235,7 @@ async def update_note(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve updated note"
         )
+    sync_job = note_service.get_sync_job(note.id)
     return NoteResponse(
         id=note.id,
         title=note.title,
@@ -162,6 +243,7 @@ async def update_note(
         user_id=note.user_id,
         group_id=note.group_id,
         references=note.references,
+        sync_job_id=sync_job.id if sync_job else None,
         created_at=note.created_at,
         updated_at=note.updated_at
     )
@@ -1,8 +1,10 @@
 """Query routes."""
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Annotated
-from app.api.schemas.note import QueryRequest, QueryResponse, QueryResult, NoteResponse
+from app.api.schemas.note import (
+    QueryRequest, QueryResponse, QueryResult, NoteResponse, QueryBatchRequest, QueryBatchResponse
+)
 from app.core.services.note_service import NoteService
 from app.core.domain.database import UserDB
 from app.dependencies import get_note_service, get_current_user
@@ -29,6 +31,41 @@ async def query(
         threshold=query_request.threshold
     )
     
+    return _to_query_response(results)
+
+
+MAX_BATCH_QUERIES = 64
+
+
+@router.post("/batch", response_model=QueryBatchResponse)
+async def query_batch(
+    batch_request: QueryBatchRequest,
+    current_user: Annotated[UserDB, Depends(get_current_user)],
+    note_service: Annotated[NoteService, Depends(get_note_service)]
+):
+    """Query for relevant notes for several queries at once.
+    
+    All queries are embedded in one batch and searched together, which is
+    much cheaper than issuing the same number of /query calls. Results are
+    returned in request order.
+    """
+    if len(batch_request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_QUERIES} queries per batch"
+        )
+    
+    results_per_query = note_service.query_relevant_notes_many(
+        queries=batch_request.queries,
+        user_id=current_user.id,
+        k=batch_request.k,
+        threshold=batch_request.threshold
+    )
+    
+    return QueryBatchResponse(results=[_to_query_response(results) for results in results_per_query])
+
+
+def _to_query_response(results: list) -> QueryResponse:
     # Convert to response format
     query_results = []
     for result in results:
@@ -50,4 +87,3 @@ async def query(
         ))
     
     return QueryResponse(results=query_results)
-
@@ -1,12 +1,60 @@
 """Search routes."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Annotated, Literal
+from app.api.schemas.search import SearchResponse, SearchResult
+from app.api.schemas.note import NoteResponse
+from app.core.services.note_service import NoteService
+from app.core.domain.database import UserDB
+from app.dependencies import get_note_service, get_current_user
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 
-@router.get("")
-async def search():
-    """Search endpoint - to be implemented."""
-    return {"message": "Search endpoint - to be implemented"}
-
+@router.get("", response_model=SearchResponse)
+async def search(
+    current_user: Annotated[UserDB, Depends(get_current_user)],
+    note_service: Annotated[NoteService, Depends(get_note_service)],
+    q: Annotated[str, Query(description="Search query")],
+    k: Annotated[int, Query(ge=1, le=100)] = 10,
+    threshold: Annotated[float, Query(ge=0.0, le=1.0)] = 0.4,
+    mode: Literal["hybrid", "lexical", "semantic"] = "hybrid"
+):
+    """Search notes with BM25 and vector retrieval fused by reciprocal rank.
+    
+    Use mode=lexical for exact-term lookups (identifiers, names) that
+    should not pay for an embedding forward pass.
+    """
+    if not q.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query cannot be empty"
+        )
+    
+    results = note_service.search_notes(
+        query=q.strip(),
+        user_id=current_user.id,
+        k=k,
+        threshold=threshold,
+        mode=mode
+    )
+    
+    return SearchResponse(results=[
+        SearchResult(
+            note=NoteResponse(
+                id=result["note"].id,
+                title=result["note"].title,
+                content=result["note"].content,
+                user_id=result["note"].user_id,
+                group_id=result["note"].group_id,
+                references=result["note"].references,
+                created_at=result["note"].created_at,
+                updated_at=result["note"].updated_at
+            ),
+            chunk_text=result["chunk_text"],
+            score=result["score"],
+            lexical_rank=result["lexical_rank"],
+            semantic_rank=result["semantic_rank"]
+        )
+        for result in results
+    ])
@@ -26,6 +26,18 @@ class AskResponse(BaseModel):
     references: Dict[str, Dict[str, Any]]
 
 
+class AnswerListItem(BaseModel):
+    """Answer listing item; only the requested fields are present."""
+    id: int
+    user_id: Optional[int] = None
+    question: Optional[str] = None
+    answer_text: Optional[str] = None
+    title: Optional[str] = None
+    references: Optional[Dict[str, Dict[str, Any]]] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
 class AnswerResponse(BaseModel):
     """Full answer response schema."""
     id: int
@@ -16,6 +16,13 @@ class GroupResponse(BaseModel):
         from_attributes = True
 
 
+class GroupSummaryResponse(BaseModel):
+    """Group listing entry without notes."""
+    id: int
+    summary: Optional[str]
+    note_count: int
+
+
 class GroupUpdate(BaseModel):
     """Group update request schema."""
     summary: Optional[str] = None
@@ -1,20 +1,23 @@
 """Note schemas."""
 
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Annotated, Optional, List, Dict, Any
+from pydantic import BaseModel, Field, StringConstraints
+
+# Length of the notes.title column; longer titles are rejected on every write path
+MAX_TITLE_LENGTH = 100
 
 
 class NoteCreate(BaseModel):
     """Note creation request schema."""
-    title: str
+    title: str = Field(max_length=MAX_TITLE_LENGTH)
     content: str
     group_id: Optional[int] = None
 
 
 class NoteUpdate(BaseModel):
     """Note update request schema."""
-    title: Optional[str] = None
+    title: Optional[str] = Field(default=None, max_length=MAX_TITLE_LENGTH)
     content: Optional[str] = None
     group_id: Optional[int] = None
 
@@ -27,6 +30,7 @@ class NoteResponse(BaseModel):
     user_id: int
     group_id: Optional[int]
     references: Optional[Dict[str, Dict[str, Any]]] = None
+    sync_job_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
@@ -34,6 +38,18 @@ class NoteResponse(BaseModel):
         from_attributes = True
 
 
+class NoteListItem(BaseModel):
+    """Note listing item; only the requested fields are present."""
+    id: int
+    title: Optional[str] = None
+    content: Optional[str] = None
+    user_id: Optional[int] = None
+    group_id: Optional[int] = None
+    references: Optional[Dict[str, Dict[str, Any]]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class BulkNoteCreate(BaseModel):
     """Bulk note creation request schema."""
     notes: List[NoteCreate]
@@ -43,6 +59,16 @@ class BulkNoteResponse(BaseModel):
     """Bulk note creation response schema."""
     created: List[NoteResponse]
     failed: List[dict]
+    sync_job_id: Optional[int] = None
+    recluster_job_id: Optional[int] = None
+
+
+class BulkNoteIdsResponse(BaseModel):
+    """Slim bulk note creation response with only the created IDs."""
+    created_ids: List[int]
+    failed: List[dict]
+    sync_job_id: Optional[int] = None
+    recluster_job_id: Optional[int] = None
 
 
 class QueryRequest(BaseModel):
@@ -65,3 +91,15 @@ class QueryResponse(BaseModel):
     """Query response schema."""
     results: List[QueryResult]
 
+
+
+class QueryBatchRequest(BaseModel):
+    """Batch query request schema."""
+    queries: List[Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]]
+    k: int = Field(default=10, ge=1)
+    threshold: Optional[float] = 0.4
+
+
+class QueryBatchResponse(BaseModel):
+    """Batch query response schema, one entry per query in request order."""
+    results: List[QueryResponse]
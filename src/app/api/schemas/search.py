@@ -0,0 +1,19 @@
+"""Search schemas."""
+
+from typing import Optional, List
+from pydantic import BaseModel
+from app.api.schemas.note import NoteResponse
+
+
+class SearchResult(BaseModel):
+    """Search result schema with the best matching chunk."""
+    note: NoteResponse
+    chunk_text: str
+    score: float
+    lexical_rank: Optional[int] = None
+    semantic_rank: Optional[int] = None
+
+
+class SearchResponse(BaseModel):
+    """Search response schema."""
+    results: List[SearchResult]
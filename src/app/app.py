@@ -1,16 +1,37 @@
 """FastAPI application."""
 
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import auth, notes, groups, query, search, ask
+from app.api.routes import auth, notes, groups, query, search, ask, jobs
+from app.infrastructure.bootstrap import (
+    vector_store, embeddings, embedding_engine, search_index, job_queue, clusterizer
+)
+from app.dependencies import job_worker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open long-lived resources on startup and release them on shutdown."""
+    vector_store.warm_up()
+    job_worker.start()
+    yield
+    job_worker.stop()
+    job_queue.close()
+    clusterizer.close()
+    vector_store.close()
+    embeddings.close()
+    embedding_engine.close()
+    search_index.close()
 
 
 app = FastAPI(
     title="NotepadLM",
     description="Semantic note-taking system with LLM-based features",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -20,6 +41,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
@@ -29,6 +51,7 @@ app.include_router(groups.router)
 app.include_router(query.router)
 app.include_router(search.router)
 app.include_router(ask.router)
+app.include_router(jobs.router)
 
 
 @app.get("/")
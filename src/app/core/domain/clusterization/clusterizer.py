@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Dict, List, Optional
 
 from app.core.domain.clusterization.note import NoteCluster
 
@@ -14,4 +14,23 @@ class IClusterizer(ABC):
 
     @abstractmethod
     def reduce_topics(self, notes: List[NoteCluster], nr_topics: int):
-        pass
\ No newline at end of file
+        pass
+
+    def assign_notes(self, notes: List[NoteCluster]) -> Optional[List[NoteCluster]]:
+        """Put notes into the topics of their user's last fit without refitting.
+
+        Returns None when there is no fitted model to assign with, in which
+        case the caller has to run ``cluster_notes`` instead.
+        """
+        return None
+
+    def needs_refit(self, user_id: int) -> bool:
+        """Whether the user's topics are missing or too stale for online assignment."""
+        return True
+
+    def bind_topic_groups(self, user_id: int, topic_groups: Dict[int, int]):
+        """Remember which group each topic of the user's last fit became."""
+        pass
+
+    def get_topic_groups(self, user_id: int) -> Dict[int, int]:
+        return {}
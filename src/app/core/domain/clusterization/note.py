@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 @dataclass
 class NoteCluster:
     id: int
     user_id: int
     cluster_id: Optional[int]
-    content: str
\ No newline at end of file
+    content: str
+    # Precomputed document vector; clusterizers embed the content when it is missing
+    embedding: Optional[List[float]] = None
\ No newline at end of file
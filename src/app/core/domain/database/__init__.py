@@ -1,6 +1,6 @@
 from app.core.domain.database.user import UserDB
 from app.core.domain.database.note import NoteDB        
-from app.core.domain.database.group import GroupDB
+from app.core.domain.database.group import GroupDB, GroupSummaryDB
 from app.core.domain.database.answer import AnswerDB
 from app.core.domain.database.repository import INoteRepository
 
@@ -8,6 +8,7 @@ __all__ = [
     "UserDB",
     "NoteDB",
     "GroupDB",
+    "GroupSummaryDB",
     "AnswerDB",
     "INoteRepository",
 ]
@@ -8,4 +8,12 @@ class GroupDB:
     id: Optional[int]
     user_id: int
     summary: str = ""
-    notes: List[int] = field(default_factory=list)
\ No newline at end of file
+    notes: List[int] = field(default_factory=list)
+
+
+@dataclass
+class GroupSummaryDB:
+    id: int
+    user_id: int
+    summary: Optional[str]
+    note_count: int
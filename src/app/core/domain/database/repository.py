@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from app.core.domain.database import UserDB, NoteDB, GroupDB
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.domain.database import UserDB, NoteDB, GroupDB, GroupSummaryDB
 
 class INoteRepository(ABC):
     # --- USER OPERATIONS ---
@@ -40,6 +40,35 @@ class INoteRepository(ABC):
         """Pobiera wszystkie grupy należące do użytkownika."""
         pass
 
+    @abstractmethod
+    def get_group_summaries(self, user_id: int) -> List[GroupSummaryDB]:
+        """Pobiera grupy użytkownika z liczbą notatek, bez samych notatek."""
+        pass
+
+    @abstractmethod
+    def bulk_assign_groups(self, assignments: Dict[int, Optional[int]]) -> None:
+        """Sets group_id for many notes at once (note ID -> group ID or None)."""
+        pass
+
+    @abstractmethod
+    def apply_group_changes(
+        self,
+        user_id: int,
+        new_groups: List[GroupDB],
+        assignments: Dict[int, Optional[int]],
+        retired_group_ids: List[int]
+    ) -> List[int]:
+        """Atomically creates new groups (with the note IDs in ``GroupDB.notes``),
+        reassigns notes (note ID -> group ID or None) and deletes retired groups.
+        Returns the new group IDs in input order.
+        """
+        pass
+
+    @abstractmethod
+    def get_group_ids_by_user(self, user_id: int) -> List[int]:
+        """Returns the IDs of all groups owned by a user."""
+        pass
+
     @abstractmethod
     def update_group(self, group_db: GroupDB) -> Optional[int]:
         """Aktualizuje metadane grupy."""
@@ -51,11 +80,37 @@ class INoteRepository(ABC):
         """Tworzy nową notatkę i zwraca jej ID."""
         pass
 
+    @abstractmethod
+    def create_notes_bulk(self, notes: List[NoteDB]) -> Tuple[List[Tuple[int, NoteDB]], List[Tuple[int, str]]]:
+        """Creates many notes in one transaction.
+
+        Returns (created, failed): created pairs each input index with the
+        stored note (ID and timestamps filled in), failed pairs an input
+        index with an error message.
+        """
+        pass
+
     @abstractmethod
     def get_note(self, note_id: int) -> Optional[NoteDB]:
         """Pobiera pojedynczą notatkę."""
         pass
 
+    @abstractmethod
+    def get_notes_by_ids(self, note_ids: List[int], user_id: int) -> List[NoteDB]:
+        """Pobiera notatki użytkownika o podanych ID jednym zapytaniem (brakujące są pomijane)."""
+        pass
+
+    @abstractmethod
+    def get_notes_page(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[NoteDB]:
+        """Pobiera stronę notatek użytkownika po ID (keyset), tylko z wybranymi polami."""
+        pass
+
     @abstractmethod
     def get_notes_by_user(self, user_id: int) -> List[NoteDB]:
         """Pobiera wszystkie notatki użytkownika."""
@@ -0,0 +1,7 @@
+from app.core.domain.search.hit import LexicalHit
+from app.core.domain.search.index import ISearchIndex
+
+__all__ = [
+    "LexicalHit",
+    "ISearchIndex",
+]
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+@dataclass
+class LexicalHit:
+    note_id: int
+    user_id: int
+    chunk_id: int
+    content: str
+    score: float
@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.core.domain.search.hit import LexicalHit
+
+class ISearchIndex(ABC):
+    @abstractmethod
+    def index_note(self, note_id: int, user_id: int, content: str):
+        """Index (or re-index) a note, replacing any previous entries."""
+        pass
+
+    @abstractmethod
+    def remove_note(self, note_id: int):
+        pass
+
+    @abstractmethod
+    def search(self, query: str, user_id: int, k: int = 10) -> List[LexicalHit]:
+        """Return the best matching chunks sorted by score descending."""
+        pass
+
+    @abstractmethod
+    def is_user_indexed(self, user_id: int) -> bool:
+        """Whether the user's existing notes have been backfilled into the index."""
+        pass
+
+    @abstractmethod
+    def mark_user_indexed(self, user_id: int):
+        pass
@@ -7,4 +7,7 @@ class NoteVS:
     user_id: int
     chunk_id: Optional[int]
     content: str
-    embedding: Optional[List[float]]
\ No newline at end of file
+    embedding: Optional[List[float]]
+    # Character offsets of a chunk within the note's full text (title + content)
+    start_index: Optional[int] = None
+    end_index: Optional[int] = None
\ No newline at end of file
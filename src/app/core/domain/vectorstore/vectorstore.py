@@ -1,8 +1,17 @@
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 from app.core.domain.vectorstore.note import NoteVS
 from abc import ABC, abstractmethod
 
 class IVectorStore(ABC):
+    def upsert_notes(self, notes: List[NoteVS], progress_callback: Optional[Callable[[int, int], None]] = None):
+        """Write notes to both the full-note and the chunk store.
+
+        ``progress_callback(done, total)`` is called as texts get embedded,
+        if the implementation supports progress reporting.
+        """
+        self.upsert_full_notes(notes)
+        self.upsert_chunked_notes(notes)
+
     @abstractmethod
     def upsert_full_notes(self, notes: List[NoteVS]):
         pass
@@ -29,6 +38,38 @@ class IVectorStore(ABC):
         """
         pass
 
+    def retrieve_chunks_many(
+        self,
+        queries: List[str],
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.7
+    ) -> List[List[Tuple[NoteVS, float]]]:
+        """Retrieve chunks for several queries at once.
+
+        Returns one result list per query, in input order, each shaped like
+        the result of ``retrieve_chunks``. Implementations should embed all
+        queries in a single batch.
+        """
+        return [self.retrieve_chunks(query, user_id, k=k, threshold=threshold) for query in queries]
+
     @abstractmethod
-    def delete_note(self, note_id: int):
+    def delete_note(self, note_id: int, user_id: Optional[int] = None):
+        """Delete a note and its chunks. Passing the owner avoids a scan of all partitions."""
+        pass
+
+    def backfill_chunk_offsets(self) -> int:
+        """Record start/end offsets for chunks stored without them.
+
+        Returns the number of chunks updated.
+        """
+        return 0
+
+    # --- LIFECYCLE ---
+    def warm_up(self):
+        """Open underlying storage ahead of the first request."""
+        pass
+
+    def close(self):
+        """Release underlying storage handles."""
         pass
\ No newline at end of file
@@ -0,0 +1,11 @@
+from app.core.jobs.job import Job, JobStatus
+from app.core.jobs.queue import IJobQueue
+from app.core.jobs.worker import JobWorker, JobHandler
+
+__all__ = [
+    "Job",
+    "JobStatus",
+    "IJobQueue",
+    "JobWorker",
+    "JobHandler",
+]
@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: Optional[int]
+    kind: str
+    user_id: int
+    payload: Dict[str, Any] = field(default_factory=dict)
+    status: str = JobStatus.PENDING
+    attempts: int = 0
+    max_attempts: int = 5
+    dedupe_key: Optional[str] = None
+    last_error: Optional[str] = None
+    run_after: datetime = field(default_factory=datetime.now)
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
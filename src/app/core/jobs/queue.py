@@ -0,0 +1,79 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from app.core.jobs.job import Job
+
+
+class IJobQueue(ABC):
+    @abstractmethod
+    def enqueue(
+        self,
+        kind: str,
+        user_id: int,
+        payload: Optional[Dict[str, Any]] = None,
+        dedupe_key: Optional[str] = None,
+        max_attempts: int = 5,
+        delay_seconds: float = 0.0,
+        max_delay_seconds: Optional[float] = None
+    ) -> Job:
+        """Add a job, or return the pending job with the same ``dedupe_key``.
+
+        Handlers read current state when they run, so a pending job already
+        covers any later write with the same key. A running job does not,
+        which is why only pending jobs are deduplicated.
+
+        On a dedupe hit the pending job's start is pushed back to
+        ``now + delay_seconds`` (debouncing), but not past
+        ``max_delay_seconds`` after the job was first queued.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, job_id: int) -> Optional[Job]:
+        pass
+
+    @abstractmethod
+    def get_latest_by_dedupe_key(self, dedupe_key: str) -> Optional[Job]:
+        pass
+
+    @abstractmethod
+    def claim(self) -> Optional[Job]:
+        """Atomically take the next due job and mark it running.
+
+        Running jobs whose lease expired (e.g. the process died mid-job) are
+        claimed again, so work is not lost after a crash. A job is not
+        claimed while another job with the same ``dedupe_key`` is running.
+        The returned job's ``attempts`` identifies this claim for
+        ``complete`` and ``fail``.
+        """
+        pass
+
+    @abstractmethod
+    def complete(self, job_id: int, attempt: int) -> bool:
+        """Mark the job succeeded if ``attempt`` still holds it.
+
+        Returns False when the lease ran out and the job was claimed again
+        or failed meanwhile; the job is then left untouched.
+        """
+        pass
+
+    @abstractmethod
+    def fail(self, job_id: int, attempt: int, error: str, retry_in_seconds: Optional[float] = None) -> bool:
+        """Record a failed attempt; reschedule it if ``retry_in_seconds`` is given.
+
+        Like ``complete``, does nothing and returns False for a stale attempt.
+        """
+        pass
+
+    @abstractmethod
+    def on_enqueue(self, callback: Callable[[], None]):
+        """Register a callback run after every ``enqueue``, e.g. to wake idle workers."""
+        pass
+
+    @abstractmethod
+    def prune(self, older_than_seconds: float) -> int:
+        """Delete succeeded and failed jobs finished more than ``older_than_seconds`` ago.
+
+        Returns the number of jobs removed.
+        """
+        pass
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.jobs.job import Job
+from app.core.jobs.queue import IJobQueue
+
+JobHandler = Callable[[Job], Any]
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """Runs queued jobs on background threads.
+
+    Each thread claims one job at a time, dispatches it to the handler
+    registered for its kind and records the outcome. Failed jobs are retried
+    with exponential backoff until they run out of attempts. Idle threads
+    are woken by the queue on enqueue and poll every ``poll_interval``
+    otherwise. With ``retention_seconds`` set, finished jobs older than that
+    are deleted at most once per ``prune_interval``.
+    """
+
+    def __init__(
+        self,
+        queue: IJobQueue,
+        handlers: Dict[str, JobHandler],
+        num_threads: int = 1,
+        poll_interval: float = 0.5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0,
+        retention_seconds: Optional[float] = None,
+        prune_interval: float = 3600.0
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.num_threads = max(1, num_threads)
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prune_lock = threading.Lock()
+        self._next_prune = 0.0
+        queue.on_enqueue(self.notify)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.num_threads):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake idle threads so a freshly enqueued job starts without waiting for the next poll."""
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.max_backoff, self.base_backoff * 2 ** max(0, attempts - 1))
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Czyścimy przed claim - notify po nieudanym claim przerwie najbliższe czekanie
+            self._wake.clear()
+            try:
+                job = self.queue.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim a job: {e}", exc_info=True)
+                job = None
+            if job is None:
+                self._maybe_prune()
+                self._wake.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def _maybe_prune(self):
+        if self.retention_seconds is None:
+            return
+        now = time.monotonic()
+        with self._prune_lock:
+            if now < self._next_prune:
+                return
+            self._next_prune = now + self.prune_interval
+        try:
+            removed = self.queue.prune(self.retention_seconds)
+        except Exception as e:
+            logger.error(f"Failed to prune finished jobs: {e}", exc_info=True)
+            return
+        if removed:
+            logger.info(f"Pruned {removed} finished jobs")
+
+    def run_job(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self._record(job, self.queue.fail(job.id, job.attempts, f"No handler for job kind '{job.kind}'"))
+            return
+        try:
+            handler(job)
+        except Exception as e:
+            retry_in = self.backoff(job.attempts) if job.attempts < job.max_attempts else None
+            logger.warning(
+                f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}/{job.max_attempts}: {e}"
+            )
+            self._record(job, self.queue.fail(job.id, job.attempts, f"{type(e).__name__}: {e}", retry_in_seconds=retry_in))
+            return
+        self._record(job, self.queue.complete(job.id, job.attempts))
+
+    @staticmethod
+    def _record(job: Job, recorded: bool):
+        if not recorded:
+            logger.warning(
+                f"Job {job.id} ({job.kind}) attempt {job.attempts} outlived its lease; "
+                f"its outcome was discarded"
+            )
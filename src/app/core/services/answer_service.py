@@ -1,101 +1,152 @@
 """Answer service for generating LLM-based answers."""
 
+import dataclasses
 import re
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from langchain_core.documents import Document
 from app.core.domain.database import AnswerDB, INoteRepository
 from app.core.domain.vectorstore import IVectorStore
 from app.infrastructure.prompts.answer_schema import AnswerSchema
-from app.infrastructure.prompts.answer_prompt import ANSWER_PROMPT_TEMPLATE
+from app.infrastructure.prompts.answer_prompt import ANSWER_PROMPT_TEMPLATE, ANSWER_STREAM_PROMPT_TEMPLATE
+from app.core.services.answer_streaming import CitationRenumberer, TitleLineParser
+from app.core.services.pagination import decode_cursor, encode_cursor
+from app.core.services.response_cache import ResponseCache
 
 
 class AnswerService:
     """Service for generating answers using LLM and vectorstore."""
     
+    # Fields an answer listing can be narrowed to; ``id`` and ``created_at`` are always returned
+    LIST_FIELDS = tuple(field.name for field in dataclasses.fields(AnswerDB) if field.name not in ("id", "created_at"))
+    
     def __init__(
         self,
         repository: INoteRepository,
         vector_store: IVectorStore,
         llm,
-        note_service=None
+        note_service=None,
+        response_cache: Optional[ResponseCache] = None
     ):
         self.repository = repository
         self.vector_store = vector_store
         self.llm = llm
         self.note_service = note_service
+        self.response_cache = response_cache
     
-    def generate_answer(
+    def _mark_changed(self, user_id: int):
+        """Invalidate the user's cached listings after a write."""
+        if self.response_cache:
+            self.response_cache.bump(user_id)
+    
+    def _retrieve_references(
         self,
         query: str,
         user_id: int,
-        k: int = 10,
-        threshold: float = 0.4
-    ) -> AnswerDB:
-        """Generate an answer using LLM based on retrieved chunks.
+        k: int,
+        threshold: float
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, float]]:
+        """Retrieve chunks and number them as citation sources.
         
-        Args:
-            query: The user's question
-            user_id: The user ID
-            k: Maximum number of chunks to retrieve
-            threshold: Minimum similarity score threshold
-            
         Returns:
-            AnswerDB object with generated answer and references
+            Tuple of (references_map, scores), both keyed by citation number
         """
         # Retrieve relevant chunks from vectorstore
         relevant_chunks_with_scores = self.vector_store.retrieve_chunks(
             query, user_id, k=k, threshold=threshold
         )
         
-        if not relevant_chunks_with_scores:
-            # No relevant chunks found
-            answer_db = AnswerDB(
-                id=None,
-                user_id=user_id,
-                question=query,
-                answer_text="Nie znaleziono odpowiednich notatek w bazie danych, które mogłyby odpowiedzieć na to pytanie.",
-                title="Brak odpowiedzi",
-                references={}
+        # Load the cited notes in one query; drop chunks of notes deleted since indexing
+        notes_by_id = {
+            note.id: note
+            for note in self.repository.get_notes_by_ids(
+                [chunk_vs.id for chunk_vs, _ in relevant_chunks_with_scores], user_id
             )
-            answer_id = self.repository.create_answer(answer_db)
-            answer_db.id = answer_id
-            return answer_db
+        } if relevant_chunks_with_scores else {}
+        relevant_chunks_with_scores = [
+            (chunk_vs, score) for chunk_vs, score in relevant_chunks_with_scores
+            if chunk_vs.id in notes_by_id
+        ]
         
-        # Format chunks as LangChain Documents with numbered context
-        documents = []
         references_map = {}  # Maps citation number to reference data
-        
+        scores = {}
         for idx, (chunk_vs, score) in enumerate(relevant_chunks_with_scores, start=1):
-            # Create document with citation number
-            doc = Document(
-                page_content=chunk_vs.content,
-                metadata={
-                    "chunk_number": idx,
-                    "note_id": chunk_vs.id,
-                    "chunk_id": chunk_vs.chunk_id,
-                    "score": score
-                }
-            )
-            documents.append(doc)
-            
-            # Store reference mapping
             references_map[str(idx)] = {
                 "note_id": chunk_vs.id,
+                "note_title": notes_by_id[chunk_vs.id].title,
                 "chunk_id": chunk_vs.chunk_id,
                 "chunk_text": chunk_vs.content
             }
+            scores[str(idx)] = score
+        return references_map, scores
+    
+    @staticmethod
+    def _format_context(references_map: Dict[str, Dict[str, Any]]) -> str:
+        """Format numbered chunks as prompt context."""
+        documents = [
+            Document(page_content=reference["chunk_text"], metadata={"chunk_number": number})
+            for number, reference in references_map.items()
+        ]
+        return "\n\n".join(f"[{doc.metadata['chunk_number']}] {doc.page_content}" for doc in documents)
+    
+    def _save_answer(
+        self,
+        query: str,
+        user_id: int,
+        title: str,
+        answer_text: str,
+        references: Dict[str, Dict[str, Any]]
+    ) -> AnswerDB:
+        answer_db = AnswerDB(
+            id=None,
+            user_id=user_id,
+            question=query,
+            answer_text=answer_text,
+            title=title,
+            references=references
+        )
+        answer_db.id = self.repository.create_answer(answer_db)
+        self._mark_changed(user_id)
+        return answer_db
+    
+    def _save_no_answer(self, query: str, user_id: int) -> AnswerDB:
+        return self._save_answer(
+            query,
+            user_id,
+            title="Brak odpowiedzi",
+            answer_text="Nie znaleziono odpowiednich notatek w bazie danych, które mogłyby odpowiedzieć na to pytanie.",
+            references={}
+        )
+    
+    @staticmethod
+    def _fallback_title(query: str) -> str:
+        return query[:50] + "..." if len(query) > 50 else query
+    
+    def generate_answer(
+        self,
+        query: str,
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.4
+    ) -> AnswerDB:
+        """Generate an answer using LLM based on retrieved chunks.
         
-        # Format context for prompt
-        context_parts = []
-        for doc in documents:
-            chunk_num = doc.metadata["chunk_number"]
-            context_parts.append(f"[{chunk_num}] {doc.page_content}")
-        
-        context = "\n\n".join(context_parts)
+        Args:
+            query: The user's question
+            user_id: The user ID
+            k: Maximum number of chunks to retrieve
+            threshold: Minimum similarity score threshold
+            
+        Returns:
+            AnswerDB object with generated answer and references
+        """
+        references_map, _ = self._retrieve_references(query, user_id, k, threshold)
+        if not references_map:
+            # No relevant chunks found
+            return self._save_no_answer(query, user_id)
         
         # Create prompt
         prompt = ANSWER_PROMPT_TEMPLATE.format(
-            context=context,
+            context=self._format_context(references_map),
             question=query
         )
         
@@ -116,7 +167,7 @@ class AnswerService:
             logging.getLogger(__name__).warning(f"Structured output failed: {e}, using regular output")
             response = self.llm.invoke(prompt)
             answer_text = response.content if hasattr(response, 'content') else str(response)
-            title = query[:50] + "..." if len(query) > 50 else query
+            title = self._fallback_title(query)
         
         # Extract citations from answer text and build final references map
         # Find all citation patterns like [1], [2], [1][2], etc.
@@ -139,24 +190,100 @@ class AnswerService:
         for old_num, new_num in citation_mapping.items():
             answer_text = re.sub(rf'\[{old_num}\]', f'[{new_num}]', answer_text)
         
-        # Use renumbered references
-        final_references = renumbered_references
-
-        # Create AnswerDB
-        answer_db = AnswerDB(
-            id=None,
-            user_id=user_id,
-            question=query,
-            answer_text=answer_text,
-            title=title,
-            references=final_references
+        return self._save_answer(query, user_id, title, answer_text, renumbered_references)
+    
+    def stream_answer(
+        self,
+        query: str,
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.4
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Generate an answer like generate_answer, yielding events as it goes.
+        
+        Yields (event, data) pairs:
+        - ``sources``: the retrieved chunks, right after retrieval
+        - ``title``: the answer title, once the LLM has written it
+        - ``token``: the next piece of answer text, citations already renumbered
+        - ``done``: the persisted answer with ``answer_id`` and ``references``
+        - ``error``: generation failed; nothing is persisted
+        
+        Citations are numbered in order of first use, since later text is not
+        known yet. The answer is only saved once the stream completes.
+        """
+        references_map, scores = self._retrieve_references(query, user_id, k, threshold)
+        yield "sources", {
+            "sources": [
+                {
+                    "number": int(number),
+                    "note_id": reference["note_id"],
+                    "note_title": reference["note_title"],
+                    "chunk_id": reference["chunk_id"],
+                    "score": float(scores[number])
+                }
+                for number, reference in references_map.items()
+            ]
+        }
+        
+        if not references_map:
+            answer = self._save_no_answer(query, user_id)
+            yield "title", {"title": answer.title}
+            yield "token", {"text": answer.answer_text}
+            yield "done", self._done_event(answer)
+            return
+        
+        prompt = ANSWER_STREAM_PROMPT_TEMPLATE.format(
+            context=self._format_context(references_map),
+            question=query
         )
+        title_parser = TitleLineParser()
+        renumberer = CitationRenumberer(references_map)
+        answer_parts = []
+        title = None
+        try:
+            for chunk in self.llm.stream(prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if not isinstance(text, str) or not text:
+                    continue
+                # Still fed after the title: it drops the blank lines that follow it
+                text = title_parser.feed(text)
+                if title is None and title_parser.done:
+                    title = title_parser.title or self._fallback_title(query)
+                    yield "title", {"title": title}
+                if not text:
+                    continue
+                text = renumberer.feed(text)
+                if text:
+                    answer_parts.append(text)
+                    yield "token", {"text": text}
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).error(f"Streaming answer generation failed: {e}")
+            yield "error", {"detail": "Answer generation failed"}
+            return
         
-        # Save to database
-        answer_id = self.repository.create_answer(answer_db)
-        answer_db.id = answer_id
+        tail = ""
+        if title is None:
+            # The whole response fit on one line, so the title was never terminated
+            tail = title_parser.flush()
+            title = title_parser.title or self._fallback_title(query)
+            yield "title", {"title": title}
+        tail = renumberer.feed(tail) + renumberer.flush()
+        if tail:
+            answer_parts.append(tail)
+            yield "token", {"text": tail}
         
-        return answer_db
+        answer = self._save_answer(query, user_id, title, "".join(answer_parts).strip(), renumberer.references)
+        yield "done", self._done_event(answer)
+    
+    @staticmethod
+    def _done_event(answer: AnswerDB) -> Dict[str, Any]:
+        return {
+            "answer_id": answer.id,
+            "title": answer.title,
+            "answer_text": answer.answer_text,
+            "references": answer.references
+        }
     
     def get_answer(self, answer_id: int, user_id: int) -> Optional[AnswerDB]:
         """Get an answer by ID, ensuring it belongs to the user."""
@@ -166,6 +293,34 @@ class AnswerService:
         """Get all answers for a user."""
         return self.repository.get_answers_by_user(user_id)
     
+    def get_answers_page(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[AnswerDB], Optional[str]]:
+        """Get a page of the user's answers, newest first.
+        
+        Args:
+            user_id: The user ID
+            limit: Page size; None returns all remaining answers
+            cursor: Token from the previous page, or None for the first page
+            fields: Subset of LIST_FIELDS to load; the others are None
+            
+        Returns:
+            Tuple of (answers, next_cursor), next_cursor is None on the last page
+            
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        before_id = decode_cursor(cursor, {"id": int})["id"] if cursor else None
+        answers = self.repository.get_answers_page(user_id, limit + 1 if limit else None, before_id, fields)
+        if limit is None or len(answers) <= limit:
+            return answers, None
+        answers = answers[:limit]
+        return answers, encode_cursor({"id": answers[-1].id})
+    
     def delete_answer(self, answer_id: int, user_id: int) -> bool:
         """Delete an answer, ensuring it belongs to the user.
         
@@ -182,7 +337,10 @@ class AnswerService:
             return False
         
         # Delete the answer
-        return self.repository.delete_answer(answer_id, user_id)
+        deleted = self.repository.delete_answer(answer_id, user_id)
+        if deleted:
+            self._mark_changed(user_id)
+        return deleted
     
     def convert_answer_to_note(self, answer_id: int, user_id: int) -> Optional[int]:
         """Convert an answer to a note and delete the answer.
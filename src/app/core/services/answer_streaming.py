@@ -0,0 +1,99 @@
+"""Incremental processing of streamed LLM answer text."""
+
+import re
+from typing import Any, Dict, Optional
+
+
+class TitleLineParser:
+    """Splits a leading ``Title: ...`` line off a streamed answer.
+
+    Text is buffered until the first non-empty line is complete. If that
+    line is not a title line, it is passed through as answer text and
+    ``title`` stays None.
+    """
+
+    _TITLE = re.compile(r"^\s*(?:#+\s*)?\**\s*title\s*:\s*\**\s*(.*?)\s*\**\s*$", re.IGNORECASE)
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.done = False
+        self._buffer = ""
+        self._skip_whitespace = False
+
+    def _match_title(self, line: str) -> bool:
+        match = self._TITLE.match(line)
+        if match and match.group(1):
+            self.title = match.group(1)
+            return True
+        return False
+
+    def feed(self, text: str) -> str:
+        """Consume a piece of the stream; returns the answer text it contains."""
+        if self.done:
+            if self._skip_whitespace:
+                # Pusta linia między tytułem a odpowiedzią nie należy do odpowiedzi
+                text = text.lstrip()
+                self._skip_whitespace = not text
+            return text
+        self._buffer += text
+        stripped = self._buffer.lstrip()
+        if "\n" not in stripped:
+            return ""
+        line, rest = stripped.split("\n", 1)
+        self.done = True
+        self._buffer = ""
+        if self._match_title(line):
+            self._skip_whitespace = True
+            return self.feed(rest)
+        return stripped
+
+    def flush(self) -> str:
+        """End of stream: resolve a title line that was never terminated."""
+        if self.done:
+            return ""
+        self.done = True
+        line, self._buffer = self._buffer.strip(), ""
+        return "" if self._match_title(line) else line
+
+
+class CitationRenumberer:
+    """Renumbers ``[n]`` citations in streamed text in order of first use.
+
+    A trailing ``[`` or ``[12`` is held back until the next piece shows
+    whether it is a citation. Citations of unknown sources are removed.
+    ``references`` maps the new numbers to the cited sources.
+    """
+
+    _CITATION = re.compile(r"\[(\d+)\]")
+    _PARTIAL = re.compile(r"\[\d{0,6}$")
+
+    def __init__(self, sources: Dict[str, Dict[str, Any]]):
+        self.references: Dict[str, Dict[str, Any]] = {}
+        self._sources = sources
+        self._mapping: Dict[str, str] = {}
+        self._pending = ""
+
+    def _replace(self, match: "re.Match") -> str:
+        old_num = match.group(1)
+        if old_num not in self._sources:
+            return ""
+        if old_num not in self._mapping:
+            new_num = str(len(self._mapping) + 1)
+            self._mapping[old_num] = new_num
+            self.references[new_num] = self._sources[old_num]
+        return f"[{self._mapping[old_num]}]"
+
+    def feed(self, text: str) -> str:
+        """Consume a piece of the stream; returns the text that is safe to emit."""
+        text = self._pending + text
+        partial = self._PARTIAL.search(text)
+        if partial:
+            text, self._pending = text[:partial.start()], text[partial.start():]
+        else:
+            self._pending = ""
+        return self._CITATION.sub(self._replace, text)
+
+    def flush(self) -> str:
+        """End of stream: emit whatever was held back."""
+        text, self._pending = self._pending, ""
+        return self._CITATION.sub(self._replace, text)
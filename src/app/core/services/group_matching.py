@@ -0,0 +1,98 @@
+"""Matching of fresh clusters to a user's existing groups."""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+@dataclass
+class GroupDiff:
+    """Changes that turn the stored grouping into a new clustering result.
+
+    ``matched`` maps a cluster ID to the existing group it continues,
+    ``created`` lists clusters that need a new group, ``retired`` lists
+    groups no cluster continues, and ``reassigned`` maps note IDs to the
+    existing group (or None) they move to. Members of created groups are
+    not in ``reassigned``; they are assigned once the group exists.
+    """
+    matched: Dict[int, int] = field(default_factory=dict)
+    created: List[int] = field(default_factory=list)
+    retired: List[int] = field(default_factory=list)
+    reassigned: Dict[int, Optional[int]] = field(default_factory=dict)
+
+
+def match_clusters(
+    clusters: Dict[int, Set[int]],
+    groups: Dict[int, Set[int]],
+    min_jaccard: float = 0.3
+) -> Dict[int, int]:
+    """One-to-one cluster -> group matching maximising total Jaccard overlap.
+
+    Uses the Hungarian algorithm on the note-overlap matrix. Pairs whose
+    Jaccard similarity is below ``min_jaccard`` are left unmatched, so a
+    cluster that only grazes an old group gets a group of its own.
+    """
+    cluster_ids = list(clusters)
+    group_ids = list(groups)
+    if not cluster_ids or not group_ids:
+        return {}
+
+    group_index = {group_id: j for j, group_id in enumerate(group_ids)}
+    note_group = {note_id: group_id for group_id, note_ids in groups.items() for note_id in note_ids}
+
+    # Liczymy tylko pary, które faktycznie dzielą notatki
+    overlap = np.zeros((len(cluster_ids), len(group_ids)), dtype=np.float64)
+    for i, cluster_id in enumerate(cluster_ids):
+        for note_id in clusters[cluster_id]:
+            group_id = note_group.get(note_id)
+            if group_id is not None:
+                overlap[i, group_index[group_id]] += 1
+
+    cluster_sizes = np.array([len(clusters[c]) for c in cluster_ids], dtype=np.float64)
+    group_sizes = np.array([len(groups[g]) for g in group_ids], dtype=np.float64)
+    union = cluster_sizes[:, None] + group_sizes[None, :] - overlap
+    jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+    rows, cols = linear_sum_assignment(jaccard, maximize=True)
+    return {
+        cluster_ids[i]: group_ids[j]
+        for i, j in zip(rows, cols)
+        if jaccard[i, j] >= min_jaccard
+    }
+
+
+def diff_grouping(
+    clusters: Dict[int, Set[int]],
+    current_groups: Dict[int, Set[int]],
+    note_groups: Dict[int, Optional[int]],
+    min_jaccard: float = 0.3
+) -> GroupDiff:
+    """Plan the minimal writes from the current grouping to ``clusters``.
+
+    Args:
+        clusters: New cluster ID -> member note IDs (outliers excluded)
+        current_groups: Existing group ID -> member note IDs; include empty
+            groups so they can be retired
+        note_groups: Every note ID of the user -> its current group ID
+        min_jaccard: Minimum overlap for a cluster to keep a group's identity
+    """
+    diff = GroupDiff()
+    diff.matched = match_clusters(clusters, current_groups, min_jaccard)
+    diff.created = [cluster_id for cluster_id in clusters if cluster_id not in diff.matched]
+    continued = set(diff.matched.values())
+    diff.retired = [group_id for group_id in current_groups if group_id not in continued]
+
+    target: Dict[int, Optional[int]] = {note_id: None for note_id in note_groups}
+    for cluster_id, group_id in diff.matched.items():
+        for note_id in clusters[cluster_id]:
+            target[note_id] = group_id
+    created_members = {note_id for cluster_id in diff.created for note_id in clusters[cluster_id]}
+
+    diff.reassigned = {
+        note_id: group_id
+        for note_id, group_id in target.items()
+        if note_id not in created_members and note_groups.get(note_id) != group_id
+    }
+    return diff
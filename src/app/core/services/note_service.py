@@ -1,24 +1,55 @@
 """Note service for note-related operations."""
 
-from typing import List, Optional, Tuple, Dict, Any
+import dataclasses
+from typing import List, Optional, Tuple, Dict, Any, Callable
 from app.core.domain.database import NoteDB, GroupDB
 from app.core.domain.database import INoteRepository
 from app.core.domain.vectorstore import IVectorStore, NoteVS
 from app.core.domain.clusterization import IClusterizer, NoteCluster
+from app.core.domain.search import ISearchIndex
+from app.core.jobs import IJobQueue, Job, JobHandler
+from app.core.services.recluster_scheduler import ReclusterScheduler
+from app.core.services.group_matching import diff_grouping
+from app.core.services.pagination import decode_cursor, encode_cursor
+from app.core.services.response_cache import ResponseCache
 
 
 class NoteService:
     """Service for note-related operations."""
     
+    # Stała k z Reciprocal Rank Fusion (Cormack et al.), tłumi wpływ czołowych pozycji
+    RRF_K = 60
+    
+    SYNC_NOTES_JOB = "sync_notes"
+    RECLUSTER_JOB = ReclusterScheduler.RECLUSTER_JOB
+    ASSIGN_GROUPS_JOB = "assign_groups"
+    
+    # Fields a note listing can be narrowed to; ``id`` is always returned
+    LIST_FIELDS = tuple(field.name for field in dataclasses.fields(NoteDB) if field.name != "id")
+    
     def __init__(
         self, 
         repository: INoteRepository,
         vector_store: IVectorStore,
-        clusterizer: IClusterizer
+        clusterizer: IClusterizer,
+        search_index: Optional[ISearchIndex] = None,
+        job_queue: Optional[IJobQueue] = None,
+        recluster_scheduler: Optional[ReclusterScheduler] = None,
+        response_cache: Optional[ResponseCache] = None
     ):
         self.repository = repository
         self.vector_store = vector_store
         self.clusterizer = clusterizer
+        self.search_index = search_index
+        # With a queue, vectorstore sync and re-clustering run in the background worker
+        self.job_queue = job_queue
+        self.recluster_scheduler = recluster_scheduler
+        self.response_cache = response_cache
+    
+    def _mark_changed(self, user_id: int):
+        """Invalidate the user's cached listings after a write."""
+        if self.response_cache:
+            self.response_cache.bump(user_id)
     
     def _note_db_to_note_vs(self, note_db: NoteDB) -> NoteVS:
         """Convert NoteDB to NoteVS for vectorstore operations."""
@@ -43,117 +74,167 @@ class NoteService:
             content=full_content
         )
     
+    @staticmethod
+    def _sync_dedupe_key(note_id: int) -> str:
+        return f"sync_note:{note_id}"
+    
     def _sync_to_vectorstore(self, note: NoteDB):
         """Sync a note to the vectorstore (both full and chunked)."""
-        import json
-        import os
-        LOG_PATH = "/Users/marbook/projects/NotepadLM/.cursor/debug.log"
-        def _log(hypothesis_id, location, message, data=None):
-            try:
-                log_entry = {
-                    "sessionId": "debug-session",
-                    "runId": "run1",
-                    "hypothesisId": hypothesis_id,
-                    "location": location,
-                    "message": message,
-                    "data": data or {},
-                    "timestamp": int(__import__("time").time() * 1000)
-                }
-                with open(LOG_PATH, "a") as f:
-                    f.write(json.dumps(log_entry) + "\n")
-            except:
-                pass
-        
-        # #region agent log
-        _log("A", "note_service.py:_sync_to_vectorstore", "Entry", {"note_id": note.id, "note_id_type": type(note.id).__name__, "user_id": note.user_id})
-        # #endregion
+        if self.job_queue:
+            self.job_queue.enqueue(
+                self.SYNC_NOTES_JOB,
+                note.user_id,
+                {"note_ids": [note.id]},
+                dedupe_key=self._sync_dedupe_key(note.id)
+            )
+            return
         note_vs = self._note_db_to_note_vs(note)
-        # #region agent log
-        _log("A", "note_service.py:_sync_to_vectorstore", "Converted to NoteVS", {"note_id": note.id, "note_vs_id": note_vs.id, "note_vs_id_type": type(note_vs.id).__name__})
-        # #endregion
         try:
-            self.vector_store.upsert_full_notes([note_vs])
-            # #region agent log
-            _log("B", "note_service.py:_sync_to_vectorstore", "upsert_full_notes succeeded", {"note_id": note.id})
-            # #endregion
+            self.vector_store.upsert_notes([note_vs])
         except Exception as e:
-            # #region agent log
-            _log("B", "note_service.py:_sync_to_vectorstore", "upsert_full_notes failed (non-blocking)", {"note_id": note.id, "error": str(e), "error_type": type(e).__name__})
-            # #endregion
             # Don't raise - allow note creation to succeed even if vectorstore fails
             import logging
             logging.getLogger(__name__).warning(f"Failed to sync note {note.id} to vectorstore: {e}")
+        self._sync_to_search_index([note])
+    
+    def _sync_to_search_index(self, notes: List[NoteDB]):
+        """Index notes in the lexical search index, if one is configured."""
+        if not self.search_index:
+            return
+        for note in notes:
+            try:
+                note_vs = self._note_db_to_note_vs(note)
+                self.search_index.index_note(note.id, note.user_id, note_vs.content)
+            except Exception as e:
+                import logging
+                logging.getLogger(__name__).warning(f"Failed to index note {note.id} for search: {e}")
+    
+    def _ensure_search_index(self, user_id: int):
+        """Backfill the search index with notes created before it existed."""
+        if self.search_index.is_user_indexed(user_id):
+            return
+        self._sync_to_search_index(self.repository.get_notes_by_user(user_id))
+        self.search_index.mark_user_indexed(user_id)
+    
+    def _attach_stored_embeddings(self, user_id: int, note_clusters: List[NoteCluster]):
+        """Fill NoteCluster.embedding from the vectorstore's full-note vectors.
+        
+        A stored vector is only used when its text matches the note's current
+        content, so notes whose sync is still pending get embedded afresh.
+        """
         try:
-            self.vector_store.upsert_chunked_notes([note_vs])
-            # #region agent log
-            _log("B", "note_service.py:_sync_to_vectorstore", "upsert_chunked_notes succeeded", {"note_id": note.id})
-            # #endregion
+            stored = self.vector_store.get_full_notes(user_id)
         except Exception as e:
-            # #region agent log
-            _log("B", "note_service.py:_sync_to_vectorstore", "upsert_chunked_notes failed (non-blocking)", {"note_id": note.id, "error": str(e), "error_type": type(e).__name__})
-            # #endregion
-            # Don't raise - allow note creation to succeed even if vectorstore fails
             import logging
-            logging.getLogger(__name__).warning(f"Failed to sync note {note.id} chunks to vectorstore: {e}")
+            logging.getLogger(__name__).warning(f"Failed to load stored embeddings for user {user_id}: {e}")
+            return
+        by_id = {note_vs.id: note_vs for note_vs in stored if note_vs.embedding is not None}
+        for note_cluster in note_clusters:
+            note_vs = by_id.get(note_cluster.id)
+            if note_vs is not None and note_vs.content == note_cluster.content:
+                note_cluster.embedding = list(note_vs.embedding)
+    
+    def _regroup(self, user_id: int, notes: Optional[List[NoteDB]] = None):
+        """Cluster a user's notes and rebuild their groups. Raises on failure."""
+        # Get all notes for the user
+        if notes is None:
+            notes = self.repository.get_notes_by_user(user_id)
+        
+        # Skip clustering if no notes
+        if not notes:
+            return
+        
+        # Convert notes to NoteCluster format, reusing vectors already in the vectorstore
+        note_clusters = [self._note_db_to_note_cluster(note) for note in notes]
+        self._attach_stored_embeddings(user_id, note_clusters)
+        
+        # Cluster the notes
+        clustered_notes = self.clusterizer.cluster_notes(note_clusters)
+        
+        # Get topic info from clusterizer
+        topic_info = self.clusterizer.get_pretty_topic_labels(user_id)
+        
+        # Create a mapping of cluster_id to topic name
+        # topic_info is a pandas DataFrame with columns: Topic, Count, Name, etc.
+        cluster_to_topic_name = {}
+        if topic_info is not None and not topic_info.empty:
+            for _, row in topic_info.iterrows():
+                cluster_id = int(row['Topic'])
+                topic_name = str(row['Name']) if 'Name' in row else f"Topic {cluster_id}"
+                cluster_to_topic_name[cluster_id] = topic_name
+        
+        # Group notes by cluster_id (excluding outliers with cluster_id=-1)
+        cluster_to_notes = {}
+        for note_cluster in clustered_notes:
+            cluster_id = note_cluster.cluster_id
+            if cluster_id is not None and cluster_id != -1:
+                if cluster_id not in cluster_to_notes:
+                    cluster_to_notes[cluster_id] = []
+                cluster_to_notes[cluster_id].append(note_cluster)
+        
+        # Match clusters to existing groups by note overlap so group IDs survive reclustering
+        clusters = {
+            cluster_id: {note_cluster.id for note_cluster in cluster_notes}
+            for cluster_id, cluster_notes in cluster_to_notes.items()
+        }
+        note_groups = {note.id: note.group_id for note in notes}
+        current_groups = {group_id: set() for group_id in self.repository.get_group_ids_by_user(user_id)}
+        for note in notes:
+            if note.group_id in current_groups:
+                current_groups[note.group_id].add(note.id)
+        diff = diff_grouping(clusters, current_groups, note_groups)
+        
+        # Only new clusters get a new group; matched groups keep their (possibly user-edited) summary
+        new_groups = [
+            GroupDB(
+                id=None,
+                user_id=user_id,
+                summary=cluster_to_topic_name.get(cluster_id, f"Topic {cluster_id}"),
+                notes=sorted(clusters[cluster_id])
+            )
+            for cluster_id in diff.created
+        ]
+        
+        # Write only what changed, in one transaction
+        new_group_ids = self.repository.apply_group_changes(user_id, new_groups, diff.reassigned, diff.retired)
+        self._mark_changed(user_id)
+        topic_groups = {**diff.matched, **dict(zip(diff.created, new_group_ids))}
+        
+        # Lets later notes join these groups through the fitted model without a refit
+        self.clusterizer.bind_topic_groups(user_id, topic_groups)
+    
+    def _recluster_if_changed(self, user_id: int) -> bool:
+        """Regroup the user's notes unless they are unchanged since the last run.
+        
+        Runs under the scheduler's per-user lock, so two clusterings for the
+        same user never overlap within this process.
+        
+        Returns:
+            True if clustering ran, False if it was skipped
+        """
+        scheduler = self.recluster_scheduler
+        if scheduler is None:
+            self._regroup(user_id)
+            return True
+        
+        with scheduler.user_lock(user_id):
+            notes = self.repository.get_notes_by_user(user_id)
+            unchanged = scheduler.is_unchanged(user_id, scheduler.fingerprint(notes))
+            # Bez dopasowanego modelu (np. po restarcie) przypisywanie online nie zadziała
+            if unchanged and not self.clusterizer.needs_refit(user_id):
+                import logging
+                logging.getLogger(__name__).info(f"Skipping re-clustering for user {user_id}: notes unchanged")
+                return False
+            self._regroup(user_id, notes)
+            # Odcisk po przypisaniu grup, bo obejmuje też group_id notatek
+            scheduler.record(user_id, scheduler.fingerprint(self.repository.get_notes_by_user(user_id)))
+            return True
     
     def _recalculate_groups(self, user_id: int):
         """Recalculate groups for a user by clustering their notes."""
         import logging
         try:
-            # Get all notes for the user
-            notes = self.repository.get_notes_by_user(user_id)
-            
-            # Skip clustering if no notes
-            if not notes:
-                return
-            
-            # Delete all existing groups for the user
-            self.repository.delete_groups_by_user(user_id)
-            
-            # Convert notes to NoteCluster format
-            note_clusters = [self._note_db_to_note_cluster(note) for note in notes]
-            
-            # Cluster the notes
-            clustered_notes = self.clusterizer.cluster_notes(note_clusters)
-            
-            # Get topic info from clusterizer
-            topic_info = self.clusterizer.get_pretty_topic_labels()
-            
-            # Create a mapping of cluster_id to topic name
-            # topic_info is a pandas DataFrame with columns: Topic, Count, Name, etc.
-            cluster_to_topic_name = {}
-            if topic_info is not None and not topic_info.empty:
-                for _, row in topic_info.iterrows():
-                    cluster_id = int(row['Topic'])
-                    topic_name = str(row['Name']) if 'Name' in row else f"Topic {cluster_id}"
-                    cluster_to_topic_name[cluster_id] = topic_name
-            
-            # Group notes by cluster_id (excluding outliers with cluster_id=-1)
-            cluster_to_notes = {}
-            for note_cluster in clustered_notes:
-                cluster_id = note_cluster.cluster_id
-                if cluster_id is not None and cluster_id != -1:
-                    if cluster_id not in cluster_to_notes:
-                        cluster_to_notes[cluster_id] = []
-                    cluster_to_notes[cluster_id].append(note_cluster)
-            
-            # Create groups for each cluster and assign notes
-            for cluster_id, cluster_notes in cluster_to_notes.items():
-                # Get topic name for this cluster, or use default
-                topic_name = cluster_to_topic_name.get(cluster_id, f"Topic {cluster_id}")
-                
-                # Create group
-                group = GroupDB(
-                    id=None,
-                    user_id=user_id,
-                    summary=topic_name,
-                    notes=[]
-                )
-                group_id = self.repository.create_group(group)
-                
-                # Assign notes to this group
-                for note_cluster in cluster_notes:
-                    self.repository.update_note_group_id(note_cluster.id, group_id)
+            self._recluster_if_changed(user_id)
         except Exception as e:
             # Don't raise - allow note operation to succeed even if clustering fails
             logging.getLogger(__name__).error(f"Failed to recalculate groups for user {user_id}: {e}", exc_info=True)
@@ -166,12 +247,68 @@ class NoteService:
         """
         import logging
         try:
-            self._recalculate_groups(user_id)
+            self._recluster_if_changed(user_id)
             return True
         except Exception as e:
             logging.getLogger(__name__).error(f"Failed to recalculate groups for user {user_id}: {e}", exc_info=True)
             return False
     
+    def schedule_recalculate_groups(self, user_id: int) -> Optional[Job]:
+        """Queue a debounced re-clustering for the user.
+        
+        Returns:
+            The pending job, or None when background jobs are disabled
+        """
+        if not self.job_queue or not self.recluster_scheduler:
+            return None
+        return self.recluster_scheduler.schedule(user_id)
+    
+    def _assign_groups(self, user_id: int, notes: List[NoteDB]) -> bool:
+        """Put notes into the user's existing groups using the last fitted topics.
+        
+        Notes landing in the outlier topic lose their group, as they would
+        after a full clustering.
+        
+        Returns:
+            True if the notes were assigned, False if a full re-clustering is needed
+        """
+        if self.clusterizer.needs_refit(user_id):
+            return False
+        assigned = self.clusterizer.assign_notes([self._note_db_to_note_cluster(note) for note in notes])
+        if assigned is None:
+            return False
+        topic_groups = self.clusterizer.get_topic_groups(user_id)
+        self.repository.bulk_assign_groups({
+            note_cluster.id: topic_groups.get(note_cluster.cluster_id)
+            for note_cluster in assigned
+        })
+        self._mark_changed(user_id)
+        return True
+    
+    def _assign_groups_locked(self, user_id: int, notes: List[NoteDB]) -> bool:
+        # Under the per-user lock a concurrent regroup cannot delete the groups we assign to
+        if self.recluster_scheduler is None:
+            return self._assign_groups(user_id, notes)
+        with self.recluster_scheduler.user_lock(user_id):
+            return self._assign_groups(user_id, notes)
+    
+    def _queue_group_assignment(self, note: NoteDB):
+        """Assign a new or edited note to an existing group without a full refit."""
+        if self.job_queue:
+            self.job_queue.enqueue(
+                self.ASSIGN_GROUPS_JOB,
+                note.user_id,
+                {"note_ids": [note.id]},
+                dedupe_key=f"assign_groups:{note.id}"
+            )
+            return
+        try:
+            # Inline only the cheap online path; full re-clustering stays a manual action
+            self._assign_groups_locked(note.user_id, [note])
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning(f"Failed to assign note {note.id} to a group: {e}")
+    
     def create_note(self, title: str, content: str, user_id: int, group_id: Optional[int] = None, references: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
         """Create a new note for a user."""
         note_db = NoteDB(
@@ -183,83 +320,206 @@ class NoteService:
             references=references
         )
         note_id = self.repository.create_note(note_db)
+        self._mark_changed(user_id)
         
         # Get the created note to sync to vectorstore
         note = self.repository.get_note(note_id)
         if note:
             # Sync to vectorstore
             self._sync_to_vectorstore(note)
-            # Note: Groups are not recalculated automatically - user must trigger manually
+            # Place the note into an existing group unless the caller chose one
+            if group_id is None:
+                self._queue_group_assignment(note)
         
         return note_id
     
-    def bulk_create_notes(self, notes_data: List[dict], user_id: int) -> Tuple[List[int], List[dict]]:
+    def bulk_create_notes(
+        self,
+        notes_data: List[dict],
+        user_id: int,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[List[NoteDB], List[dict], List[Job]]:
         """Create multiple notes for a user efficiently.
         
         Args:
             notes_data: List of dicts with 'title', 'content', and optionally 'group_id'
             user_id: The user ID to create notes for
+            progress_callback: Optional callable receiving (embedded, total) texts
+                while the notes are synced to the vectorstore. Not used when
+                syncing runs in the background job queue.
             
         Returns:
-            Tuple of (created_note_ids, failed_notes) where failed_notes contains
-            dicts with 'index', 'title', and 'error' keys
+            Tuple of (created_notes, failed_notes, jobs) where created_notes are
+            the stored notes in input order, failed_notes contains dicts with
+            'index', 'title', and 'error' keys and jobs lists the background
+            sync and re-clustering jobs (empty without a queue)
         """
-        created_ids = []
-        failed_notes = []
-        created_note_objects = []
+        jobs = []
         
-        # Create all notes in the database first
-        for i, note_data in enumerate(notes_data):
-            try:
-                title = note_data.get("title", "Untitled Note")
-                content = note_data.get("content", "")
-                group_id = note_data.get("group_id")
-                references = note_data.get("references")
-                
-                note_db = NoteDB(
-                    id=None,
-                    title=title,
-                    content=content,
-                    user_id=user_id,
-                    group_id=group_id,
-                    references=references
-                )
-                note_id = self.repository.create_note(note_db)
-                created_ids.append(note_id)
-                
-                # Get the created note for vectorstore sync
-                note = self.repository.get_note(note_id)
-                if note:
-                    created_note_objects.append(note)
-            except Exception as e:
-                failed_notes.append({
-                    "index": i,
-                    "title": note_data.get("title", "Untitled Note"),
-                    "error": str(e)
-                })
+        # Create all notes in the database first, in one transaction
+        created_note_objects, failed_notes = self._insert_notes(notes_data, user_id)
         
+        if created_note_objects and self.job_queue:
+            # One sync job for the whole batch keeps embedding batched in the worker
+            jobs.append(self.job_queue.enqueue(
+                self.SYNC_NOTES_JOB,
+                user_id,
+                {"note_ids": [note.id for note in created_note_objects]}
+            ))
+            recluster_job = self.schedule_recalculate_groups(user_id)
+            if recluster_job:
+                jobs.append(recluster_job)
         # Sync all created notes to vectorstore in batches
-        if created_note_objects:
+        elif created_note_objects:
             note_vs_list = [self._note_db_to_note_vs(note) for note in created_note_objects]
             
-            # Sync full notes
+            # Sync full and chunked notes
             try:
-                self.vector_store.upsert_full_notes(note_vs_list)
+                self.vector_store.upsert_notes(note_vs_list, progress_callback=progress_callback)
             except Exception as e:
                 import logging
-                logging.getLogger(__name__).warning(f"Failed to sync full notes to vectorstore: {e}")
+                logging.getLogger(__name__).warning(f"Failed to sync notes to vectorstore: {e}")
             
-            # Sync chunked notes
-            try:
-                self.vector_store.upsert_chunked_notes(note_vs_list)
-            except Exception as e:
-                import logging
-                logging.getLogger(__name__).warning(f"Failed to sync chunked notes to vectorstore: {e}")
+            self._sync_to_search_index(created_note_objects)
             
             # Recalculate groups once at the end
             self._recalculate_groups(user_id)
         
-        return created_ids, failed_notes
+        return created_note_objects, failed_notes, jobs
+    
+    def _insert_notes(self, notes_data: List[dict], user_id: int) -> Tuple[List[NoteDB], List[dict]]:
+        """Insert notes in one transaction; failures are reported with their index."""
+        notes_db = [
+            NoteDB(
+                id=None,
+                title=note_data.get("title", "Untitled Note"),
+                content=note_data.get("content", ""),
+                user_id=user_id,
+                group_id=note_data.get("group_id"),
+                references=note_data.get("references")
+            )
+            for note_data in notes_data
+        ]
+        created, failed = self.repository.create_notes_bulk(notes_db)
+        if created:
+            self._mark_changed(user_id)
+        failed_notes = [
+            {
+                "index": i,
+                "title": notes_data[i].get("title", "Untitled Note"),
+                "error": error
+            }
+            for i, error in failed
+        ]
+        return [note for _, note in created], failed_notes
+    
+    def import_notes_batch(self, notes_data: List[dict], user_id: int) -> Tuple[List[NoteDB], List[dict]]:
+        """Insert and index one batch of a streamed import.
+        
+        Unlike bulk_create_notes, the batch is embedded before returning even
+        when background jobs are enabled, so a slow embedding stage holds
+        back the caller instead of piling up work. Re-clustering is left to
+        finish_import.
+        
+        Args:
+            notes_data: List of dicts with 'title', 'content', and optionally 'group_id'
+            user_id: The user ID to create notes for
+        
+        Returns:
+            Tuple of (created_notes, failed_notes) as in bulk_create_notes
+        """
+        created_notes, failed_notes = self._insert_notes(notes_data, user_id)
+        if not created_notes:
+            return created_notes, failed_notes
+        
+        try:
+            self.vector_store.upsert_notes([self._note_db_to_note_vs(note) for note in created_notes])
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning(f"Failed to sync imported notes to vectorstore: {e}")
+            # Let the worker retry the embedding instead of losing it
+            if self.job_queue:
+                self.job_queue.enqueue(
+                    self.SYNC_NOTES_JOB,
+                    user_id,
+                    {"note_ids": [note.id for note in created_notes]}
+                )
+        self._sync_to_search_index(created_notes)
+        return created_notes, failed_notes
+    
+    def finish_import(self, user_id: int) -> Optional[Job]:
+        """Re-cluster once after a streamed import.
+        
+        Returns:
+            The scheduled re-clustering job, or None when it ran inline
+        """
+        if self.job_queue:
+            return self.schedule_recalculate_groups(user_id)
+        self._recalculate_groups(user_id)
+        return None
+    
+    def get_sync_job(self, note_id: int) -> Optional[Job]:
+        """Latest background sync job queued for a single note, if any."""
+        if not self.job_queue:
+            return None
+        return self.job_queue.get_latest_by_dedupe_key(self._sync_dedupe_key(note_id))
+    
+    def get_job(self, job_id: int, user_id: int) -> Optional[Job]:
+        """Get a background job by ID, ensuring it belongs to the user."""
+        if not self.job_queue:
+            return None
+        job = self.job_queue.get(job_id)
+        if job and job.user_id == user_id:
+            return job
+        return None
+    
+    def run_sync_job(self, job: Job):
+        """Job handler: sync notes to the vectorstore and search index.
+        
+        Notes are read when the job runs, so the latest content is synced
+        even if the note changed after the job was queued. Errors propagate
+        so the worker can retry.
+        """
+        notes = self.repository.get_notes_by_ids(job.payload.get("note_ids", []), job.user_id)
+        if not notes:
+            return
+        
+        self.vector_store.upsert_notes([self._note_db_to_note_vs(note) for note in notes])
+        self._sync_to_search_index(notes)
+        
+        # A note deleted while it was being embedded must not leave vectors behind
+        still_there = {note.id for note in self.repository.get_notes_by_ids([note.id for note in notes], job.user_id)}
+        for note in notes:
+            if note.id not in still_there:
+                self.vector_store.delete_note(note.id, user_id=note.user_id)
+                if self.search_index:
+                    self.search_index.remove_note(note.id)
+    
+    def run_recluster_job(self, job: Job):
+        """Job handler: rebuild the user's groups. Errors propagate so the worker can retry."""
+        self._recluster_if_changed(job.user_id)
+    
+    def run_assign_groups_job(self, job: Job):
+        """Job handler: assign notes to existing groups, or schedule a refit.
+        
+        A full re-clustering is scheduled when the user has no fitted topics
+        yet or when drift/outlier thresholds have been crossed.
+        """
+        notes = self.repository.get_notes_by_ids(job.payload.get("note_ids", []), job.user_id)
+        if not notes:
+            return
+        
+        assigned = self._assign_groups_locked(job.user_id, notes)
+        if not assigned or self.clusterizer.needs_refit(job.user_id):
+            self.schedule_recalculate_groups(job.user_id)
+    
+    def job_handlers(self) -> Dict[str, JobHandler]:
+        """Handlers for the job kinds this service enqueues."""
+        return {
+            self.SYNC_NOTES_JOB: self.run_sync_job,
+            self.RECLUSTER_JOB: self.run_recluster_job,
+            self.ASSIGN_GROUPS_JOB: self.run_assign_groups_job,
+        }
     
     def get_note(self, note_id: int, user_id: int) -> Optional[NoteDB]:
         """Get a note by ID, ensuring it belongs to the user."""
@@ -274,6 +534,35 @@ class NoteService:
         # For now, we'll need to add get_notes_by_user to repository
         return self.repository.get_notes_by_user(user_id)
     
+    def get_notes_page(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[NoteDB], Optional[str]]:
+        """Get a page of the user's notes in ID order.
+        
+        Args:
+            user_id: The user ID
+            limit: Page size; None returns all remaining notes
+            cursor: Token from the previous page, or None for the first page
+            fields: Subset of LIST_FIELDS to load; the others are None
+            
+        Returns:
+            Tuple of (notes, next_cursor), next_cursor is None on the last page
+            
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        after_id = decode_cursor(cursor, {"id": int})["id"] if cursor else None
+        # One extra row tells whether another page exists without a COUNT
+        notes = self.repository.get_notes_page(user_id, limit + 1 if limit else None, after_id, fields)
+        if limit is None or len(notes) <= limit:
+            return notes, None
+        notes = notes[:limit]
+        return notes, encode_cursor({"id": notes[-1].id})
+    
     def update_note(self, note_id: int, user_id: int, title: Optional[str] = None, 
                     content: Optional[str] = None, group_id: Optional[int] = None,
                     references: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[int]:
@@ -282,9 +571,6 @@ class NoteService:
         if not note or note.user_id != user_id:
             return None
         
-        # Store old note for vectorstore deletion
-        old_note = note
-        
         # Update fields
         if title is not None:
             note.title = title
@@ -298,74 +584,68 @@ class NoteService:
         updated_id = self.repository.update_note(note)
         
         if updated_id:
+            self._mark_changed(user_id)
             # Get updated note
             updated_note = self.repository.get_note(updated_id)
             if updated_note:
-                # Delete old note from vectorstore and add updated one
-                self.vector_store.delete_note(old_note.id)
+                # Upsert overwrites the full note and diffs its chunks in place
                 self._sync_to_vectorstore(updated_note)
-                # Note: Groups are not recalculated automatically - user must trigger manually
+                # Edited text may belong to another topic now, unless the group was set explicitly
+                if group_id is None and (title is not None or content is not None):
+                    self._queue_group_assignment(updated_note)
         
         return updated_id
     
     def delete_note(self, note_id: int, user_id: int) -> bool:
         """Delete a note, ensuring it belongs to the user."""
-        import json
-        import os
-        LOG_PATH = "/Users/marbook/projects/NotepadLM/.cursor/debug.log"
-        def _log(hypothesis_id, location, message, data=None):
-            try:
-                log_entry = {
-                    "sessionId": "debug-session",
-                    "runId": "run1",
-                    "hypothesisId": hypothesis_id,
-                    "location": location,
-                    "message": message,
-                    "data": data or {},
-                    "timestamp": int(__import__("time").time() * 1000)
-                }
-                with open(LOG_PATH, "a") as f:
-                    f.write(json.dumps(log_entry) + "\n")
-            except:
-                pass
-        
-        # #region agent log
-        _log("E", "note_service.py:delete_note", "Entry", {"note_id": note_id, "user_id": user_id})
-        # #endregion
         note = self.repository.get_note(note_id)
         if not note or note.user_id != user_id:
-            # #region agent log
-            _log("E", "note_service.py:delete_note", "Note not found or access denied", {"note_id": note_id, "user_id": user_id, "note_exists": note is not None, "note_user_id": note.user_id if note else None})
-            # #endregion
             return False
         
         # Delete from vectorstore first (non-blocking)
         try:
-            # #region agent log
-            _log("E", "note_service.py:delete_note", "Calling vectorstore.delete_note", {"note_id": note_id})
-            # #endregion
-            self.vector_store.delete_note(note_id)
-            # #region agent log
-            _log("E", "note_service.py:delete_note", "vectorstore.delete_note succeeded", {"note_id": note_id})
-            # #endregion
+            self.vector_store.delete_note(note_id, user_id=user_id)
         except Exception as e:
-            # #region agent log
-            _log("E", "note_service.py:delete_note", "vectorstore.delete_note failed (non-blocking)", {"note_id": note_id, "error": str(e), "error_type": type(e).__name__})
-            # #endregion
             # Don't raise - allow database deletion to proceed even if vectorstore fails
             import logging
             logging.getLogger(__name__).warning(f"Failed to delete note {note_id} from vectorstore: {e}")
         
+        if self.search_index:
+            try:
+                self.search_index.remove_note(note_id)
+            except Exception as e:
+                import logging
+                logging.getLogger(__name__).warning(f"Failed to remove note {note_id} from search index: {e}")
+        
         # Delete from database
         success = self.repository.delete_note(note_id)
-        # #region agent log
-        _log("E", "note_service.py:delete_note", "Database delete result", {"note_id": note_id, "success": success})
-        # #endregion
+        if success:
+            self._mark_changed(user_id)
         
         # Note: Groups are not recalculated automatically - user must trigger manually
         
         return success
     
+    def _chunk_offsets_in_content(self, note: NoteDB, chunk_vs: NoteVS) -> Tuple[int, int]:
+        """Map a chunk's offsets in the chunked text (title + content) onto note.content."""
+        note_content = note.content or ""
+        # Chunks are created from full_content = title + "\n" + content
+        title_offset = len(note.title) + 1 if note.title else 0
+        
+        start_in_full, end_in_full = chunk_vs.start_index, chunk_vs.end_index
+        if start_in_full is None:
+            # Chunks stored before offsets were recorded (see backfill_offsets)
+            full_content = f"{note.title}\n{note_content}" if note.title else note_content
+            start_in_full = full_content.find(chunk_vs.content)
+            if start_in_full == -1:
+                return 0, len(note_content)
+            end_in_full = start_in_full + len(chunk_vs.content)
+        
+        # A chunk overlapping the title is clamped to the start of the content
+        chunk_start = min(max(start_in_full - title_offset, 0), len(note_content))
+        chunk_end = min(max(end_in_full - title_offset, 0), len(note_content))
+        return chunk_start, chunk_end
+    
     def query_relevant_notes(
         self, 
         query: str, 
@@ -391,6 +671,45 @@ class NoteService:
         """
         # Retrieve relevant chunks from vectorstore
         relevant_chunks_with_scores = self.vector_store.retrieve_chunks(query, user_id, k=k, threshold=threshold)
+        return self._hydrate_query_results(relevant_chunks_with_scores, user_id)
+
+    def query_relevant_notes_many(
+        self,
+        queries: List[str],
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.4
+    ) -> List[List[dict]]:
+        """Query for relevant notes for several queries in one pass.
+
+        All queries are embedded in a single batch and searched with one
+        vector store call. Returns one result list per query, in input
+        order, shaped like the result of ``query_relevant_notes``.
+        """
+        if not queries:
+            return []
+        chunks_per_query = self.vector_store.retrieve_chunks_many(queries, user_id, k=k, threshold=threshold)
+        # One repository query for the notes of every query in the batch
+        notes_by_id = self._load_notes(
+            [chunk_vs.id for chunks in chunks_per_query for chunk_vs, _ in chunks],
+            user_id
+        )
+        return [self._hydrate_query_results(chunks, user_id, notes_by_id) for chunks in chunks_per_query]
+
+    def _load_notes(self, note_ids: List[int], user_id: int) -> Dict[int, NoteDB]:
+        """Batch-load the user's notes by ID in a single repository call."""
+        if not note_ids:
+            return {}
+        return {note.id: note for note in self.repository.get_notes_by_ids(note_ids, user_id)}
+
+    def _hydrate_query_results(
+        self,
+        relevant_chunks_with_scores: List[tuple],
+        user_id: int,
+        notes_by_id: Optional[Dict[int, NoteDB]] = None
+    ) -> List[dict]:
+        if notes_by_id is None:
+            notes_by_id = self._load_notes([chunk_vs.id for chunk_vs, _ in relevant_chunks_with_scores], user_id)
         
         results = []
         seen_note_ids = set()
@@ -400,90 +719,90 @@ class NoteService:
             if chunk_vs.id in seen_note_ids:
                 continue
             
-            # Get the full note from repository
-            note = self.repository.get_note(chunk_vs.id)
-            if not note or note.user_id != user_id:
+            # Notes deleted since they were indexed (or owned by someone else) are missing here
+            note = notes_by_id.get(chunk_vs.id)
+            if not note:
                 continue
             
-            # Find the chunk position in the note content
-            # Note: chunks are created from full_content = title + "\n" + content
-            # But we need to find the position in just the content field
             chunk_text = chunk_vs.content
-            note_content = note.content or ""
-            note_title = note.title or ""
-            
-            # Reconstruct the full content as it was when chunked
-            full_content_for_chunking = f"{note_title}\n{note_content}" if note_title else note_content
-            
-            # Try to find the chunk in the full content (title + content)
-            chunk_start_in_full = full_content_for_chunking.find(chunk_text)
-            
-            # Calculate the offset: title length + newline if title exists
-            title_offset = len(note_title) + 1 if note_title else 0
-            
-            if chunk_start_in_full != -1:
-                # Chunk found in full content
-                if chunk_start_in_full >= title_offset:
-                    # Chunk is in the content part (not in title)
-                    chunk_start = chunk_start_in_full - title_offset
-                    chunk_end = chunk_start + len(chunk_text)
-                else:
-                    # Chunk starts in title, find where it overlaps into content
-                    # Find the part of chunk that's in content
-                    overlap_start = max(0, title_offset - chunk_start_in_full)
-                    chunk_start = 0
-                    chunk_end = len(chunk_text) - overlap_start
-            else:
-                # Try to find a substring match in content only
-                # Remove title prefix from chunk if it starts with title
-                chunk_in_content = chunk_text
-                if note_title and chunk_text.startswith(note_title):
-                    # Remove title and newline from start of chunk
-                    title_prefix = f"{note_title}\n"
-                    if chunk_text.startswith(title_prefix):
-                        chunk_in_content = chunk_text[len(title_prefix):]
-                
-                # Try to find the content part in note content
-                chunk_start = note_content.find(chunk_in_content)
-                chunk_end = chunk_start + len(chunk_in_content) if chunk_start != -1 else -1
-                
-                # If still not found, try fuzzy matching
-                if chunk_start == -1:
-                    min_match_length = max(50, int(len(chunk_in_content) * 0.7))
-                    for i in range(len(note_content) - min_match_length + 1):
-                        substring = note_content[i:i + len(chunk_in_content)]
-                        if len(substring) >= min_match_length:
-                            # Simple similarity check
-                            matches = sum(c1 == c2 for c1, c2 in zip(chunk_in_content[:len(substring)], substring))
-                            if matches / len(substring) > 0.7:
-                                chunk_start = i
-                                chunk_end = min(i + len(chunk_in_content), len(note_content))
-                                break
-                
-                # If still not found, estimate position based on chunk_id
-                if chunk_start == -1 and chunk_vs.chunk_id is not None:
-                    chunk_size = 1000
-                    chunk_overlap = 180
-                    # Estimate: each chunk after the first starts at (chunk_id * (chunk_size - chunk_overlap))
-                    # Account for title offset
-                    estimated_start_in_full = chunk_vs.chunk_id * (chunk_size - chunk_overlap)
-                    if estimated_start_in_full >= title_offset:
-                        estimated_start = estimated_start_in_full - title_offset
-                        chunk_start = min(estimated_start, len(note_content))
-                        chunk_end = min(chunk_start + len(chunk_in_content), len(note_content))
-                    else:
-                        chunk_start = 0
-                        chunk_end = min(len(chunk_in_content), len(note_content))
+            chunk_start, chunk_end = self._chunk_offsets_in_content(note, chunk_vs)
             
             results.append({
                 "note": note,
                 "chunk_text": chunk_text,
-                "chunk_start": chunk_start if chunk_start != -1 else 0,
-                "chunk_end": chunk_end if chunk_end != -1 else len(note_content),
+                "chunk_start": chunk_start,
+                "chunk_end": chunk_end,
                 "relevance_score": relevance_score
             })
             
             seen_note_ids.add(chunk_vs.id)
         
         return results
-
+    
+    def search_notes(
+        self,
+        query: str,
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.4,
+        mode: str = "hybrid"
+    ) -> List[dict]:
+        """Search notes lexically (BM25), semantically, or both fused with RRF.
+        
+        Args:
+            query: The search query string
+            user_id: The user ID to search notes for
+            k: Maximum number of notes to return
+            threshold: Minimum similarity score for semantic hits
+            mode: "hybrid", "lexical" (no embedding pass) or "semantic"
+            
+        Returns:
+            List of dicts with keys:
+                - note: NoteDB object
+                - chunk_text: The best matching chunk text
+                - score: Fused reciprocal-rank score
+                - lexical_rank: 1-based rank in BM25 results, or None
+                - semantic_rank: 1-based rank in vector results, or None
+        """
+        if mode not in ("hybrid", "lexical", "semantic"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        
+        # Each ranking is a list of (note_id, chunk_text), best first, one entry per note
+        rankings = {}
+        if mode in ("hybrid", "lexical") and self.search_index:
+            self._ensure_search_index(user_id)
+            lexical = []
+            seen = set()
+            # Ask for more chunks than notes, several chunks may belong to one note
+            for hit in self.search_index.search(query, user_id, k=k * 3):
+                if hit.note_id not in seen:
+                    seen.add(hit.note_id)
+                    lexical.append((hit.note_id, hit.content))
+            rankings["lexical"] = lexical
+        if mode in ("hybrid", "semantic"):
+            semantic = self.vector_store.retrieve_chunks(query, user_id, k=k, threshold=threshold)
+            rankings["semantic"] = [(chunk_vs.id, chunk_vs.content) for chunk_vs, _ in semantic]
+        
+        fused = {}
+        for name, ranking in rankings.items():
+            for rank, (note_id, chunk_text) in enumerate(ranking, start=1):
+                entry = fused.setdefault(note_id, {
+                    "chunk_text": chunk_text,
+                    "score": 0.0,
+                    "lexical_rank": None,
+                    "semantic_rank": None
+                })
+                entry["score"] += 1.0 / (self.RRF_K + rank)
+                entry[f"{name}_rank"] = rank
+        
+        notes_by_id = self._load_notes(list(fused), user_id)
+        results = []
+        for note_id, entry in sorted(fused.items(), key=lambda item: item[1]["score"], reverse=True):
+            note = notes_by_id.get(note_id)
+            if not note:
+                continue
+            results.append({"note": note, **entry})
+            if len(results) >= k:
+                break
+        
+        return results
@@ -0,0 +1,41 @@
+"""Opaque cursors for keyset-paginated listings."""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the sort key of the last row on a page as a URL-safe token."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_types: Dict[str, type]) -> Dict[str, Any]:
+    """Decode a token from encode_cursor, checking its keys and value types.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match ``key_types``
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, dict) or set(values) != set(key_types):
+            raise ValueError
+        for key, key_type in key_types.items():
+            if type(values[key]) is not key_type:
+                raise ValueError
+        return values
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """Parse a comma-separated ``fields`` parameter. Raises ValueError on unknown names."""
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    return names
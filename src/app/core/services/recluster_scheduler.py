@@ -0,0 +1,77 @@
+"""Per-user scheduling of group recalculation."""
+
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from app.core.domain.database import NoteDB
+from app.core.jobs import IJobQueue, Job
+
+
+class ReclusterScheduler:
+    """Coalesces re-clustering triggers per user.
+
+    Triggers inside the quiet window collapse into one pending job whose
+    start is pushed back with every new trigger, but never beyond
+    ``max_delay_seconds`` after the first one. The queue does not start a
+    job while another job with the same key is running, and the in-process
+    per-user lock covers the inline path. A run is skipped when the user's
+    notes are unchanged since the last clustering.
+    """
+
+    RECLUSTER_JOB = "recluster"
+
+    def __init__(
+        self,
+        job_queue: Optional[IJobQueue],
+        quiet_seconds: float = 10.0,
+        max_delay_seconds: float = 120.0
+    ):
+        self.job_queue = job_queue
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._fingerprints: Dict[int, str] = {}
+        self._user_locks: Dict[int, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def dedupe_key(user_id: int) -> str:
+        return f"recluster:{user_id}"
+
+    def schedule(self, user_id: int) -> Job:
+        """Queue (or push back) the user's pending re-clustering job."""
+        return self.job_queue.enqueue(
+            self.RECLUSTER_JOB,
+            user_id,
+            dedupe_key=self.dedupe_key(user_id),
+            delay_seconds=self.quiet_seconds,
+            max_delay_seconds=self.max_delay_seconds
+        )
+
+    @staticmethod
+    def fingerprint(notes: List[NoteDB]) -> str:
+        """Hash of the note set as clustering sees it, plus current group assignments.
+
+        Group IDs are included so that deleting or editing groups by hand
+        makes the next trigger re-cluster instead of being skipped.
+        """
+        digest = hashlib.sha256()
+        for note in sorted(notes, key=lambda n: n.id):
+            digest.update(f"{note.id}\x1f{note.group_id}\x1f{note.title}\x1f{note.content}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_unchanged(self, user_id: int, fingerprint: str) -> bool:
+        with self._lock:
+            return self._fingerprints.get(user_id) == fingerprint
+
+    def record(self, user_id: int, fingerprint: str):
+        with self._lock:
+            self._fingerprints[user_id] = fingerprint
+
+    @contextmanager
+    def user_lock(self, user_id: int) -> Iterator[None]:
+        with self._lock:
+            lock = self._user_locks.setdefault(user_id, threading.Lock())
+        with lock:
+            yield
@@ -0,0 +1,74 @@
+"""Per-user data versions and a cache of serialized read responses."""
+
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """Caches serialized response bodies per user, keyed by a data version.
+
+    Every write to a user's notes, groups or answers calls ``bump``, which
+    moves the user to a new version; bodies stored under an older version
+    are never served again. ETags are derived from the version alone, so
+    an unchanged poll can be answered with 304 without rebuilding the body.
+    Versions live in process memory, which matches the single-process
+    deployment; a random epoch keeps ETags from before a restart from
+    matching.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._epoch = uuid.uuid4().hex
+        self._versions: Dict[int, int] = {}
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[int, bytes, Dict[str, str]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int):
+        """Mark the user's data as changed and drop their cached bodies."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == user_id]:
+                self._size -= len(self._entries.pop(entry_key)[1])
+
+    def etag(self, user_id: int, key: str, version: int) -> str:
+        """Strong ETag for the response ``key`` of the user at ``version``."""
+        digest = hashlib.sha256(f"{self._epoch}:{user_id}:{version}:{key}".encode()).hexdigest()
+        return f'"{digest[:32]}"'
+
+    def get(self, user_id: int, key: str, version: int) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """Cached (body, headers) if it was stored at ``version``."""
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((user_id, key))
+            return entry[1], entry[2]
+
+    def put(self, user_id: int, key: str, version: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        """Store a body built from data read at ``version``.
+
+        Read the version before loading the data: if a write lands in
+        between, the body is stored under a version that is already stale
+        and is never served.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+            old = self._entries.pop((user_id, key), None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[(user_id, key)] = (version, body, dict(headers or {}))
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
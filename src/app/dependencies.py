@@ -3,12 +3,20 @@
 from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.infrastructure.bootstrap import database_repository, vector_store, clusterizer, llm
+from app.infrastructure.bootstrap import (
+    database_repository, vector_store, clusterizer, llm, search_index,
+    job_queue, background_jobs, job_worker_threads, job_retention_days, recluster_quiet_seconds,
+    recluster_max_delay_seconds, response_cache_mb
+)
 from app.core.domain.database import INoteRepository
 from app.core.domain.vectorstore import IVectorStore
 from app.core.domain.clusterization import IClusterizer
+from app.core.domain.search import ISearchIndex
+from app.core.jobs import IJobQueue, JobWorker
 from app.core.services.user_service import UserService
 from app.core.services.note_service import NoteService
+from app.core.services.recluster_scheduler import ReclusterScheduler
+from app.core.services.response_cache import ResponseCache
 from app.core.services.answer_service import AnswerService
 from app.core.services.auth_service import decode_access_token
 from app.core.domain.database import UserDB
@@ -37,22 +45,70 @@ def get_clusterizer() -> IClusterizer:
     return clusterizer
 
 
+def get_search_index() -> ISearchIndex:
+    """Get search index instance."""
+    return search_index
+
+
+def get_job_queue() -> IJobQueue:
+    """Get job queue instance."""
+    return job_queue
+
+
+# Shared so fingerprints and per-user locks are seen by requests and the worker alike
+recluster_scheduler = ReclusterScheduler(
+    job_queue,
+    quiet_seconds=recluster_quiet_seconds,
+    max_delay_seconds=recluster_max_delay_seconds
+)
+
+
+# Shared by requests and the worker, so background regrouping invalidates cached listings too
+response_cache = ResponseCache(max_bytes=response_cache_mb * 1024 * 1024)
+
+
+def get_response_cache() -> ResponseCache:
+    """Get response cache instance."""
+    return response_cache
+
+
 def get_note_service(
     repository: Annotated[INoteRepository, Depends(get_repository)],
     vector_store: Annotated[IVectorStore, Depends(get_vector_store)],
-    clusterizer: Annotated[IClusterizer, Depends(get_clusterizer)]
+    clusterizer: Annotated[IClusterizer, Depends(get_clusterizer)],
+    search_index: Annotated[ISearchIndex, Depends(get_search_index)],
+    job_queue: Annotated[IJobQueue, Depends(get_job_queue)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)]
 ) -> NoteService:
     """Get note service instance."""
-    return NoteService(repository, vector_store, clusterizer)
+    return NoteService(
+        repository, vector_store, clusterizer, search_index,
+        job_queue=job_queue if background_jobs else None,
+        recluster_scheduler=recluster_scheduler,
+        response_cache=response_cache
+    )
+
+
+# The worker always runs so jobs queued before BACKGROUND_JOBS was turned off still drain
+job_worker = JobWorker(
+    job_queue,
+    NoteService(
+        database_repository, vector_store, clusterizer, search_index, job_queue, recluster_scheduler,
+        response_cache
+    ).job_handlers(),
+    num_threads=job_worker_threads,
+    retention_seconds=job_retention_days * 24 * 3600
+)
 
 
 def get_answer_service(
     repository: Annotated[INoteRepository, Depends(get_repository)],
     vector_store: Annotated[IVectorStore, Depends(get_vector_store)],
-    note_service: Annotated[NoteService, Depends(get_note_service)]
+    note_service: Annotated[NoteService, Depends(get_note_service)],
+    response_cache: Annotated[ResponseCache, Depends(get_response_cache)]
 ) -> AnswerService:
     """Get answer service instance."""
-    return AnswerService(repository, vector_store, llm, note_service)
+    return AnswerService(repository, vector_store, llm, note_service, response_cache)
 
 async def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
@@ -36,16 +36,84 @@ Base.metadata.create_all(engine)
 database_repository = AppRepository(SessionLocal)
 
 
-embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-large")
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", api_key=os.getenv("GOOGLE_API_KEY"))
+from app.infrastructure.embeddings.cached_embeddings import CachedEmbeddings
+from app.infrastructure.embeddings.embedding_engine import EmbeddingEngine
+from app.infrastructure.embeddings.query_cache import QueryEmbeddingCache
+
+embedding_model_name = "intfloat/multilingual-e5-large"
+base_embeddings = HuggingFaceEmbeddings(model_name=embedding_model_name)
+embedding_engine = EmbeddingEngine(
+    base_embeddings,
+    model_name=embedding_model_name,
+    batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+    num_workers=int(os.getenv("EMBEDDING_WORKERS", "0"))
+)
+embeddings = CachedEmbeddings(
+    embedding_engine,
+    model_name=embedding_model_name,
+    db_path=f"{data_storage_path}/embedding_cache.db",
+    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+    query_cache=QueryEmbeddingCache(
+        embedding_model_name,
+        max_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+        ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS")) if os.getenv("QUERY_CACHE_TTL_SECONDS") else None
+    )
+)
+# "fake" - deterministyczny model bez sieci (testy, praca offline)
+if os.getenv("LLM_BACKEND", "gemini") == "fake":
+    from app.infrastructure.llm.fake_streaming_llm import FakeStreamingLLM
+    llm = FakeStreamingLLM(token_delay=float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0")))
+else:
+    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", api_key=os.getenv("GOOGLE_API_KEY"))
 
 from app.infrastructure.vectorstore.vectorstore import VectorStore
-
-vector_store = VectorStore(embeddings, f"{data_storage_path}/vector_storage")
+from app.infrastructure.vectorstore.numpy_vectorstore import NumpyVectorStore
+from app.infrastructure.vectorstore.store_registry import ChromaStoreRegistry
+
+# "chroma" - HNSW w Chroma, "numpy" - dokładne wyszukiwanie na macierzach per użytkownik
+vector_store_backend = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+
+if vector_store_backend == "numpy":
+    vector_store = NumpyVectorStore(
+        embeddings,
+        f"{data_storage_path}/numpy_vector_storage",
+        full_note_vectors=os.getenv("FULL_NOTE_VECTORS", "embedded"),
+        max_cached_users=int(os.getenv("NUMPY_VECTORSTORE_MAX_USERS", "256"))
+    )
+elif vector_store_backend == "chroma":
+    store_registry = ChromaStoreRegistry(embeddings)
+    vector_store = VectorStore(
+        embeddings,
+        f"{data_storage_path}/vector_storage",
+        registry=store_registry,
+        full_note_vectors=os.getenv("FULL_NOTE_VECTORS", "embedded"),
+        partitioning=os.getenv("VECTOR_PARTITIONING", "shared"),
+        partition_buckets=int(os.getenv("VECTOR_PARTITION_BUCKETS", "64"))
+    )
+else:
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {vector_store_backend}")
+
+from app.infrastructure.search.bm25_index import BM25Index
+
+search_index = BM25Index(f"{data_storage_path}/search_index.db")
+
+from app.infrastructure.jobs.sqlite_queue import SqliteJobQueue
+
+job_queue = SqliteJobQueue(f"{data_storage_path}/jobs.db")
+# BACKGROUND_JOBS=0 przywraca synchronizację w trakcie żądania
+background_jobs = os.getenv("BACKGROUND_JOBS", "1") != "0"
+# Osobny wątek na synchronizację, żeby długie klastrowanie jej nie blokowało
+job_worker_threads = int(os.getenv("JOB_WORKER_THREADS", "2"))
+# Zakończone zadania starsze niż tyle dni są usuwane z kolejki
+job_retention_days = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+recluster_quiet_seconds = float(os.getenv("RECLUSTER_QUIET_SECONDS", "10"))
+recluster_max_delay_seconds = float(os.getenv("RECLUSTER_MAX_DELAY_SECONDS", "120"))
+# Pamięć na zserializowane odpowiedzi GET /notes, /groups, /ask/answers
+response_cache_mb = int(os.getenv("RESPONSE_CACHE_MB", "256"))
 
 from app.infrastructure.clusterization.clusterizer import Clusterizer
 from app.infrastructure.clusterization.clusterizer_config import (
-    UMAPConfig, HDBSCANConfig, BERTopicConfig, VectorizerConfig, ClusterizerConfig
+    UMAPConfig, HDBSCANConfig, BERTopicConfig, VectorizerConfig, ClusterizerConfig, OnlineAssignmentConfig
 )
 
 def llm_callable(prompt: str) -> str:
@@ -76,11 +144,38 @@ bertopic_config = BERTopicConfig(
     calculate_probabilities=False,
     verbose=True
 )
+online_assignment_config = OnlineAssignmentConfig(
+    max_new_ratio=float(os.getenv("CLUSTER_MAX_NEW_RATIO", "0.25")),
+    max_outlier_ratio=float(os.getenv("CLUSTER_MAX_OUTLIER_RATIO", "0.5")),
+    min_assigned_for_outlier_check=int(os.getenv("CLUSTER_MIN_ASSIGNED_FOR_OUTLIER_CHECK", "5"))
+)
 clusterizer_config = ClusterizerConfig(
     umap_config=umap_config,
     hdbscan_config=hdbscan_config,
     vectorizer_config=vectorizer_config,
-    bertopic_config=bertopic_config
+    bertopic_config=bertopic_config,
+    online_config=online_assignment_config
 )
 
-clusterizer = Clusterizer(embeddings, clusterizer_config)
\ No newline at end of file
+from app.infrastructure.clusterization.clustering_pool import ClusteringPool
+
+# CLUSTER_WORKERS=0 - dopasowanie w procesie API, jak wcześniej
+cluster_workers = int(os.getenv("CLUSTER_WORKERS", "1"))
+clustering_pool = ClusteringPool(
+    clusterizer_config,
+    embedding_model_name,
+    max_workers=cluster_workers,
+    memory_limit_mb=int(os.getenv("CLUSTER_MEMORY_LIMIT_MB")) if os.getenv("CLUSTER_MEMORY_LIMIT_MB") else None
+) if cluster_workers > 0 else None
+
+# BERTopic rozpoznaje backend LangChain po typie modelu, więc dostaje model bazowy;
+# brakujące wektory notatek idą przez cache embeddingów
+clusterizer = Clusterizer(
+    base_embeddings,
+    clusterizer_config,
+    document_embeddings=embeddings,
+    pool=clustering_pool,
+    # Modele tematów obok wektorów, żeby restart nie wymuszał pełnego refitu
+    model_dir=f"{data_storage_path}/topic_models",
+    max_cached_users=int(os.getenv("CLUSTER_MODEL_CACHE_USERS", "32"))
+)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import dataclasses
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from bertopic import BERTopic
+
+from app.infrastructure.clusterization.clusterizer_config import ClusterizerConfig
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# --- WORKER PROCESS ---
+_worker_config: Optional[ClusterizerConfig] = None
+_worker_embedding_model = None
+
+
+def _init_worker(clusterizer_config: ClusterizerConfig, model_name: str):
+    global _worker_config, _worker_embedding_model
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_config = clusterizer_config
+    # KeyBERTInspired embeduje słowa kandydujące, więc worker potrzebuje własnej kopii modelu
+    _worker_embedding_model = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _virtual_memory_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def _memory_limit(limit_bytes: Optional[int]) -> Iterator[None]:
+    """Cap how much address space one job may add on top of the worker's baseline.
+
+    The baseline already includes the loaded embedding model, so the limit
+    applies to the fit itself. Exceeding it raises MemoryError in the job.
+    """
+    baseline = _virtual_memory_bytes() if limit_bytes and resource else None
+    if baseline is None:
+        yield
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = baseline + limit_bytes
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def _fit_job(texts: List[str], embeddings: np.ndarray, memory_limit_bytes: Optional[int]) -> Tuple[List[int], BERTopic]:
+    from app.infrastructure.clusterization.clusterizer import build_topic_model
+
+    with _memory_limit(memory_limit_bytes):
+        model = build_topic_model(_worker_config, _worker_embedding_model)
+        topics, _ = model.fit_transform(texts, embeddings=embeddings)
+
+    # Model wraca do procesu głównego bez modelu embeddingów - ten zostaje w workerze
+    model.embedding_model = None
+    return [int(topic_id) for topic_id in topics], model
+
+
+class ClusteringPool:
+    """Runs BERTopic fits in worker processes, off the API process.
+
+    Each job builds its own model from ``ClusterizerConfig``, so fits for
+    different users never share state, and UMAP/HDBSCAN CPU work runs on
+    separate cores. At most ``max_workers`` fits run at once; each may grow
+    the worker by at most ``memory_limit_mb`` (Linux only). LLM topic
+    labeling is not picklable and stays with the caller.
+    """
+
+    def __init__(
+        self,
+        clusterizer_config: ClusterizerConfig,
+        embedding_model_name: str,
+        max_workers: int = 1,
+        memory_limit_mb: Optional[int] = None
+    ):
+        # Callable LLM-a nie przejdzie przez pickle do procesu spawn
+        self.config = dataclasses.replace(
+            clusterizer_config,
+            bertopic_config=dataclasses.replace(clusterizer_config.bertopic_config, representation_model=None)
+        )
+        self.embedding_model_name = embedding_model_name
+        self.max_workers = max(1, max_workers)
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.config, self.embedding_model_name)
+                )
+            return self._pool
+
+    def fit(self, texts: List[str], embeddings: np.ndarray) -> Tuple[List[int], BERTopic]:
+        """Fit a fresh model in a worker; returns (topic per text, fitted model)."""
+        pool = self._get_pool()
+        try:
+            return pool.submit(_fit_job, texts, embeddings, self.memory_limit_bytes).result()
+        except BrokenProcessPool:
+            # Worker zabity (np. OOM killer) - następne zadanie dostanie nową pulę
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -1,56 +1,127 @@
-from typing import List
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from umap import UMAP
 from hdbscan import HDBSCAN
 from bertopic import BERTopic
+from bertopic.backend import BaseEmbedder, LangChainBackend
 import numpy as np
 from bertopic.representation import KeyBERTInspired
 from sklearn.feature_extraction.text import CountVectorizer
 
 from app.core.domain.clusterization import NoteCluster, IClusterizer
-from app.infrastructure.clusterization.clusterizer_config import ClusterizerConfig
+from app.infrastructure.clusterization.clusterizer_config import ClusterizerConfig, OnlineAssignmentConfig
 from app.infrastructure.clusterization.llm_label_adapter import LLMLabelAdapter
 from app.infrastructure.prompts.cluster_labeling_prompt import CLUSTER_NAMING_PROMPT
 
 
+def build_topic_model(clusterizer_config: ClusterizerConfig, embedding_model) -> BERTopic:
+    """Fresh, unfitted BERTopic pipeline built from the config."""
+    umap_model = UMAP(
+        n_neighbors=clusterizer_config.umap_config.n_neighbors,
+        n_components=clusterizer_config.umap_config.n_components,
+        min_dist=clusterizer_config.umap_config.min_dist, 
+        metric=clusterizer_config.umap_config.metric,
+        random_state=42
+    )
+
+    hdbscan_model = HDBSCAN(
+        min_cluster_size=clusterizer_config.hdbscan_config.min_cluster_size,
+        metric=clusterizer_config.hdbscan_config.metric, 
+        prediction_data=clusterizer_config.hdbscan_config.prediction_data,
+        approx_min_span_tree=False,
+        core_dist_n_jobs=1
+    )
+
+    vectorizer_model = CountVectorizer(
+        stop_words=clusterizer_config.vectorizer_config.stop_words,
+        ngram_range=clusterizer_config.vectorizer_config.ngram_range,
+        min_df=clusterizer_config.vectorizer_config.min_df,
+        max_df=clusterizer_config.vectorizer_config.max_df
+    )
+
+    keybert_representation = KeyBERTInspired(
+        top_n_words=clusterizer_config.bertopic_config.top_n_words
+    )
+
+    return BERTopic(
+        embedding_model=embedding_model,
+        umap_model=umap_model,
+        vectorizer_model=vectorizer_model,
+        hdbscan_model=hdbscan_model,
+        representation_model=keybert_representation,
+        min_topic_size=clusterizer_config.bertopic_config.min_topic_size,
+        calculate_probabilities=clusterizer_config.bertopic_config.calculate_probabilities,
+        verbose=clusterizer_config.bertopic_config.verbose
+    )
+
+
+@dataclass
+class _UserTopics:
+    """A user's fitted model plus what happened to their notes since the fit."""
+    model: BERTopic
+    fitted_notes: int
+    topic_groups: Dict[int, int] = field(default_factory=dict)
+    assigned: int = 0
+    outliers: int = 0
+
+    def counters(self) -> dict:
+        return {
+            "fitted_notes": self.fitted_notes,
+            # Klucze JSON są tekstowe - przy wczytaniu wracają do int
+            "topic_groups": {str(topic_id): group_id for topic_id, group_id in self.topic_groups.items()},
+            "assigned": self.assigned,
+            "outliers": self.outliers
+        }
+
+
 class Clusterizer(IClusterizer):
-    def __init__(self, embedding_model, clusterizer_config: ClusterizerConfig):
-        umap_model = UMAP(
-            n_neighbors=clusterizer_config.umap_config.n_neighbors,
-            n_components=clusterizer_config.umap_config.n_components,
-            min_dist=clusterizer_config.umap_config.min_dist, 
-            metric=clusterizer_config.umap_config.metric,
-            random_state=42
-        )
+    """BERTopic clustering with a fitted model kept per user for online assignment.
 
-        hdbscan_model = HDBSCAN(
-            min_cluster_size=clusterizer_config.hdbscan_config.min_cluster_size,
-            metric=clusterizer_config.hdbscan_config.metric, 
-            prediction_data=clusterizer_config.hdbscan_config.prediction_data,
-            approx_min_span_tree=False,
-            core_dist_n_jobs=1
-        )
+    With ``model_dir`` set, each user's model is saved there (safetensors,
+    with c-TF-IDF) together with its topic-group binding and counters, so
+    a restart does not force a full refit. A reloaded model has no UMAP /
+    HDBSCAN and assigns notes to the nearest topic embedding. At most
+    ``max_cached_users`` models stay in memory; the rest are reloaded on
+    demand.
+    """
 
-        vectorizer_model = CountVectorizer(
-            stop_words=clusterizer_config.vectorizer_config.stop_words,
-            ngram_range=clusterizer_config.vectorizer_config.ngram_range,
-            min_df=clusterizer_config.vectorizer_config.min_df,
-            max_df=clusterizer_config.vectorizer_config.max_df
+    def __init__(
+        self,
+        embedding_model,
+        clusterizer_config: ClusterizerConfig,
+        document_embeddings=None,
+        pool=None,
+        model_dir: Optional[str] = None,
+        max_cached_users: int = 32
+    ):
+        self.embedding_model = embedding_model
+        # Backend opakowujemy raz i podpinamy ten sam do modeli z puli i z dysku
+        self.embedding_backend = (
+            embedding_model if isinstance(embedding_model, BaseEmbedder) else LangChainBackend(embedding_model)
         )
+        # Do dokumentów bez zapisanego wektora - np. CachedEmbeddings, żeby trafiać w cache
+        self.document_embeddings = document_embeddings or embedding_model
+        self.config = clusterizer_config
+        self.online_config = clusterizer_config.online_config or OnlineAssignmentConfig()
+        # ClusteringPool - dopasowania w osobnych procesach; None = w bieżącym procesie
+        self.pool = pool
 
-        keybert_representation = KeyBERTInspired(
-            top_n_words=clusterizer_config.bertopic_config.top_n_words
-        )
+        # Dopasowany model per użytkownik - nowe notatki przypisujemy przez transform bez refitu
+        self._users: "OrderedDict[int, _UserTopics]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.model_dir = model_dir
+        self.max_cached_users = max(1, max_cached_users)
+        # Serializuje zapisy na dysk, żeby zapis modelu i stanu się nie przeplatały
+        self._save_lock = threading.Lock()
+        if model_dir:
+            os.makedirs(model_dir, exist_ok=True)
 
-        self.model = BERTopic(
-            embedding_model=embedding_model,
-            umap_model=umap_model,
-            vectorizer_model=vectorizer_model,
-            hdbscan_model=hdbscan_model,
-            representation_model=keybert_representation,
-            min_topic_size=clusterizer_config.bertopic_config.min_topic_size,
-            calculate_probabilities=clusterizer_config.bertopic_config.calculate_probabilities,
-            verbose=clusterizer_config.bertopic_config.verbose
-        )
+        self.model = self._build_model()
 
         self.llm_labeler = LLMLabelAdapter(
             llm_callable=clusterizer_config.bertopic_config.representation_model,
@@ -58,6 +129,104 @@ class Clusterizer(IClusterizer):
             max_docs=3
         ) if clusterizer_config.bertopic_config.representation_model else None
 
+    def _build_model(self) -> BERTopic:
+        return build_topic_model(self.config, self.embedding_backend)
+
+    def _note_embeddings(self, notes: List[NoteCluster]) -> np.ndarray:
+        """Stack precomputed note vectors, embedding only the notes that lack one."""
+        vectors = [note.embedding for note in notes]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.document_embeddings.embed_documents([notes[i].content for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return np.asarray(vectors, dtype=np.float32)
+
+    # --- MODELE UŻYTKOWNIKÓW ---
+    def _user_path(self, user_id: int) -> str:
+        return f"{self.model_dir}/user_{user_id}"
+
+    def _remember(self, user_id: int, state: _UserTopics):
+        # Wywoływane pod self._lock
+        self._users[user_id] = state
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_cached_users:
+            self._users.popitem(last=False)
+
+    def _state(self, user_id: int) -> Optional[_UserTopics]:
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is not None:
+                self._users.move_to_end(user_id)
+                return state
+        state = self._load_state(user_id)
+        if state is None:
+            return None
+        with self._lock:
+            # W międzyczasie inny wątek mógł wczytać albo dopasować model
+            current = self._users.get(user_id)
+            if current is not None:
+                return current
+            self._remember(user_id, state)
+        return state
+
+    def _load_state(self, user_id: int) -> Optional[_UserTopics]:
+        if not self.model_dir:
+            return None
+        path = self._user_path(user_id)
+        if not os.path.exists(f"{path}/state.json"):
+            return None
+        try:
+            with open(f"{path}/state.json", encoding="utf-8") as f:
+                counters = json.load(f)
+            model = BERTopic.load(path, embedding_model=self.embedding_backend)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning("Could not load topic model of user %s: %s", user_id, e)
+            return None
+        return _UserTopics(
+            model=model,
+            fitted_notes=counters["fitted_notes"],
+            topic_groups={int(topic_id): group_id for topic_id, group_id in counters["topic_groups"].items()},
+            assigned=counters["assigned"],
+            outliers=counters["outliers"]
+        )
+
+    def _write_counters(self, path: str, state: _UserTopics):
+        with self._lock:
+            counters = state.counters()
+        with open(f"{path}/state.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(counters, f)
+        os.replace(f"{path}/state.json.tmp", f"{path}/state.json")
+
+    def _save_model(self, user_id: int, state: _UserTopics):
+        if not self.model_dir:
+            return
+        path = self._user_path(user_id)
+        tmp_path = f"{path}.tmp"
+        with self._save_lock:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            state.model.save(tmp_path, serialization="safetensors", save_ctfidf=True, save_embedding_model=False)
+            self._write_counters(tmp_path, state)
+            # Katalogu nie da się podmienić atomowo; przerwanie tutaj kończy się najwyżej refitem
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+
+    def _save_counters(self, user_id: int, state: _UserTopics):
+        if not self.model_dir:
+            return
+        path = self._user_path(user_id)
+        with self._save_lock:
+            if os.path.isdir(path):
+                self._write_counters(path, state)
+
+    def _model_for(self, user_id: Optional[int]) -> BERTopic:
+        state = self._state(user_id) if user_id is not None else None
+        if state is not None:
+            return state.model
+        with self._lock:
+            return self.model
+
     def cluster_notes(self, notes: List[NoteCluster]) -> List[NoteCluster]:
         if not notes:
             return []
@@ -68,9 +237,17 @@ class Clusterizer(IClusterizer):
 
         texts = [note.content for note in notes]
 
-        topics, _ = self.model.fit_transform(texts)
+        embeddings = self._note_embeddings(notes)
+        if self.pool is not None:
+            topics, model = self.pool.fit(texts, embeddings)
+            # Worker odsyła model bez backendu embeddingów; podpinamy lokalny dla reduce_topics itp.
+            model.embedding_model = self.embedding_backend
+        else:
+            # Świeży model na każdy fit, żeby równoległe dopasowania innych użytkowników się nie nadpisywały
+            model = self._build_model()
+            topics, _ = model.fit_transform(texts, embeddings=embeddings)
 
-        info = self.model.get_topic_info()
+        info = model.get_topic_info()
         relevant_topics = info[info["Topic"] != -1]
 
         for note, topic_id in zip(notes, topics):
@@ -83,15 +260,72 @@ class Clusterizer(IClusterizer):
                 keywords=relevant_topics["Representation"].tolist()
             )
 
-            self.model.set_topic_labels(topic_labels)
+            model.set_topic_labels(topic_labels)
+
+        state = _UserTopics(model=model, fitted_notes=len(notes))
+        with self._lock:
+            self._remember(notes[0].user_id, state)
+            self.model = model
+        self._save_model(notes[0].user_id, state)
 
         return notes
 
-    def get_topic_info(self):
-        return self.model.get_topic_info()
+    def assign_notes(self, notes: List[NoteCluster]) -> Optional[List[NoteCluster]]:
+        if not notes:
+            return []
+
+        user_id = notes[0].user_id
+        state = self._state(user_id)
+        if state is None:
+            return None
+
+        # transform -> HDBSCAN approximate_predict na modelu z ostatniego fitu
+        topics, _ = state.model.transform(
+            [note.content for note in notes],
+            embeddings=self._note_embeddings(notes)
+        )
+
+        for note, topic_id in zip(notes, topics):
+            note.cluster_id = int(topic_id)
 
-    def get_pretty_topic_labels(self):
-        info = self.model.get_topic_info()
+        with self._lock:
+            state.assigned += len(notes)
+            state.outliers += sum(1 for topic_id in topics if topic_id == -1)
+        self._save_counters(user_id, state)
+
+        return notes
+
+    def needs_refit(self, user_id: int) -> bool:
+        state = self._state(user_id)
+        with self._lock:
+            if state is None or not state.topic_groups:
+                return True
+            config = self.online_config
+            if state.assigned > config.max_new_ratio * state.fitted_notes:
+                return True
+            return (
+                state.assigned >= config.min_assigned_for_outlier_check
+                and state.outliers > config.max_outlier_ratio * state.assigned
+            )
+
+    def bind_topic_groups(self, user_id: int, topic_groups: Dict[int, int]):
+        state = self._state(user_id)
+        if state is None:
+            return
+        with self._lock:
+            state.topic_groups = dict(topic_groups)
+        self._save_counters(user_id, state)
+
+    def get_topic_groups(self, user_id: int) -> Dict[int, int]:
+        state = self._state(user_id)
+        with self._lock:
+            return dict(state.topic_groups) if state else {}
+
+    def get_topic_info(self, user_id: Optional[int] = None):
+        return self._model_for(user_id).get_topic_info()
+
+    def get_pretty_topic_labels(self, user_id: Optional[int] = None):
+        info = self._model_for(user_id).get_topic_info()
         
         if "CustomName" in info.columns:
             info['Name'] = info['CustomName'].map(lambda x: x[0] if isinstance(x, list) else x)
@@ -100,10 +334,15 @@ class Clusterizer(IClusterizer):
 
     def reduce_topics(self, notes: List[NoteCluster], nr_topics: int):
         texts = [note.content for note in notes]
-        self.model.reduce_topics(texts, nr_topics=nr_topics)
+        model = self._model_for(notes[0].user_id if notes else None)
+        model.reduce_topics(texts, nr_topics=nr_topics)
         
-        new_topics = self.model.topics_
+        new_topics = model.topics_
         for note, topic_id in zip(notes, new_topics):
             note.cluster_id = int(topic_id)
         
-        return notes
\ No newline at end of file
+        return notes
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from pydantic import Field
 from langchain_google_genai import ChatGoogleGenerativeAI
-from typing import Tuple
+from typing import Optional, Tuple
 
 @dataclass
 class UMAPConfig:
@@ -31,9 +31,19 @@ class BERTopicConfig:
     calculate_probabilities: bool = Field(default=False)
     verbose: bool = Field(default=True)
 
+@dataclass
+class OnlineAssignmentConfig:
+    # Refit once notes assigned since the last fit exceed this fraction of the fitted corpus
+    max_new_ratio: float = 0.25
+    # ...or once this fraction of them landed in the outlier topic
+    max_outlier_ratio: float = 0.5
+    # Outlier ratio is only trusted after this many assignments
+    min_assigned_for_outlier_check: int = 5
+
 @dataclass
 class ClusterizerConfig:
     umap_config: UMAPConfig
     hdbscan_config: HDBSCANConfig
     vectorizer_config: VectorizerConfig
-    bertopic_config: BERTopicConfig
\ No newline at end of file
+    bertopic_config: BERTopicConfig
+    online_config: Optional[OnlineAssignmentConfig] = None
\ No newline at end of file
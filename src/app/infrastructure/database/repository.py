@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker, Session
-from typing import List, Optional, Type, Any, Callable
+import dataclasses
+from sqlalchemy import create_engine, select, insert, update, delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker, Session, load_only, selectinload
+from typing import Dict, List, Optional, Sequence, Tuple, Type, Any, Callable
 
-from app.core.domain.database import UserDB, NoteDB, GroupDB, AnswerDB
+from app.core.domain.database import UserDB, NoteDB, GroupDB, GroupSummaryDB, AnswerDB
 from app.core.domain.database import INoteRepository
 from app.infrastructure.database.models import User, Group, Note, Answer
 
@@ -53,49 +55,136 @@ class AppRepository(INoteRepository):
                 session.flush()
                 return group.id
 
+    @staticmethod
+    def _group_with_notes():
+        # Notatki wszystkich grup jednym dodatkowym SELECT ... IN, bez kolumny references (JSON)
+        return select(Group).options(
+            load_only(Group.id, Group.user_id, Group.summary),
+            selectinload(Group.notes).load_only(
+                Note.id, Note.title, Note.content, Note.user_id, Note.group_id,
+                Note.created_at, Note.updated_at
+            )
+        )
+
+    @staticmethod
+    def _group_to_db(group: Group) -> GroupDB:
+        notes = [
+            NoteDB(
+                id=n.id,
+                title=n.title,
+                content=n.content,
+                user_id=n.user_id,
+                group_id=n.group_id,
+                created_at=n.created_at,
+                updated_at=n.updated_at
+            )
+            for n in sorted(group.notes, key=lambda n: n.id)
+        ]
+        return GroupDB(id=group.id, user_id=group.user_id, summary=group.summary, notes=notes)
+
     def get_group(self, group_id: int) -> Optional[GroupDB]:
         with self._get_session() as session:
-            # Używamy selectinload, aby pobrać notatki od razu w jednej sesji
-            group = session.get(Group, group_id)
-            if group:
-                # Mapowanie robimy WEWNĄTRZ sesji
-                notes_domain = [
-                    NoteDB(
-                        id=n.id, 
-                        title=n.title, 
-                        content=n.content, 
-                        user_id=n.user_id, 
-                        group_id=n.group_id,
-                        references=n.references
-                    ) 
-                    for n in group.notes
-                ]
-                return GroupDB(id=group.id, user_id=group.user_id, 
-                               summary=group.summary, notes=notes_domain)
-            return None
+            group = session.scalars(self._group_with_notes().where(Group.id == group_id)).first()
+            return self._group_to_db(group) if group else None
 
     def get_groups_by_user(self, user_id: int) -> List[GroupDB]:
         with self._get_session() as session:
-            stmt = select(Group).where(Group.user_id == user_id)
-            groups = session.scalars(stmt).all()
-            
-            results = []
-            for g in groups:
-                # Najpierw wyciągamy notatki, póki sesja trwa
-                notes = [
-                    NoteDB(
-                        id=n.id, 
-                        title=n.title, 
-                        content=n.content, 
-                        user_id=n.user_id, 
-                        group_id=n.group_id,
-                        references=n.references
-                    ) 
-                    for n in g.notes
-                ]
-                results.append(GroupDB(id=g.id, user_id=g.user_id, 
-                                       summary=g.summary, notes=notes))
-            return results
+            stmt = self._group_with_notes().where(Group.user_id == user_id).order_by(Group.id)
+            return [self._group_to_db(g) for g in session.scalars(stmt)]
+
+    def get_group_summaries(self, user_id: int) -> List[GroupSummaryDB]:
+        """Groups of the user with note counts, from one aggregate query."""
+        stmt = (
+            select(Group.id, Group.user_id, Group.summary, func.count(Note.id))
+            .outerjoin(Note, Note.group_id == Group.id)
+            .where(Group.user_id == user_id)
+            .group_by(Group.id)
+            .order_by(Group.id)
+        )
+        with self._get_session() as session:
+            return [
+                GroupSummaryDB(id=group_id, user_id=owner_id, summary=summary, note_count=note_count)
+                for group_id, owner_id, summary, note_count in session.execute(stmt)
+            ]
+
+    def _bulk_create_groups(self, session: Session, groups: List[GroupDB]) -> List[int]:
+        if not groups:
+            return []
+        stmt = insert(Group).returning(Group.id, sort_by_parameter_order=True)
+        return list(session.scalars(
+            stmt,
+            [{"user_id": g.user_id, "summary": g.summary} for g in groups]
+        ))
+
+    def _bulk_assign_groups(self, session: Session, assignments: Dict[int, Optional[int]]):
+        if not assignments:
+            return
+        # ORM bulk UPDATE po kluczu głównym - jeden executemany zamiast sesji na notatkę
+        session.execute(
+            update(Note),
+            [{"id": note_id, "group_id": group_id} for note_id, group_id in assignments.items()]
+        )
+
+    def _clear_user_groups(self, session: Session, user_id: int):
+        # Najpierw odpinamy notatki, żeby nie wisiały na usuniętych grupach
+        session.execute(
+            update(Note)
+            .where(Note.user_id == user_id, Note.group_id.is_not(None))
+            .values(group_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(
+            delete(Group)
+            .where(Group.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    def bulk_assign_groups(self, assignments: Dict[int, Optional[int]]) -> None:
+        """Sets group_id for many notes (note ID -> group ID or None) in one statement."""
+        with self._get_session() as session:
+            with session.begin():
+                self._bulk_assign_groups(session, assignments)
+
+    def apply_group_changes(
+        self,
+        user_id: int,
+        new_groups: List[GroupDB],
+        assignments: Dict[int, Optional[int]],
+        retired_group_ids: List[int]
+    ) -> List[int]:
+        """Applies a regrouping diff in one transaction.
+
+        Creates ``new_groups`` (assigning the note IDs in ``GroupDB.notes``),
+        applies ``assignments`` (note ID -> existing group ID or None) and
+        deletes the retired groups, ungrouping any notes still in them.
+        Returns the new group IDs in input order.
+        """
+        with self._get_session() as session:
+            with session.begin():
+                group_ids = self._bulk_create_groups(session, new_groups)
+                members = {
+                    note_id: group_id
+                    for group, group_id in zip(new_groups, group_ids)
+                    for note_id in group.notes
+                }
+                self._bulk_assign_groups(session, {**assignments, **members})
+                if retired_group_ids:
+                    session.execute(
+                        update(Note)
+                        .where(Note.group_id.in_(retired_group_ids))
+                        .values(group_id=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                    session.execute(
+                        delete(Group)
+                        .where(Group.user_id == user_id, Group.id.in_(retired_group_ids))
+                        .execution_options(synchronize_session=False)
+                    )
+                return group_ids
+
+    def get_group_ids_by_user(self, user_id: int) -> List[int]:
+        with self._get_session() as session:
+            return list(session.scalars(select(Group.id).where(Group.user_id == user_id)))
 
     def update_group(self, group_db: GroupDB) -> Optional[int]:
         if group_db.id is None:
@@ -118,6 +207,86 @@ class AppRepository(INoteRepository):
                 session.flush()
                 return note.id
 
+    @staticmethod
+    def _note_row(note_db: NoteDB) -> dict:
+        return {
+            "title": note_db.title,
+            "content": note_db.content,
+            "user_id": note_db.user_id,
+            "group_id": note_db.group_id,
+            "references": note_db.references
+        }
+
+    @staticmethod
+    def _note_to_db(note: Note) -> NoteDB:
+        return NoteDB(
+            id=note.id,
+            title=note.title,
+            content=note.content,
+            user_id=note.user_id,
+            group_id=note.group_id,
+            references=note.references,
+            created_at=note.created_at,
+            updated_at=note.updated_at
+        )
+
+    @staticmethod
+    def _validate_note(note_db: NoteDB) -> Optional[str]:
+        # SQLite nie pilnuje długości kolumn, więc sprawdzamy to przed wstawieniem.
+        # Pusty tytuł jest dozwolony, tak jak przy create_note
+        if note_db.title is None:
+            return "Title is required"
+        if len(note_db.title) > Note.title.type.length:
+            return f"Title longer than {Note.title.type.length} characters"
+        if note_db.content is None:
+            return "Content is required"
+        return None
+
+    def create_notes_bulk(self, notes: List[NoteDB]) -> Tuple[List[Tuple[int, NoteDB]], List[Tuple[int, str]]]:
+        """Inserts many notes in one transaction with INSERT ... RETURNING.
+
+        Invalid rows are rejected up front. If the batch still fails, rows
+        are retried one transaction each so a single bad row cannot sink
+        the rest.
+
+        Returns:
+            (created, failed) where created lists (input index, stored note)
+            and failed lists (input index, error message)
+        """
+        created: List[Tuple[int, NoteDB]] = []
+        failed: List[Tuple[int, str]] = []
+        valid: List[Tuple[int, NoteDB]] = []
+        for i, note_db in enumerate(notes):
+            error = self._validate_note(note_db)
+            if error:
+                failed.append((i, error))
+            else:
+                valid.append((i, note_db))
+        if not valid:
+            return created, failed
+
+        stmt = insert(Note).returning(Note, sort_by_parameter_order=True)
+        try:
+            with self._get_session() as session:
+                with session.begin():
+                    rows = session.scalars(stmt, [self._note_row(note_db) for _, note_db in valid]).all()
+                    created = [(i, self._note_to_db(note)) for (i, _), note in zip(valid, rows)]
+            return created, failed
+        except SQLAlchemyError:
+            pass
+
+        # Partia nie przeszła - szukamy winnych wiersz po wierszu
+        for i, note_db in valid:
+            try:
+                with self._get_session() as session:
+                    with session.begin():
+                        note = session.scalars(stmt, [self._note_row(note_db)]).one()
+                        created.append((i, self._note_to_db(note)))
+            except SQLAlchemyError as e:
+                failed.append((i, str(e.orig) if getattr(e, "orig", None) else str(e)))
+        failed.sort()
+        return created, failed
+
     def get_note(self, note_id: int) -> Optional[NoteDB]:
         with self._get_session() as session:
             note = session.get(Note, note_id)
@@ -134,6 +303,62 @@ class AppRepository(INoteRepository):
                 )
             return None
 
+    # Poniżej domyślnego limitu zmiennych SQLite w jednym zapytaniu
+    _IN_BATCH_SIZE = 500
+
+    def get_notes_by_ids(self, note_ids: List[int], user_id: int) -> List[NoteDB]:
+        """Loads the user's notes among ``note_ids`` with one SELECT ... IN per 500 IDs.
+
+        IDs that do not exist or belong to another user are skipped. The
+        result is ordered by note ID, not by the order of ``note_ids``.
+        """
+        ids = sorted(set(note_ids))
+        results = []
+        with self._get_session() as session:
+            for start in range(0, len(ids), self._IN_BATCH_SIZE):
+                stmt = (
+                    select(Note)
+                    .where(Note.id.in_(ids[start:start + self._IN_BATCH_SIZE]), Note.user_id == user_id)
+                    .order_by(Note.id)
+                )
+                results.extend(self._note_to_db(n) for n in session.scalars(stmt))
+        return results
+
+    @staticmethod
+    def _projection(model: Type[Any], key_fields: Sequence[str], fields: Optional[Sequence[str]]) -> list:
+        # Kolumny klucza zawsze, reszta tylko na życzenie - content/references nie są czytane z bazy
+        if fields is None:
+            return list(model.__table__.columns)
+        names = list(key_fields) + [name for name in fields if name not in key_fields]
+        return [getattr(model, name).label(name) for name in names]
+
+    @staticmethod
+    def _row_to_dataclass(cls: Type[Any], row) -> Any:
+        values = row._mapping
+        return cls(**{field.name: values.get(field.name) for field in dataclasses.fields(cls)})
+
+    def get_notes_page(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[NoteDB]:
+        """Keyset page of the user's notes ordered by ID.
+
+        Only ``id`` and the listed ``fields`` are selected; the remaining
+        NoteDB attributes are None. All columns are loaded when ``fields``
+        is None.
+        """
+        stmt = select(*self._projection(Note, ("id",), fields)).where(Note.user_id == user_id)
+        if after_id is not None:
+            stmt = stmt.where(Note.id > after_id)
+        stmt = stmt.order_by(Note.id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        with self._get_session() as session:
+            return [self._row_to_dataclass(NoteDB, row) for row in session.execute(stmt)]
+
     def get_notes_by_user(self, user_id: int) -> List[NoteDB]:
         with self._get_session() as session:
             stmt = select(Note).where(Note.user_id == user_id).order_by(Note.id)
@@ -171,10 +396,7 @@ class AppRepository(INoteRepository):
         """Deletes all groups belonging to a user."""
         with self._get_session() as session:
             with session.begin():
-                stmt = select(Group).where(Group.user_id == user_id)
-                groups = session.scalars(stmt).all()
-                for group in groups:
-                    session.delete(group)
+                self._clear_user_groups(session, user_id)
                 return True
 
     def delete_note(self, note_id: int) -> bool:
@@ -244,6 +466,29 @@ class AppRepository(INoteRepository):
                 )
             return None
 
+    def get_answers_page(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        before_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[AnswerDB]:
+        """Keyset page of the user's answers, newest first.
+
+        Pages by ``id``, which follows insertion order: ``created_at`` is
+        stored by SQLite as text with second precision and does not compare
+        reliably with bound datetimes. ``before_id`` is the ID of the last
+        answer of the previous page. Projection works as in get_notes_page.
+        """
+        stmt = select(*self._projection(Answer, ("id", "created_at"), fields)).where(Answer.user_id == user_id)
+        if before_id is not None:
+            stmt = stmt.where(Answer.id < before_id)
+        stmt = stmt.order_by(Answer.id.desc())
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        with self._get_session() as session:
+            return [self._row_to_dataclass(AnswerDB, row) for row in session.execute(stmt)]
+
     def get_answers_by_user(self, user_id: int) -> List[AnswerDB]:
         with self._get_session() as session:
             stmt = select(Answer).where(Answer.user_id == user_id).order_by(Answer.created_at.desc())
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.infrastructure.embeddings.query_cache import QueryEmbeddingCache
+
+
+class CachedEmbeddings(Embeddings):
+    """Persistent, size-bounded embedding cache in front of another model.
+
+    Document vectors are stored in SQLite keyed by (model name, SHA-256 of
+    the text), so re-syncing a note whose text did not change never reaches
+    the underlying model. When the cache grows past ``max_entries`` the least
+    recently used rows are evicted. Query vectors are not persisted; they go
+    through the optional in-process ``query_cache`` instead.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        db_path: str,
+        max_entries: int = 200_000,
+        query_cache: Optional[QueryEmbeddingCache] = None
+    ):
+        self.embeddings = embeddings
+        self.query_cache = query_cache
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (last_used)"
+            )
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            # SQLite ogranicza liczbę parametrów, więc pytamy w paczkach
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *batch]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embedding_cache SET last_used = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                        [now, self.model_name, *batch]
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = [
+            (self.model_name, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text_hash, vector in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._size += len(rows)
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Usuwamy z zapasem 10%, żeby nie sprzątać przy każdym zapisie
+        target = int(self.max_entries * 0.9)
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        excess = self._size - target
+        if excess <= 0:
+            return
+        self._conn.execute(
+            """
+            DELETE FROM embedding_cache WHERE rowid IN (
+                SELECT rowid FROM embedding_cache ORDER BY last_used ASC LIMIT ?
+            )
+            """,
+            (excess,)
+        )
+        self._size -= excess
+        self.evictions += excess
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        hashes = [self._hash(text) for text in texts]
+        cached = self._lookup(list(set(hashes)))
+
+        missing: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+
+        self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+        self.misses += sum(1 for h in hashes if h in missing)
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self.embeddings.embed_query(text)
+
+        vector = self.query_cache.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.query_cache.put(text, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending all cache misses to the model in one batch."""
+        vectors: List[Optional[List[float]]] = [
+            self.query_cache.get(text) if self.query_cache else None
+            for text in texts
+        ]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                if self.query_cache:
+                    self.query_cache.put(texts[i], vector)
+        return vectors
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "documents": self._document_stats(),
+            "queries": self.query_cache.stats() if self.query_cache else {}
+        }
+
+    def _document_stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self._size,
+            "max_entries": self.max_entries
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
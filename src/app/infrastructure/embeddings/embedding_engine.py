@@ -0,0 +1,158 @@
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class _ProgressTracker:
+    """Accumulates progress over every embedding call made inside one context."""
+
+    def __init__(self, callback: ProgressCallback):
+        self.callback = callback
+        self.done = 0
+        self.total = 0
+
+    def expect(self, count: int):
+        self.total += count
+
+    def advance(self, count: int):
+        self.done += count
+        self.callback(self.done, self.total)
+
+
+_progress: ContextVar[Optional[_ProgressTracker]] = ContextVar("embedding_progress", default=None)
+
+
+@contextmanager
+def embedding_progress(callback: Optional[ProgressCallback]) -> Iterator[None]:
+    """Report ``callback(done, total)`` for texts embedded inside the block.
+
+    Counts are cumulative across all embedding calls made in the block by
+    the current thread, and only include texts that actually reach the model.
+    """
+    if callback is None:
+        yield
+        return
+    token = _progress.set(_ProgressTracker(callback))
+    try:
+        yield
+    finally:
+        _progress.reset(token)
+
+
+# --- WORKER PROCESS ---
+_worker_model: Optional[Embeddings] = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_model.embed_documents(texts)
+
+
+class EmbeddingEngine(Embeddings):
+    """Batched document embedding with an optional pool of worker processes.
+
+    Texts are sorted by length before batching so each batch pads to a
+    similar length. With ``num_workers > 1`` batches are spread over worker
+    processes that each load their own copy of the model; at most
+    ``max_pending_batches`` are in flight, which bounds memory for very
+    large imports. Queries always run in-process on ``embeddings``.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        batch_size: int = 32,
+        num_workers: int = 0,
+        max_pending_batches: Optional[int] = None
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.num_workers = num_workers
+        self.max_pending_batches = max_pending_batches or max(1, num_workers) * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn, bo fork procesu z załadowanym torchem potrafi się zakleszczyć
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name,)
+                )
+            return self._pool
+
+    def _batches(self, texts: List[str]) -> List[List[int]]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        return [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        tracker = _progress.get()
+        if tracker:
+            tracker.expect(len(texts))
+
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        batches = self._batches(texts)
+
+        if self.num_workers <= 1:
+            for batch in batches:
+                vectors = self.embeddings.embed_documents([texts[i] for i in batch])
+                for i, vector in zip(batch, vectors):
+                    results[i] = vector
+                if tracker:
+                    tracker.advance(len(batch))
+            return results
+
+        pool = self._get_pool()
+        pending: Dict[Future, List[int]] = {}
+        remaining = iter(batches)
+
+        def submit_next() -> bool:
+            batch = next(remaining, None)
+            if batch is None:
+                return False
+            pending[pool.submit(_embed_batch, [texts[i] for i in batch])] = batch
+            return True
+
+        while len(pending) < self.max_pending_batches and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                for i, vector in zip(batch, future.result()):
+                    results[i] = vector
+                if tracker:
+                    tracker.advance(len(batch))
+                submit_next()
+
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,251 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.jobs import IJobQueue, Job, JobStatus
+
+
+class SqliteJobQueue(IJobQueue):
+    """Durable job queue in a local SQLite file.
+
+    Claiming runs in a ``BEGIN IMMEDIATE`` transaction, so several threads
+    or processes can share one file without taking the same job twice.
+    Claimed jobs hold a lease; when the process dies mid-job the lease runs
+    out and the job becomes claimable again.
+    """
+
+    _columns = (
+        "id, kind, user_id, payload, status, attempts, max_attempts, dedupe_key, "
+        "last_error, run_after, created_at, updated_at, finished_at"
+    )
+
+    def __init__(self, db_path: str, lease_seconds: float = 900.0):
+        self.lease_seconds = lease_seconds
+        self._enqueue_callbacks: List[Callable[[], None]] = []
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # isolation_level=None - transakcje otwieramy sami, żeby claim był atomowy
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    dedupe_key TEXT,
+                    last_error TEXT,
+                    run_after REAL NOT NULL,
+                    locked_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, run_after);
+                CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, status);
+                CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (status, finished_at);
+                """
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _to_datetime(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value) if value is not None else None
+
+    def _row_to_job(self, row: tuple) -> Job:
+        (job_id, kind, user_id, payload, status, attempts, max_attempts, dedupe_key,
+         last_error, run_after, created_at, updated_at, finished_at) = row
+        return Job(
+            id=job_id,
+            kind=kind,
+            user_id=user_id,
+            payload=json.loads(payload),
+            status=status,
+            attempts=attempts,
+            max_attempts=max_attempts,
+            dedupe_key=dedupe_key,
+            last_error=last_error,
+            run_after=self._to_datetime(run_after),
+            created_at=self._to_datetime(created_at),
+            updated_at=self._to_datetime(updated_at),
+            finished_at=self._to_datetime(finished_at)
+        )
+
+    def _fetch(self, conn: sqlite3.Connection, job_id: int) -> Optional[Job]:
+        row = conn.execute(f"SELECT {self._columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def enqueue(
+        self,
+        kind: str,
+        user_id: int,
+        payload: Optional[Dict[str, Any]] = None,
+        dedupe_key: Optional[str] = None,
+        max_attempts: int = 5,
+        delay_seconds: float = 0.0,
+        max_delay_seconds: Optional[float] = None
+    ) -> Job:
+        job = self._insert_or_debounce(kind, user_id, payload, dedupe_key, max_attempts, delay_seconds, max_delay_seconds)
+        # Po commicie - obudzony worker musi już widzieć zadanie
+        for callback in self._enqueue_callbacks:
+            callback()
+        return job
+
+    def _insert_or_debounce(
+        self,
+        kind: str,
+        user_id: int,
+        payload: Optional[Dict[str, Any]],
+        dedupe_key: Optional[str],
+        max_attempts: int,
+        delay_seconds: float,
+        max_delay_seconds: Optional[float]
+    ) -> Job:
+        now = time.time()
+        with self._transaction() as conn:
+            if dedupe_key is not None:
+                row = conn.execute(
+                    f"SELECT {self._columns} FROM jobs WHERE dedupe_key = ? AND status = ? ORDER BY id DESC LIMIT 1",
+                    (dedupe_key, JobStatus.PENDING)
+                ).fetchone()
+                if row:
+                    job_id, run_after, created_at = row[0], row[9], row[10]
+                    new_run_after = max(run_after, now + delay_seconds)
+                    if max_delay_seconds is not None:
+                        new_run_after = min(new_run_after, created_at + max_delay_seconds)
+                    if new_run_after != run_after:
+                        conn.execute(
+                            "UPDATE jobs SET run_after = ?, updated_at = ? WHERE id = ?",
+                            (new_run_after, now, job_id)
+                        )
+                    return self._fetch(conn, job_id)
+
+            cursor = conn.execute(
+                """
+                INSERT INTO jobs (kind, user_id, payload, status, max_attempts, dedupe_key,
+                                  run_after, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (kind, user_id, json.dumps(payload or {}), JobStatus.PENDING, max_attempts,
+                 dedupe_key, now + delay_seconds, now, now)
+            )
+            return self._fetch(conn, cursor.lastrowid)
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._fetch(self._conn, job_id)
+
+    def get_latest_by_dedupe_key(self, dedupe_key: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._columns} FROM jobs WHERE dedupe_key = ? ORDER BY id DESC LIMIT 1",
+                (dedupe_key,)
+            ).fetchone()
+            return self._row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Job]:
+        now = time.time()
+        with self._transaction() as conn:
+            # Wygasły lease przy wyczerpanych próbach - proces padł przy ostatniej próbie
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, last_error = 'Lease expired', updated_at = ?, finished_at = ?
+                WHERE status = ? AND locked_until < ? AND attempts >= max_attempts
+                """,
+                (JobStatus.FAILED, now, now, JobStatus.RUNNING, now)
+            )
+            row = conn.execute(
+                """
+                SELECT id FROM jobs AS j
+                WHERE ((j.status = ? AND j.run_after <= ?) OR (j.status = ? AND j.locked_until < ?))
+                  AND (j.dedupe_key IS NULL OR NOT EXISTS (
+                      SELECT 1 FROM jobs AS r
+                      WHERE r.dedupe_key = j.dedupe_key AND r.id != j.id
+                        AND r.status = ? AND r.locked_until >= ?
+                  ))
+                ORDER BY j.run_after, j.id LIMIT 1
+                """,
+                (JobStatus.PENDING, now, JobStatus.RUNNING, now, JobStatus.RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, attempts = attempts + 1, locked_until = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (JobStatus.RUNNING, now + self.lease_seconds, now, row[0])
+            )
+            return self._fetch(conn, row[0])
+
+    def complete(self, job_id: int, attempt: int) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            # Warunek na attempts - worker, któremu wygasł lease, nie nadpisze nowszej próby
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = ?, last_error = NULL, locked_until = NULL, updated_at = ?, finished_at = ?
+                WHERE id = ? AND status = ? AND attempts = ?
+                """,
+                (JobStatus.SUCCEEDED, now, now, job_id, JobStatus.RUNNING, attempt)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, attempt: int, error: str, retry_in_seconds: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            if retry_in_seconds is None:
+                cursor = conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, last_error = ?, locked_until = NULL, updated_at = ?, finished_at = ?
+                    WHERE id = ? AND status = ? AND attempts = ?
+                    """,
+                    (JobStatus.FAILED, error, now, now, job_id, JobStatus.RUNNING, attempt)
+                )
+            else:
+                cursor = conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, last_error = ?, locked_until = NULL, run_after = ?, updated_at = ?
+                    WHERE id = ? AND status = ? AND attempts = ?
+                    """,
+                    (JobStatus.PENDING, error, now + retry_in_seconds, now, job_id, JobStatus.RUNNING, attempt)
+                )
+            return cursor.rowcount == 1
+
+    def on_enqueue(self, callback: Callable[[], None]):
+        self._enqueue_callbacks.append(callback)
+
+    def prune(self, older_than_seconds: float) -> int:
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JobStatus.SUCCEEDED, JobStatus.FAILED, cutoff)
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
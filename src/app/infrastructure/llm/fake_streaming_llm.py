@@ -0,0 +1,70 @@
+import re
+import time
+from typing import Iterator, List, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class _FakeStructuredLLM:
+    def __init__(self, llm: "FakeStreamingLLM", schema):
+        self._llm = llm
+        self._schema = schema
+
+    def invoke(self, prompt: str):
+        title, answer = self._llm.compose(prompt)
+        return self._schema(title=title, answer=answer)
+
+
+class FakeStreamingLLM:
+    """Deterministic stand-in for the chat model, for tests and offline runs.
+
+    Answers by quoting the numbered context chunks of the prompt with
+    citations, so citation handling can be exercised end to end. Supports
+    ``invoke``, ``stream`` (word by word, optionally delayed) and
+    ``with_structured_output``, which is all the app uses.
+    """
+
+    _CHUNK = re.compile(r"^\[(\d+)\] (.*)$", re.MULTILINE)
+    _QUESTION = re.compile(r"^Question: (.*)$", re.MULTILINE)
+
+    def __init__(self, token_delay: float = 0.0, words_per_source: int = 12):
+        self.token_delay = token_delay
+        self.words_per_source = words_per_source
+
+    def compose(self, prompt: str) -> Tuple[str, str]:
+        question = self._QUESTION.search(prompt)
+        question = question.group(1).strip() if question else ""
+        title = " ".join(question.split()[:10]) or "Answer"
+        sentences = [
+            f"{' '.join(text.split()[:self.words_per_source])} [{number}]."
+            for number, text in self._CHUNK.findall(prompt)
+        ]
+        answer = " ".join(sentences) if sentences else "The provided context does not answer this question."
+        return title, answer
+
+    def _render(self, prompt: str) -> str:
+        title, answer = self.compose(prompt)
+        # Prompt strumieniowy oczekuje tytułu w pierwszej linii
+        if "First line: \"Title: \"" in prompt:
+            return f"Title: {title}\n\n{answer}"
+        return answer
+
+    def invoke(self, prompt: str) -> AIMessage:
+        if isinstance(prompt, str) and not self._CHUNK.search(prompt):
+            # Np. etykietowanie tematów w klasteryzacji
+            return AIMessage(content=" ".join(prompt.split()[:3]) or "Topic")
+        return AIMessage(content=self._render(prompt))
+
+    def stream(self, prompt: str) -> Iterator[AIMessageChunk]:
+        for token in self._tokens(self._render(prompt)):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        # Słowa razem z białymi znakami, żeby złączone tokeny odtwarzały tekst 1:1
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def with_structured_output(self, schema) -> _FakeStructuredLLM:
+        return _FakeStructuredLLM(self, schema)
@@ -31,3 +31,11 @@ Instructions:
 
 Provide your answer with citations."""
 
+# Streaming variant: structured output cannot be streamed, so the title goes on the first line
+ANSWER_STREAM_PROMPT_TEMPLATE = ANSWER_PROMPT_TEMPLATE.replace(
+    "Provide your answer with citations.",
+    "Output format:\n"
+    "- First line: \"Title: \" followed by the title\n"
+    "- Then a blank line\n"
+    "- Then the answer text with citations, as plain text without any other headings"
+)
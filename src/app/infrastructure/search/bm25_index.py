@@ -0,0 +1,179 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.core.domain.search import ISearchIndex, LexicalHit
+
+
+class BM25Index(ISearchIndex):
+    """Per-user BM25 inverted index over note chunks, stored in SQLite.
+
+    Notes are split with the same splitter settings as the vector store so
+    lexical and semantic hits point at comparable chunks. Postings are kept
+    per (user, term), which makes a lookup touch only the querying user's
+    documents and needs no embedding forward pass.
+    """
+
+    _token_pattern = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(
+        self,
+        db_path: str,
+        splitter: Optional[RecursiveCharacterTextSplitter] = None,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        self.k1 = k1
+        self.b = b
+        self.splitter = splitter or RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=180
+        )
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS bm25_docs (
+                    doc_id TEXT PRIMARY KEY,
+                    note_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_bm25_docs_note ON bm25_docs (note_id);
+                CREATE INDEX IF NOT EXISTS idx_bm25_docs_user ON bm25_docs (user_id);
+
+                CREATE TABLE IF NOT EXISTS bm25_postings (
+                    user_id INTEGER NOT NULL,
+                    term TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_bm25_postings_doc ON bm25_postings (doc_id);
+
+                CREATE TABLE IF NOT EXISTS bm25_indexed_users (
+                    user_id INTEGER PRIMARY KEY
+                );
+                """
+            )
+            self._conn.commit()
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return cls._token_pattern.findall(text.casefold())
+
+    def _delete_note(self, note_id: int):
+        self._conn.execute(
+            "DELETE FROM bm25_postings WHERE doc_id IN (SELECT doc_id FROM bm25_docs WHERE note_id = ?)",
+            (note_id,)
+        )
+        self._conn.execute("DELETE FROM bm25_docs WHERE note_id = ?", (note_id,))
+
+    def index_note(self, note_id: int, user_id: int, content: str):
+        docs = []
+        postings = []
+        for chunk_id, chunk in enumerate(self.splitter.split_text(content or "")):
+            doc_id = f"{note_id}_chunk_{chunk_id}"
+            terms = Counter(self.tokenize(chunk))
+            docs.append((doc_id, note_id, user_id, chunk_id, sum(terms.values()), chunk))
+            postings.extend((user_id, term, doc_id, tf) for term, tf in terms.items())
+
+        with self._lock:
+            self._delete_note(note_id)
+            self._conn.executemany(
+                "INSERT INTO bm25_docs (doc_id, note_id, user_id, chunk_id, length, content) VALUES (?, ?, ?, ?, ?, ?)",
+                docs
+            )
+            self._conn.executemany(
+                "INSERT INTO bm25_postings (user_id, term, doc_id, tf) VALUES (?, ?, ?, ?)",
+                postings
+            )
+            self._conn.commit()
+
+    def remove_note(self, note_id: int):
+        with self._lock:
+            self._delete_note(note_id)
+            self._conn.commit()
+
+    def search(self, query: str, user_id: int, k: int = 10) -> List[LexicalHit]:
+        terms = list(dict.fromkeys(self.tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count, avg_length = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM bm25_docs WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+            if not doc_count:
+                return []
+            avg_length = avg_length or 1.0
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                rows = self._conn.execute(
+                    """
+                    SELECT p.doc_id, p.tf, d.length FROM bm25_postings p
+                    JOIN bm25_docs d ON d.doc_id = p.doc_id
+                    WHERE p.user_id = ? AND p.term = ?
+                    """,
+                    (user_id, term)
+                ).fetchall()
+                if not rows:
+                    continue
+                df = len(rows)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc_id, tf, length in rows:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            if not scores:
+                return []
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            placeholders = ",".join("?" * len(top))
+            rows = self._conn.execute(
+                f"SELECT doc_id, note_id, chunk_id, content FROM bm25_docs WHERE doc_id IN ({placeholders})",
+                [doc_id for doc_id, _ in top]
+            ).fetchall()
+
+        by_id = {doc_id: (note_id, chunk_id, content) for doc_id, note_id, chunk_id, content in rows}
+        return [
+            LexicalHit(
+                note_id=by_id[doc_id][0],
+                user_id=user_id,
+                chunk_id=by_id[doc_id][1],
+                content=by_id[doc_id][2],
+                score=score
+            )
+            for doc_id, score in top
+            if doc_id in by_id
+        ]
+
+    def is_user_indexed(self, user_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM bm25_indexed_users WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+            return row is not None
+
+    def mark_user_indexed(self, user_id: int):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO bm25_indexed_users (user_id) VALUES (?)", (user_id,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
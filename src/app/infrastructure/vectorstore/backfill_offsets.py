@@ -0,0 +1,22 @@
+"""Record chunk start/end offsets for chunks stored before they were tracked.
+
+Works with whichever backend ``VECTOR_STORE_BACKEND`` selects. Only
+metadata is rewritten; nothing is re-embedded. Run from the ``src``
+directory::
+
+    python -m app.infrastructure.vectorstore.backfill_offsets
+"""
+
+import logging
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    from app.infrastructure.bootstrap import vector_store
+
+    updated = vector_store.backfill_chunk_offsets()
+    logging.getLogger(__name__).info(f"Backfilled offsets for {updated} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_text_splitters import TextSplitter
+
+
+@dataclass
+class ChunkPlan:
+    """Minimal set of changes turning a note's stored chunks into new ones.
+
+    ``keep`` maps an existing chunk ID to its position in the new split,
+    ``add`` lists (chunk ID, position, text) triples that need embedding and
+    ``delete`` lists chunk IDs that no longer occur in the note.
+    """
+    keep: Dict[str, int] = field(default_factory=dict)
+    add: List[Tuple[str, int, str]] = field(default_factory=list)
+    delete: List[str] = field(default_factory=list)
+
+
+def chunk_id_for(note_id: int, position: int) -> str:
+    return f"{note_id}_chunk_{position}"
+
+
+def locate_chunks(text: str, chunks: List[str]) -> List[Tuple[int, int]]:
+    """Character (start, end) offsets of consecutive chunks within ``text``.
+
+    Splitter chunks are substrings of the text in order, and with overlap
+    each one starts after the previous start, so one forward ``find`` per
+    chunk is enough. A chunk that cannot be found gets (-1, -1).
+    """
+    offsets = []
+    search_from = 0
+    for chunk in chunks:
+        start = text.find(chunk, search_from)
+        if start == -1:
+            start = text.find(chunk)
+        if start == -1:
+            offsets.append((-1, -1))
+            continue
+        offsets.append((start, start + len(chunk)))
+        search_from = start + 1
+    return offsets
+
+
+def split_with_offsets(splitter: TextSplitter, text: str) -> List[Tuple[str, int, int]]:
+    """Split ``text`` and return (chunk, start_index, end_index) triples."""
+    chunks = splitter.split_text(text)
+    return [(chunk, start, end) for chunk, (start, end) in zip(chunks, locate_chunks(text, chunks))]
+
+
+def plan_chunk_update(note_id: int, existing: Dict[str, str], new_chunks: List[str]) -> ChunkPlan:
+    """Diff stored chunks (ID -> text) against a fresh split of the note.
+
+    Chunks whose text is unchanged keep their ID and embedding, even if they
+    moved to another position. New IDs follow the ``{note_id}_chunk_{i}``
+    scheme and fall back to the next free suffix when ``i`` is taken.
+    """
+    plan = ChunkPlan()
+
+    by_text: Dict[str, List[str]] = {}
+    for chunk_id, text in existing.items():
+        by_text.setdefault(text, []).append(chunk_id)
+
+    unmatched: List[Tuple[int, str]] = []
+    for position, text in enumerate(new_chunks):
+        candidates = by_text.get(text)
+        if not candidates:
+            unmatched.append((position, text))
+            continue
+        # Preferujemy ID, które już wskazuje na tę pozycję
+        preferred = chunk_id_for(note_id, position)
+        chunk_id = preferred if preferred in candidates else candidates[0]
+        candidates.remove(chunk_id)
+        plan.keep[chunk_id] = position
+
+    plan.delete = [chunk_id for chunk_id in existing if chunk_id not in plan.keep]
+
+    taken = set(plan.keep)
+    next_free = 0
+    for position, text in unmatched:
+        chunk_id = chunk_id_for(note_id, position)
+        if chunk_id in taken:
+            while chunk_id_for(note_id, next_free) in taken:
+                next_free += 1
+            chunk_id = chunk_id_for(note_id, next_free)
+        taken.add(chunk_id)
+        plan.add.append((chunk_id, position, text))
+
+    return plan
+
+
+def pool_chunk_embeddings(embeddings: List[List[float]], texts: List[str]) -> List[float]:
+    """Length-weighted mean of chunk vectors, rescaled to their mean norm.
+
+    Longer chunks carry more of the note, so they get proportionally more
+    weight. Rescaling keeps pooled vectors comparable with ones produced by
+    the model directly (averaging shortens vectors that point apart).
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    weights = np.asarray([max(len(text), 1) for text in texts], dtype=np.float32)
+
+    pooled = (vectors * weights[:, None]).sum(axis=0) / weights.sum()
+    norm = np.linalg.norm(pooled)
+    if norm > 0:
+        pooled *= np.linalg.norm(vectors, axis=1).mean() / norm
+    return pooled.tolist()
@@ -0,0 +1,99 @@
+"""Copy vectors from the shared collections into per-user partitions.
+
+Vectors, documents and metadata are copied as-is, so nothing is
+re-embedded. Run from the ``src`` directory, e.g.::
+
+    python -m app.infrastructure.vectorstore.migrate_partitions --mode user
+    python -m app.infrastructure.vectorstore.migrate_partitions --mode bucket --buckets 64 --drop-source
+"""
+
+import argparse
+import logging
+from typing import Dict
+
+import chromadb
+
+from app.infrastructure.vectorstore.vectorstore import (
+    CHUNKS_COLLECTION,
+    FULL_NOTES_COLLECTION,
+    partition_collection_name,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_collection(path: str, base: str, mode: str, buckets: int, page_size: int = 1000, drop_source: bool = False) -> Dict[str, int]:
+    """Copy every record of ``base`` into its partition collection.
+
+    Returns the number of records written to each target collection.
+    """
+    client = chromadb.PersistentClient(path=path)
+    names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    if base not in names:
+        logger.info(f"No shared collection {base} in {path}, nothing to migrate")
+        return {}
+
+    source = client.get_collection(base)
+    targets = {}
+    written: Dict[str, int] = {}
+    offset = 0
+    while True:
+        page = source.get(
+            limit=page_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if not page["ids"]:
+            break
+
+        routed = {}
+        for record_id, embedding, document, metadata in zip(
+            page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+        ):
+            name = partition_collection_name(base, int(metadata["user_id"]), mode, buckets)
+            batch = routed.setdefault(name, {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+            batch["ids"].append(record_id)
+            batch["embeddings"].append(embedding)
+            batch["documents"].append(document)
+            batch["metadatas"].append(metadata)
+
+        for name, batch in routed.items():
+            if name not in targets:
+                targets[name] = client.get_or_create_collection(name)
+            targets[name].upsert(**batch)
+            written[name] = written.get(name, 0) + len(batch["ids"])
+
+        offset += len(page["ids"])
+        logger.info(f"{base}: migrated {offset} records")
+
+    if drop_source:
+        client.delete_collection(base)
+        logger.info(f"Dropped shared collection {base}")
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-path", default="./data_storage/vector_storage")
+    parser.add_argument("--mode", choices=["user", "bucket"], required=True)
+    parser.add_argument("--buckets", type=int, default=64)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--drop-source", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for directory, base in (("full_notes", FULL_NOTES_COLLECTION), ("chunks", CHUNKS_COLLECTION)):
+        written = migrate_collection(
+            f"{args.db_path}/{directory}",
+            base,
+            args.mode,
+            args.buckets,
+            page_size=args.page_size,
+            drop_source=args.drop_source
+        )
+        logger.info(f"{base}: {sum(written.values())} records in {len(written)} partitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.core.domain.vectorstore import NoteVS, IVectorStore
+from app.infrastructure.embeddings.embedding_engine import embedding_progress
+from app.infrastructure.vectorstore.chunking import (
+    locate_chunks, plan_chunk_update, pool_chunk_embeddings, split_with_offsets
+)
+
+
+class _UserMatrix:
+    """Contiguous float32 matrix of one user's vectors with id/offset arrays.
+
+    Rows are addressed through ``offsets`` (record ID -> row). Deletes
+    compact the matrix, so a search is always a single matrix-vector product
+    over exactly the user's records.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.offsets: Dict[str, int] = {}
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], texts: List[str], metadatas: List[dict]):
+        new_rows = np.asarray(vectors, dtype=np.float32)
+        appended = []
+        for i, record_id in enumerate(ids):
+            row = self.offsets.get(record_id)
+            if row is None:
+                appended.append(i)
+                continue
+            self.vectors[row] = new_rows[i]
+            self.norms[row] = np.linalg.norm(new_rows[i])
+            self.texts[row] = texts[i]
+            self.metadatas[row] = metadatas[i]
+
+        if not appended:
+            return
+        if len(self) == 0:
+            self.vectors = np.zeros((0, new_rows.shape[1]), dtype=np.float32)
+        for i in appended:
+            self.offsets[ids[i]] = len(self.ids)
+            self.ids.append(ids[i])
+            self.texts.append(texts[i])
+            self.metadatas.append(metadatas[i])
+        added = new_rows[appended]
+        self.vectors = np.vstack([self.vectors, added])
+        self.norms = np.concatenate([self.norms, np.linalg.norm(added, axis=1)])
+
+    def update_metadata(self, record_id: str, metadata: dict):
+        self.metadatas[self.offsets[record_id]] = metadata
+
+    def delete(self, ids: List[str]):
+        rows = [self.offsets[record_id] for record_id in ids if record_id in self.offsets]
+        if not rows:
+            return
+        keep = np.ones(len(self), dtype=bool)
+        keep[rows] = False
+        self.vectors = self.vectors[keep]
+        self.norms = self.norms[keep]
+        self.ids = [record_id for record_id, k in zip(self.ids, keep) if k]
+        self.texts = [text for text, k in zip(self.texts, keep) if k]
+        self.metadatas = [metadata for metadata, k in zip(self.metadatas, keep) if k]
+        self.offsets = {record_id: row for row, record_id in enumerate(self.ids)}
+
+    def rows_where(self, key: str, values: set) -> List[int]:
+        return [row for row, metadata in enumerate(self.metadatas) if metadata.get(key) in values]
+
+    @staticmethod
+    def _relevance(cosine: float) -> float:
+        # Skala Chromy (langchain l2): 1 - d/√2, gdzie d = 2 - 2cos to kwadrat odległości L2
+        return 1.0 - (2.0 - 2.0 * cosine) / math.sqrt(2)
+
+    def top_k(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Exact cosine top-k via one matrix-vector product and argpartition.
+
+        Scores are mapped onto the Chroma backend's l2 relevance scale, so
+        thresholds mean the same with either store.
+        """
+        if len(self) == 0:
+            return []
+        query_norm = np.linalg.norm(query)
+        scores = (self.vectors @ query) / np.maximum(self.norms * query_norm, 1e-12)
+        k = min(k, len(self))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), self._relevance(float(scores[row]))) for row in top]
+
+    def top_k_many(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """Top-k for a batch of queries via one matrix-matrix product; scores as in top_k."""
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+        query_norms = np.linalg.norm(queries, axis=1)
+        scores = (self.vectors @ queries.T) / np.maximum(self.norms[:, None] * query_norms[None, :], 1e-12)
+        k = min(k, len(self))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for column in range(scores.shape[1]):
+            rows = top[:, column]
+            rows = rows[np.argsort(-scores[rows, column])]
+            results.append([(int(row), self._relevance(float(scores[row, column]))) for row in rows])
+        return results
+
+    # --- PERSISTENCE ---
+    def save(self, base_path: str):
+        """Write the whole matrix with its IDs, texts and metadata as one ``.npz`` file.
+
+        A single ``os.replace`` swaps the file in, so a crash leaves either
+        the old or the new version, never vectors and metadata out of step.
+        """
+        tmp_path = f"{base_path}.tmp.npz"
+        meta = json.dumps({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas})
+        with open(tmp_path, "wb") as f:
+            np.savez(f, vectors=self.vectors, meta=np.array(meta))
+        os.replace(tmp_path, f"{base_path}.npz")
+        # Stary format (.npy + .json) jest już nieaktualny
+        for legacy_path in (f"{base_path}.npy", f"{base_path}.json"):
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+    @classmethod
+    def load(cls, base_path: str) -> "_UserMatrix":
+        matrix = cls()
+        if os.path.exists(f"{base_path}.npz"):
+            with np.load(f"{base_path}.npz", allow_pickle=False) as stored:
+                matrix.vectors = stored["vectors"]
+                data = json.loads(str(stored["meta"]))
+        elif os.path.exists(f"{base_path}.npy"):
+            # Format sprzed przejścia na .npz - przepisywany przy następnym zapisie
+            matrix.vectors = np.load(f"{base_path}.npy")
+            with open(f"{base_path}.json", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            return matrix
+        matrix.ids = data["ids"]
+        matrix.texts = data["texts"]
+        matrix.metadatas = data["metadatas"]
+        matrix.offsets = {record_id: row for row, record_id in enumerate(matrix.ids)}
+        matrix.norms = np.linalg.norm(matrix.vectors, axis=1).astype(np.float32) if len(matrix.ids) else np.zeros(0, dtype=np.float32)
+        return matrix
+
+
+class NumpyVectorStore(IVectorStore):
+    """Exact-search vector store keeping per-user matrices in memory.
+
+    For users with a few thousand chunks a brute-force matrix-vector product
+    is faster than HNSW with a metadata filter and has perfect recall.
+    Each user's full-note and chunk matrices are persisted as one ``.npz``
+    file each (vectors plus IDs, texts and metadata) under ``db_path`` and
+    loaded lazily on first access. Every write rewrites the affected user's
+    whole file, which is fine at the few-thousand-chunk scale this store is
+    meant for. At most ``max_cached_users`` users are kept in memory; the
+    least recently used are dropped and reloaded from disk when needed.
+    Relevance scores are on the Chroma backend's scale (see ``_UserMatrix.top_k``).
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        db_path: str = "./numpy_vector_storage",
+        full_note_vectors: str = "embedded",
+        max_cached_users: int = 256
+    ):
+        self.embeddings = embeddings
+        self.db_path = db_path
+        if full_note_vectors not in ("embedded", "pooled"):
+            raise ValueError(f"Unknown full_note_vectors mode: {full_note_vectors}")
+        self.full_note_vectors = full_note_vectors
+        self.full_notes_dir = f"{db_path}/full_notes"
+        self.chunked_notes_dir = f"{db_path}/chunks"
+        os.makedirs(self.full_notes_dir, exist_ok=True)
+        os.makedirs(self.chunked_notes_dir, exist_ok=True)
+
+        self.max_cached_users = max(1, max_cached_users)
+        self._full: "OrderedDict[int, _UserMatrix]" = OrderedDict()
+        self._chunks: "OrderedDict[int, _UserMatrix]" = OrderedDict()
+        # _lock chroni macierze (krótko), _write_lock serializuje zapisujących na czas embedowania
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()
+
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=180
+        )
+
+    # --- MACIERZE UŻYTKOWNIKÓW ---
+    def _path(self, directory: str, user_id: int) -> str:
+        return f"{directory}/user_{user_id}"
+
+    def _cached_matrix(self, cache: "OrderedDict[int, _UserMatrix]", directory: str, user_id: int) -> _UserMatrix:
+        # Każdy zapis od razu trafia na dysk, więc wyrzucenie macierzy z pamięci niczego nie gubi
+        matrix = cache.get(user_id)
+        if matrix is None:
+            matrix = _UserMatrix.load(self._path(directory, user_id))
+            cache[user_id] = matrix
+            while len(cache) > self.max_cached_users:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(user_id)
+        return matrix
+
+    def _full_matrix(self, user_id: int) -> _UserMatrix:
+        return self._cached_matrix(self._full, self.full_notes_dir, user_id)
+
+    def _chunk_matrix(self, user_id: int) -> _UserMatrix:
+        return self._cached_matrix(self._chunks, self.chunked_notes_dir, user_id)
+
+    def _group_by_user(self, notes: List[NoteVS]) -> Dict[int, List[NoteVS]]:
+        groups = {}
+        for note in notes:
+            groups.setdefault(note.user_id, []).append(note)
+        return groups
+
+    def _user_ids_on_disk(self) -> List[int]:
+        user_ids = set()
+        for directory in (self.full_notes_dir, self.chunked_notes_dir):
+            for name in os.listdir(directory):
+                stem, extension = os.path.splitext(name)
+                if stem.startswith("user_") and extension in (".npz", ".npy") and ".tmp" not in stem:
+                    user_ids.add(int(stem[len("user_"):]))
+        return sorted(user_ids)
+
+    def warm_up(self):
+        with self._lock:
+            # Nie więcej niż zmieści cache - reszta doładuje się przy pierwszym dostępie
+            for user_id in self._user_ids_on_disk()[:self.max_cached_users]:
+                self._full_matrix(user_id)
+                self._chunk_matrix(user_id)
+
+    def close(self):
+        with self._lock:
+            self._full.clear()
+            self._chunks.clear()
+
+    # --- ZAPIS ---
+    def upsert_notes(self, notes: List[NoteVS], progress_callback: Optional[Callable[[int, int], None]] = None):
+        with embedding_progress(progress_callback):
+            if self.full_note_vectors == "pooled":
+                self.upsert_chunked_notes(notes)
+                self._upsert_pooled_full_notes(notes)
+            else:
+                super().upsert_notes(notes)
+
+    def upsert_full_notes(self, notes: List[NoteVS]):
+        if self.full_note_vectors == "pooled":
+            self._upsert_pooled_full_notes(notes)
+            return
+        if not notes:
+            return
+
+        vectors = self.embeddings.embed_documents([note.content or "" for note in notes])
+        vector_by_note = {note.id: vector for note, vector in zip(notes, vectors)}
+        with self._write_lock, self._lock:
+            for user_id, user_notes in self._group_by_user(notes).items():
+                self._write_full_notes(user_id, user_notes, [vector_by_note[note.id] for note in user_notes])
+
+    def _write_full_notes(self, user_id: int, notes: List[NoteVS], vectors: List[List[float]]):
+        matrix = self._full_matrix(user_id)
+        matrix.upsert(
+            ids=[str(note.id) for note in notes],
+            vectors=vectors,
+            texts=[note.content or "" for note in notes],
+            metadatas=[{"user_id": note.user_id} for note in notes]
+        )
+        matrix.save(self._path(self.full_notes_dir, user_id))
+
+    def _upsert_pooled_full_notes(self, notes: List[NoteVS]):
+        with self._write_lock, self._lock:
+            for user_id, user_notes in self._group_by_user(notes).items():
+                chunks = self._chunk_matrix(user_id)
+                rows_by_note = {}
+                for row in chunks.rows_where("parent_note_id", {note.id for note in user_notes}):
+                    rows_by_note.setdefault(chunks.metadatas[row]["parent_note_id"], []).append(row)
+
+                unchunked = [note for note in user_notes if note.id not in rows_by_note]
+                vectors = {}
+                if unchunked:
+                    # Notatki bez chunków (np. pusta treść) embedujemy w całości
+                    embedded = self.embeddings.embed_documents([note.content or "" for note in unchunked])
+                    vectors.update({note.id: vector for note, vector in zip(unchunked, embedded)})
+                for note_id, rows in rows_by_note.items():
+                    vectors[note_id] = pool_chunk_embeddings(
+                        chunks.vectors[rows],
+                        [chunks.texts[row] for row in rows]
+                    )
+                self._write_full_notes(user_id, user_notes, [vectors[note.id] for note in user_notes])
+
+    def _chunk_metadata(self, note: NoteVS, position: int, start_index: int, end_index: int) -> dict:
+        return {
+            "parent_note_id": note.id,
+            "chunk_id": position,
+            "user_id": note.user_id,
+            "start_index": start_index,
+            "end_index": end_index
+        }
+
+    @staticmethod
+    def _chunk_from_row(matrix: _UserMatrix, row: int, with_embedding: bool) -> NoteVS:
+        metadata = matrix.metadatas[row]
+        start_index = metadata.get("start_index")
+        end_index = metadata.get("end_index")
+        if start_index is None or start_index < 0:
+            start_index = end_index = None
+        return NoteVS(
+            id=int(metadata["parent_note_id"]),
+            user_id=int(metadata["user_id"]),
+            chunk_id=int(metadata["chunk_id"]),
+            content=matrix.texts[row],
+            embedding=matrix.vectors[row].tolist() if with_embedding else None,
+            start_index=start_index,
+            end_index=end_index
+        )
+
+    def upsert_chunked_notes(self, notes: List[NoteVS]):
+        """Diff each note's chunks and embed only the ones whose text changed."""
+        with self._write_lock:
+            for user_id, user_notes in self._group_by_user(notes).items():
+                with self._lock:
+                    matrix = self._chunk_matrix(user_id)
+                    delete_ids = []
+                    metadata_updates = []
+                    add = []
+                    for note in user_notes:
+                        rows = matrix.rows_where("parent_note_id", {note.id})
+                        existing = {matrix.ids[row]: matrix.texts[row] for row in rows}
+                        chunks = split_with_offsets(self.splitter, note.content or "")
+                        plan = plan_chunk_update(note.id, existing, [text for text, _, _ in chunks])
+
+                        delete_ids.extend(plan.delete)
+                        for chunk_id, position in plan.keep.items():
+                            metadata_updates.append((chunk_id, self._chunk_metadata(note, position, *chunks[position][1:])))
+                        for chunk_id, position, text in plan.add:
+                            add.append((chunk_id, text, self._chunk_metadata(note, position, *chunks[position][1:])))
+
+                # Embedujemy poza blokadą odczytu, żeby wyszukiwanie nie czekało na model
+                vectors = self.embeddings.embed_documents([text for _, text, _ in add]) if add else []
+
+                with self._lock:
+                    # Macierz mogła wypaść z cache w trakcie embedowania; zapisujący są
+                    # serializowani, więc ponownie wczytana kopia ma tę samą treść
+                    matrix = self._chunk_matrix(user_id)
+                    matrix.delete(delete_ids)
+                    for chunk_id, metadata in metadata_updates:
+                        matrix.update_metadata(chunk_id, metadata)
+                    if add:
+                        matrix.upsert(
+                            ids=[chunk_id for chunk_id, _, _ in add],
+                            vectors=vectors,
+                            texts=[text for _, text, _ in add],
+                            metadatas=[metadata for _, _, metadata in add]
+                        )
+                    matrix.save(self._path(self.chunked_notes_dir, user_id))
+
+    def delete_note(self, note_id: int, user_id: Optional[int] = None):
+        with self._write_lock, self._lock:
+            user_ids = [user_id] if user_id is not None else self._user_ids_on_disk()
+            for uid in user_ids:
+                full = self._full_matrix(uid)
+                if str(note_id) in full.offsets:
+                    full.delete([str(note_id)])
+                    full.save(self._path(self.full_notes_dir, uid))
+
+                chunks = self._chunk_matrix(uid)
+                rows = chunks.rows_where("parent_note_id", {note_id})
+                if rows:
+                    chunks.delete([chunks.ids[row] for row in rows])
+                    chunks.save(self._path(self.chunked_notes_dir, uid))
+
+    # --- ODCZYT ---
+    def get_full_notes(self, user_id: int) -> List[NoteVS]:
+        with self._lock:
+            matrix = self._full_matrix(user_id)
+            return [
+                NoteVS(
+                    id=int(matrix.ids[row]),
+                    user_id=user_id,
+                    chunk_id=None,
+                    content=matrix.texts[row],
+                    embedding=matrix.vectors[row].tolist()
+                )
+                for row in range(len(matrix))
+            ]
+
+    def get_chunked_notes(self, user_id: int) -> List[NoteVS]:
+        with self._lock:
+            matrix = self._chunk_matrix(user_id)
+            return [self._chunk_from_row(matrix, row, with_embedding=True) for row in range(len(matrix))]
+
+    def _best_chunks_per_note(self, matrix: _UserMatrix, hits: List[Tuple[int, float]], threshold: float) -> List[Tuple[NoteVS, float]]:
+        best_chunks_map = {}
+        for row, score in hits:
+            if score < threshold:
+                continue
+            metadata = matrix.metadatas[row]
+            note_id = int(metadata["parent_note_id"])
+            if note_id not in best_chunks_map or score > best_chunks_map[note_id][1]:
+                best_chunks_map[note_id] = (self._chunk_from_row(matrix, row, with_embedding=False), score)
+        return sorted(best_chunks_map.values(), key=lambda x: x[1], reverse=True)
+
+    def retrieve_chunks(self, query: str, user_id: int, k: int = 10, threshold: float = 0.7) -> List[Tuple[NoteVS, float]]:
+        query_vector = np.asarray(self.embeddings.embed_query(f"query: {query}"), dtype=np.float32)
+
+        with self._lock:
+            matrix = self._chunk_matrix(user_id)
+            return self._best_chunks_per_note(matrix, matrix.top_k(query_vector, k), threshold)
+
+    def retrieve_chunks_many(
+        self,
+        queries: List[str],
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.7
+    ) -> List[List[Tuple[NoteVS, float]]]:
+        if not queries:
+            return []
+
+        texts = [f"query: {query}" for query in queries]
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        vectors = embed_queries(texts) if embed_queries else self.embeddings.embed_documents(texts)
+        query_matrix = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            matrix = self._chunk_matrix(user_id)
+            return [
+                self._best_chunks_per_note(matrix, hits, threshold)
+                for hits in matrix.top_k_many(query_matrix, k)
+            ]
+
+    def backfill_chunk_offsets(self) -> int:
+        """Add start/end offsets to chunks stored before they were recorded."""
+        updated = 0
+        with self._write_lock, self._lock:
+            for user_id in self._user_ids_on_disk():
+                chunks = self._chunk_matrix(user_id)
+                full = self._full_matrix(user_id)
+
+                missing = {}
+                for row, metadata in enumerate(chunks.metadatas):
+                    if "start_index" not in metadata:
+                        missing.setdefault(metadata["parent_note_id"], []).append(row)
+                if not missing:
+                    continue
+
+                for note_id, rows in missing.items():
+                    rows.sort(key=lambda row: chunks.metadatas[row]["chunk_id"])
+                    parent_row = full.offsets.get(str(note_id))
+                    text = full.texts[parent_row] if parent_row is not None else ""
+                    positions = locate_chunks(text, [chunks.texts[row] for row in rows])
+                    for row, (start_index, end_index) in zip(rows, positions):
+                        chunks.metadatas[row] = {**chunks.metadatas[row], "start_index": start_index, "end_index": end_index}
+                        updated += 1
+                chunks.save(self._path(self.chunked_notes_dir, user_id))
+        return updated
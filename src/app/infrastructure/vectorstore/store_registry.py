@@ -0,0 +1,82 @@
+import threading
+from typing import Dict, List, Tuple
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+
+class ChromaStoreRegistry:
+    """Process-wide registry of open Chroma clients and collection handles.
+
+    Each persist directory gets exactly one ``PersistentClient`` and each
+    (directory, collection) pair exactly one ``Chroma`` wrapper, so the
+    SQLite/HNSW files are opened once per process instead of on every call.
+    Handles are safe to share between threads; creation is guarded by a lock.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._clients: Dict[str, chromadb.ClientAPI] = {}
+        self._stores: Dict[Tuple[str, str], Chroma] = {}
+        self._collections: Dict[Tuple[str, str], chromadb.Collection] = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self, path: str) -> chromadb.ClientAPI:
+        client = self._clients.get(path)
+        if client is None:
+            client = chromadb.PersistentClient(path=path)
+            self._clients[path] = client
+        return client
+
+    def get_client(self, path: str) -> chromadb.ClientAPI:
+        with self._lock:
+            return self._get_client(path)
+
+    def get_store(self, path: str, collection: str) -> Chroma:
+        key = (path, collection)
+        store = self._stores.get(key)
+        if store is not None:
+            return store
+
+        with self._lock:
+            # Inny wątek mógł utworzyć uchwyt, zanim dostaliśmy lock
+            store = self._stores.get(key)
+            if store is None:
+                store = Chroma(
+                    client=self._get_client(path),
+                    embedding_function=self.embeddings,
+                    collection_name=collection
+                )
+                self._stores[key] = store
+            return store
+
+    def get_collection(self, path: str, collection: str) -> chromadb.Collection:
+        """Raw Chroma collection, for writes that must not re-embed documents."""
+        key = (path, collection)
+        handle = self._collections.get(key)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            handle = self._collections.get(key)
+            if handle is None:
+                handle = self._get_client(path).get_or_create_collection(collection)
+                self._collections[key] = handle
+            return handle
+
+    def warm_up(self, collections: List[Tuple[str, str]]):
+        """Open the given (path, collection) pairs ahead of the first request."""
+        for path, collection in collections:
+            self.get_store(path, collection)
+
+    def close(self):
+        """Drop all handles and release the underlying Chroma systems."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._stores.clear()
+            self._collections.clear()
+            self._clients.clear()
+        if clients:
+            # Chroma keeps one shared system per path; clearing the cache stops them all
+            clients[0].clear_system_cache()
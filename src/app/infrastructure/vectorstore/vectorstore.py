@@ -1,16 +1,73 @@
-from typing import List, Tuple
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from app.core.domain.vectorstore import NoteVS, IVectorStore
+from app.infrastructure.vectorstore.store_registry import ChromaStoreRegistry
+from app.infrastructure.embeddings.embedding_engine import embedding_progress
+from app.infrastructure.vectorstore.chunking import (
+    chunk_id_for, locate_chunks, plan_chunk_update, pool_chunk_embeddings, split_with_offsets
+)
+
+FULL_NOTES_COLLECTION = "full_notes"
+CHUNKS_COLLECTION = "note_chunks"
+PARTITIONING_MODES = ("shared", "user", "bucket")
+
+
+def partition_collection_name(base: str, user_id: int, partitioning: str, buckets: int) -> str:
+    """Name of the collection holding ``user_id``'s vectors under a partitioning mode."""
+    if partitioning == "user":
+        return f"{base}_user_{user_id}"
+    if partitioning == "bucket":
+        return f"{base}_bucket_{user_id % buckets}"
+    return base
+
+
+def relevance_from_distance(distance: float, space: str = "l2") -> float:
+    """Map a Chroma distance to the relevance score langchain_chroma reports.
+
+    ``space`` is the collection's ``hnsw:space`` (Chroma defaults to l2).
+    """
+    if space == "l2":
+        return 1.0 - distance / math.sqrt(2)
+    if space == "cosine":
+        return 1.0 - distance
+    if space == "ip":
+        return 1.0 - distance if distance > 0 else -distance
+    raise ValueError(f"Unknown distance space: {space}")
+
 
 class VectorStore(IVectorStore):
-    def __init__(self, embeddings: HuggingFaceEmbeddings, db_path: str = "./vector_storage"):
+    def __init__(
+        self,
+        embeddings: HuggingFaceEmbeddings,
+        db_path: str = "./vector_storage",
+        registry: Optional[ChromaStoreRegistry] = None,
+        incremental_chunks: bool = True,
+        full_note_vectors: str = "embedded",
+        partitioning: str = "shared",
+        partition_buckets: int = 64
+    ):
         self.db_path = db_path
         self.embeddings = embeddings
         self.full_notes_dir = f"{db_path}/full_notes"
         self.chunked_notes_dir = f"{db_path}/chunks"
+        self.registry = registry or ChromaStoreRegistry(embeddings)
+        self.incremental_chunks = incremental_chunks
+        # "embedded" - osobny forward pass dla całej notatki, "pooled" - średnia z chunków
+        if full_note_vectors not in ("embedded", "pooled"):
+            raise ValueError(f"Unknown full_note_vectors mode: {full_note_vectors}")
+        self.full_note_vectors = full_note_vectors
+        # "shared" - wspólne kolekcje, "user" - kolekcja na użytkownika, "bucket" - na kubełek hasha
+        if partitioning not in PARTITIONING_MODES:
+            raise ValueError(f"Unknown partitioning mode: {partitioning}")
+        self.partitioning = partitioning
+        self.partition_buckets = partition_buckets
+        # Serializuje zapisy, żeby delete + add chunków jednej notatki były atomowe
+        self._write_lock = threading.RLock()
         
         # Konfiguracja splittera dla drugiego vectorstore
         self.splitter = RecursiveCharacterTextSplitter(
@@ -19,23 +76,63 @@ class VectorStore(IVectorStore):
         )
 
     def _get_store(self, path: str, collection: str) -> Chroma:
-        try:
-            store = Chroma(
-                persist_directory=path,
-                embedding_function=self.embeddings,
-                collection_name=collection
-            )
-            return store
-        except Exception as e:
-            raise
+        return self.registry.get_store(path, collection)
+
+    # --- PARTYCJONOWANIE ---
+    def _full_collection(self, user_id: int) -> str:
+        return partition_collection_name(FULL_NOTES_COLLECTION, user_id, self.partitioning, self.partition_buckets)
+
+    def _chunk_collection(self, user_id: int) -> str:
+        return partition_collection_name(CHUNKS_COLLECTION, user_id, self.partitioning, self.partition_buckets)
+
+    def _user_filter(self, user_id: int) -> Optional[dict]:
+        # Kolekcja per użytkownik zawiera tylko jego dane, więc filtr jest zbędny
+        return None if self.partitioning == "user" else {"user_id": user_id}
+
+    def _group_by_user(self, notes: List[NoteVS]) -> Dict[int, List[NoteVS]]:
+        groups = {}
+        for note in notes:
+            groups.setdefault(note.user_id, []).append(note)
+        return groups
+
+    def _existing_collections(self, path: str, base: str) -> List[str]:
+        if self.partitioning == "shared":
+            return [base]
+        names = [
+            c if isinstance(c, str) else c.name
+            for c in self.registry.get_client(path).list_collections()
+        ]
+        return [name for name in names if name.startswith(f"{base}_")]
+
+    def warm_up(self):
+        self.registry.warm_up(
+            [(self.full_notes_dir, name) for name in self._existing_collections(self.full_notes_dir, FULL_NOTES_COLLECTION)]
+            + [(self.chunked_notes_dir, name) for name in self._existing_collections(self.chunked_notes_dir, CHUNKS_COLLECTION)]
+        )
+
+    def close(self):
+        self.registry.close()
+
+    def upsert_notes(self, notes: List[NoteVS], progress_callback: Optional[Callable[[int, int], None]] = None):
+        with embedding_progress(progress_callback):
+            if self.full_note_vectors == "pooled":
+                # Chunki muszą być zapisane pierwsze, bo z nich liczymy wektor notatki
+                self.upsert_chunked_notes(notes)
+                self._upsert_pooled_full_notes(notes)
+            else:
+                super().upsert_notes(notes)
 
     # --- VECTORSTORE 1: PEŁNE NOTATKI ---
     def upsert_full_notes(self, notes: List[NoteVS]):
-        try:
-            store = self._get_store(self.full_notes_dir, "full_notes")
+        if self.full_note_vectors == "pooled":
+            self._upsert_pooled_full_notes(notes)
+            return
+
+        for user_id, user_notes in self._group_by_user(notes).items():
+            store = self._get_store(self.full_notes_dir, self._full_collection(user_id))
             docs = []
             ids = []
-            for note in notes:
+            for note in user_notes:
                 doc = Document(
                     page_content=note.content or "",
                     metadata={"user_id": note.user_id}
@@ -43,14 +140,50 @@ class VectorStore(IVectorStore):
                 docs.append(doc)
                 note_id_str = str(note.id) if note.id is not None else None
                 ids.append(note_id_str)
-            store.add_documents(documents=docs, ids=ids)
-        except Exception as e:
-            raise
+            with self._write_lock:
+                store.add_documents(documents=docs, ids=ids)
+
+    def _upsert_pooled_full_notes(self, notes: List[NoteVS]):
+        """Write full-note vectors pooled from the note's stored chunk vectors."""
+        for user_id, user_notes in self._group_by_user(notes).items():
+            self._upsert_pooled_user_notes(user_id, user_notes)
+
+    def _upsert_pooled_user_notes(self, user_id: int, notes: List[NoteVS]):
+        chunk_collection = self.registry.get_collection(self.chunked_notes_dir, self._chunk_collection(user_id))
+        full_collection = self.registry.get_collection(self.full_notes_dir, self._full_collection(user_id))
+
+        stored = chunk_collection.get(
+            where={"parent_note_id": {"$in": [note.id for note in notes]}},
+            include=["embeddings", "documents", "metadatas"]
+        )
+        chunks_by_note = {}
+        for embedding, text, metadata in zip(stored["embeddings"], stored["documents"], stored["metadatas"]):
+            chunks_by_note.setdefault(int(metadata["parent_note_id"]), []).append((embedding, text))
+
+        vectors = {}
+        unchunked = [note for note in notes if note.id not in chunks_by_note]
+        if unchunked:
+            # Notatki bez chunków (np. pusta treść) embedujemy w całości
+            for note, vector in zip(unchunked, self.embeddings.embed_documents([n.content or "" for n in unchunked])):
+                vectors[note.id] = vector
+        for note_id, chunks in chunks_by_note.items():
+            vectors[note_id] = pool_chunk_embeddings(
+                [embedding for embedding, _ in chunks],
+                [text for _, text in chunks]
+            )
+
+        with self._write_lock:
+            full_collection.upsert(
+                ids=[str(note.id) for note in notes],
+                embeddings=[vectors[note.id] for note in notes],
+                documents=[note.content or "" for note in notes],
+                metadatas=[{"user_id": note.user_id} for note in notes]
+            )
 
     def get_full_notes(self, user_id: int) -> List[NoteVS]:
-        store = self._get_store(self.full_notes_dir, "full_notes")
+        store = self._get_store(self.full_notes_dir, self._full_collection(user_id))
         
-        data = store.get(where={"user_id": user_id}, include=["embeddings", "documents", "metadatas"])
+        data = store.get(where=self._user_filter(user_id), include=["embeddings", "documents", "metadatas"])
 
         results = []
         
@@ -70,39 +203,117 @@ class VectorStore(IVectorStore):
         return results
 
     # --- VECTORSTORE 2: CHUNKI ---
+    def _chunk_metadata(self, note: NoteVS, position: int, start_index: int, end_index: int) -> dict:
+        return {
+            "parent_note_id": note.id,
+            "chunk_id": position,
+            "user_id": note.user_id,
+            "start_index": start_index,
+            "end_index": end_index
+        }
+
+    @staticmethod
+    def _chunk_from_metadata(metadata: dict, content: str, embedding=None) -> NoteVS:
+        start_index = metadata.get("start_index")
+        end_index = metadata.get("end_index")
+        # Chroma nie przyjmuje None w metadanych, więc brak offsetu zapisujemy jako -1
+        if start_index is None or start_index < 0:
+            start_index = end_index = None
+        return NoteVS(
+            id=int(metadata["parent_note_id"]),
+            user_id=int(metadata["user_id"]),
+            chunk_id=int(metadata["chunk_id"]),
+            content=content,
+            embedding=embedding,
+            start_index=start_index,
+            end_index=end_index
+        )
+
     def upsert_chunked_notes(self, notes: List[NoteVS]):
+        if self.incremental_chunks:
+            self._upsert_chunked_notes_incremental(notes)
+            return
+
+        for user_id, user_notes in self._group_by_user(notes).items():
+            self._replace_user_chunks(user_id, user_notes)
+
+    def _replace_user_chunks(self, user_id: int, notes: List[NoteVS]):
         try:
-            store = self._get_store(self.chunked_notes_dir, "note_chunks")
+            store = self._get_store(self.chunked_notes_dir, self._chunk_collection(user_id))
             
             docs = []
             chunk_ids = []
             for note in notes:
-                try:
-                    store.delete(where={"parent_note_id": note.id})
-                except Exception as e:
-                    raise
-            
-            for note in notes:
-                chunks = self.splitter.split_text(note.content or "")
-                for i, chunk_text in enumerate(chunks):
+                chunks = split_with_offsets(self.splitter, note.content or "")
+                for i, (chunk_text, start_index, end_index) in enumerate(chunks):
                     docs.append(Document(
                         page_content=chunk_text,
-                        metadata={
-                            "parent_note_id": note.id,
-                            "chunk_id": i,
-                            "user_id": note.user_id
-                        }
+                        metadata=self._chunk_metadata(note, i, start_index, end_index)
                     ))
-                    chunk_ids.append(f"{note.id}_chunk_{i}")
+                    chunk_ids.append(chunk_id_for(note.id, i))
+
+            with self._write_lock:
+                for note in notes:
+                    try:
+                        store.delete(where={"parent_note_id": note.id})
+                    except Exception as e:
+                        raise
 
-            if docs:
-                store.add_documents(documents=docs, ids=chunk_ids)
+                if docs:
+                    store.add_documents(documents=docs, ids=chunk_ids)
         except Exception as e:
             raise
 
+    def _upsert_chunked_notes_incremental(self, notes: List[NoteVS]):
+        """Re-embed only chunks whose text changed; keep IDs of the rest."""
+        for user_id, user_notes in self._group_by_user(notes).items():
+            self._diff_user_chunks(user_id, user_notes)
+
+    def _diff_user_chunks(self, user_id: int, notes: List[NoteVS]):
+        store = self._get_store(self.chunked_notes_dir, self._chunk_collection(user_id))
+        collection = self.registry.get_collection(self.chunked_notes_dir, self._chunk_collection(user_id))
+
+        with self._write_lock:
+            delete_ids = []
+            add_docs = []
+            add_ids = []
+            update_ids = []
+            update_metadatas = []
+
+            for note in notes:
+                stored = collection.get(
+                    where={"parent_note_id": note.id},
+                    include=["documents", "metadatas"]
+                )
+                existing = dict(zip(stored["ids"], stored["documents"]))
+                stored_metadata = dict(zip(stored["ids"], stored["metadatas"]))
+
+                chunks = split_with_offsets(self.splitter, note.content or "")
+                plan = plan_chunk_update(note.id, existing, [text for text, _, _ in chunks])
+
+                delete_ids.extend(plan.delete)
+                for chunk_id, position in plan.keep.items():
+                    metadata = self._chunk_metadata(note, position, *chunks[position][1:])
+                    if stored_metadata.get(chunk_id) != metadata:
+                        update_ids.append(chunk_id)
+                        update_metadatas.append(metadata)
+                for chunk_id, position, text in plan.add:
+                    add_ids.append(chunk_id)
+                    add_docs.append(Document(
+                        page_content=text,
+                        metadata=self._chunk_metadata(note, position, *chunks[position][1:])
+                    ))
+
+            if delete_ids:
+                collection.delete(ids=delete_ids)
+            if update_ids:
+                collection.update(ids=update_ids, metadatas=update_metadatas)
+            if add_docs:
+                store.add_documents(documents=add_docs, ids=add_ids)
+
     def get_chunked_notes(self, user_id: int) -> List[NoteVS]:
-        store = self._get_store(self.chunked_notes_dir, "note_chunks")
-        data = store.get(where={"user_id": user_id}, include=["embeddings", "documents", "metadatas"])
+        store = self._get_store(self.chunked_notes_dir, self._chunk_collection(user_id))
+        data = store.get(where=self._user_filter(user_id), include=["embeddings", "documents", "metadatas"])
 
         results = []
         ids = data.get("ids", [])
@@ -111,22 +322,20 @@ class VectorStore(IVectorStore):
         metadatas = data.get("metadatas", [])
 
         for i in range(len(ids)):
-            results.append(NoteVS(
-                id=int(metadatas[i]["parent_note_id"]),
-                user_id=int(metadatas[i]["user_id"]),
-                chunk_id=int(metadatas[i]["chunk_id"]),
-                content=documents[i],
-                embedding=embeddings[i] if embeddings else None
+            results.append(self._chunk_from_metadata(
+                metadatas[i],
+                documents[i],
+                embeddings[i] if len(embeddings) else None
             ))
         return results
 
     def retrieve_chunks(self, query: str, user_id: int, k: int = 10, threshold: float = 0.7) -> List[Tuple[NoteVS, float]]:
-        store = self._get_store(self.chunked_notes_dir, "note_chunks")
+        store = self._get_store(self.chunked_notes_dir, self._chunk_collection(user_id))
         
         results = store.similarity_search_with_relevance_scores(
             query=f"query: {query}",
             k=k,
-            filter={"user_id": user_id}
+            filter=self._user_filter(user_id)
         )
         
         best_chunks_map = {}
@@ -138,30 +347,110 @@ class VectorStore(IVectorStore):
             note_id = int(doc.metadata["parent_note_id"])
             
             if note_id not in best_chunks_map or score > best_chunks_map[note_id][1]:
-                best_chunks_map[note_id] = (NoteVS(
-                    id=note_id,
-                    user_id=int(doc.metadata["user_id"]),
-                    chunk_id=int(doc.metadata["chunk_id"]),
-                    content=doc.page_content,
-                    embedding=None
-                ), score)
+                best_chunks_map[note_id] = (self._chunk_from_metadata(doc.metadata, doc.page_content), score)
 
         sorted_results = sorted(best_chunks_map.values(), key=lambda x: x[1], reverse=True)
     
         return sorted_results
 
-    def delete_note(self, note_id: int):
-        try:
-            full_store = self._get_store(self.full_notes_dir, "full_notes")
-            try:
-                full_store.delete(ids=[str(note_id)])
-            except Exception as e:
-                raise
-            
-            chunk_store = self._get_store(self.chunked_notes_dir, "note_chunks")
-            try:
-                chunk_store.delete(where={"parent_note_id": note_id})
-            except Exception as e:
-                raise
-        except Exception as e:
-            raise
\ No newline at end of file
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries:
+            return embed_queries(queries)
+        return self.embeddings.embed_documents(queries)
+
+    def retrieve_chunks_many(
+        self,
+        queries: List[str],
+        user_id: int,
+        k: int = 10,
+        threshold: float = 0.7
+    ) -> List[List[Tuple[NoteVS, float]]]:
+        if not queries:
+            return []
+
+        collection = self.registry.get_collection(self.chunked_notes_dir, self._chunk_collection(user_id))
+
+        # Jeden batchowy forward pass i jedno zapytanie do indeksu dla wszystkich pytań
+        vectors = self._embed_queries([f"query: {query}" for query in queries])
+        data = collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            where=self._user_filter(user_id),
+            include=["documents", "metadatas", "distances"]
+        )
+        # Ta sama skala co similarity_search_with_relevance_scores, żeby progi były zgodne
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+
+        results = []
+        for documents, metadatas, distances in zip(data["documents"], data["metadatas"], data["distances"]):
+            best_chunks_map = {}
+            for document, metadata, distance in zip(documents, metadatas, distances):
+                score = relevance_from_distance(distance, space)
+                if score < threshold:
+                    continue
+                note_id = int(metadata["parent_note_id"])
+                if note_id not in best_chunks_map or score > best_chunks_map[note_id][1]:
+                    best_chunks_map[note_id] = (self._chunk_from_metadata(metadata, document), score)
+            results.append(sorted(best_chunks_map.values(), key=lambda x: x[1], reverse=True))
+        return results
+
+    def delete_note(self, note_id: int, user_id: Optional[int] = None):
+        if user_id is not None:
+            full_names = [self._full_collection(user_id)]
+            chunk_names = [self._chunk_collection(user_id)]
+        else:
+            # Bez właściciela musimy przejrzeć wszystkie partycje
+            full_names = self._existing_collections(self.full_notes_dir, FULL_NOTES_COLLECTION)
+            chunk_names = self._existing_collections(self.chunked_notes_dir, CHUNKS_COLLECTION)
+
+        with self._write_lock:
+            for name in full_names:
+                self._get_store(self.full_notes_dir, name).delete(ids=[str(note_id)])
+            for name in chunk_names:
+                self._get_store(self.chunked_notes_dir, name).delete(where={"parent_note_id": note_id})
+
+    def backfill_chunk_offsets(self, page_size: int = 1000) -> int:
+        """Add start/end offsets to chunks stored before they were recorded.
+
+        Offsets are located in the full-note text kept in the full-note
+        collection, walking each note's chunks in order. Returns the number
+        of chunks updated.
+        """
+        updated = 0
+        for name in self._existing_collections(self.chunked_notes_dir, CHUNKS_COLLECTION):
+            collection = self.registry.get_collection(self.chunked_notes_dir, name)
+            full_name = name.replace(CHUNKS_COLLECTION, FULL_NOTES_COLLECTION, 1)
+            full_collection = self.registry.get_collection(self.full_notes_dir, full_name)
+
+            missing = {}
+            offset = 0
+            while True:
+                page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                if not page["ids"]:
+                    break
+                for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    if "start_index" not in metadata:
+                        missing.setdefault(int(metadata["parent_note_id"]), []).append((chunk_id, document, metadata))
+                offset += len(page["ids"])
+
+            note_ids = list(missing)
+            for start in range(0, len(note_ids), page_size):
+                batch = note_ids[start:start + page_size]
+                parents = full_collection.get(ids=[str(note_id) for note_id in batch], include=["documents"])
+                texts = {int(note_id): text for note_id, text in zip(parents["ids"], parents["documents"])}
+
+                update_ids = []
+                update_metadatas = []
+                for note_id in batch:
+                    chunks = sorted(missing[note_id], key=lambda item: item[2]["chunk_id"])
+                    positions = locate_chunks(texts.get(note_id, ""), [document for _, document, _ in chunks])
+                    for (chunk_id, _, metadata), (start_index, end_index) in zip(chunks, positions):
+                        update_ids.append(chunk_id)
+                        update_metadatas.append({**metadata, "start_index": start_index, "end_index": end_index})
+
+                if update_ids:
+                    with self._write_lock:
+                        collection.update(ids=update_ids, metadatas=update_metadatas)
+                    updated += len(update_ids)
+        return updated
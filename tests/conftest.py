@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+from app.infrastructure.database.models import Base  # noqa: E402
+from app.infrastructure.database.repository import AppRepository  # noqa: E402
+
+
+@pytest.fixture
+def repository():
+    """AppRepository over a fresh in-memory SQLite database."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return AppRepository(sessionmaker(bind=engine))
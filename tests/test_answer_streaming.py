@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from app.core.services.answer_streaming import CitationRenumberer, TitleLineParser
+
+SOURCES = {"3": {"note_id": 30}, "7": {"note_id": 70}}
+RESPONSE = "Title: **Cats**\n\nCats sleep a lot [7]. They purr [3][7] and ignore [9] you [3]."
+EXPECTED = "Cats sleep a lot [1]. They purr [2][1] and ignore  you [2]."
+
+
+def run(pieces):
+    parser, renumberer = TitleLineParser(), CitationRenumberer(SOURCES)
+    text = "".join(renumberer.feed(parser.feed(piece)) for piece in pieces)
+    text += renumberer.feed(parser.flush()) + renumberer.flush()
+    return parser.title, text, renumberer.references
+
+
+def split(text, cuts):
+    bounds = [0, *sorted(cuts), len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("pieces", [
+    [RESPONSE],
+    # The blank line after the title arrives as its own piece
+    ["Title: **Cats**\n", "\n", "Cats sleep a lot [", "7]. They purr [3][7] and ignore [9] you [3]."],
+    ["Title: **Cats**\n", "\nCats sleep a lot [7", "]. They purr [3][7] and ignore [9] you [3", "]."],
+    list(RESPONSE),
+])
+def test_title_and_citations_survive_chunk_boundaries(pieces):
+    title, text, references = run(pieces)
+    assert title == "Cats"
+    assert text == EXPECTED
+    assert references == {"1": {"note_id": 70}, "2": {"note_id": 30}}
+
+
+def test_random_splits_match_unsplit_output():
+    expected = run([RESPONSE])
+    rng = random.Random(0)
+    for _ in range(200):
+        cuts = rng.sample(range(1, len(RESPONSE)), rng.randint(1, 12))
+        assert run(split(RESPONSE, cuts)) == expected
+
+
+def test_answer_without_title_line_is_kept():
+    title, text, _ = run(["Cats sleep", " a lot [3].\nMore."])
+    assert title is None
+    assert text == "Cats sleep a lot [1].\nMore."
+
+
+def test_trailing_partial_citation_is_flushed():
+    assert run(["Title: Cats\nSee [", "12"]) == ("Cats", "See [12", {})
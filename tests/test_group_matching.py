@@ -0,0 +1,73 @@
+from app.core.services.group_matching import diff_grouping, match_clusters
+
+
+def note_groups_of(groups, ungrouped=()):
+    note_groups = {note_id: group_id for group_id, note_ids in groups.items() for note_id in note_ids}
+    note_groups.update({note_id: None for note_id in ungrouped})
+    return note_groups
+
+
+def test_stable_regrouping_writes_nothing():
+    groups = {10: {1, 2, 3}, 20: {4, 5}}
+    # Cluster IDs are renumbered between fits; only membership counts
+    clusters = {7: {4, 5}, 3: {1, 2, 3}}
+
+    diff = diff_grouping(clusters, groups, note_groups_of(groups))
+
+    assert diff.matched == {3: 10, 7: 20}
+    assert diff.created == []
+    assert diff.retired == []
+    assert diff.reassigned == {}
+
+
+def test_split_keeps_the_larger_part_and_creates_a_group_for_the_rest():
+    groups = {10: {1, 2, 3, 4, 5, 6}}
+    clusters = {0: {1, 2, 3, 4}, 1: {5, 6}}
+
+    diff = diff_grouping(clusters, groups, note_groups_of(groups))
+
+    assert diff.matched == {0: 10}
+    assert diff.created == [1]
+    assert diff.retired == []
+    # Members of the new group are assigned once it exists
+    assert diff.reassigned == {}
+
+
+def test_merge_continues_one_group_and_retires_the_other():
+    groups = {10: {1, 2, 3, 4}, 20: {5, 6}}
+    clusters = {0: {1, 2, 3, 4, 5, 6}}
+
+    diff = diff_grouping(clusters, groups, note_groups_of(groups))
+
+    assert diff.matched == {0: 10}
+    assert diff.created == []
+    assert diff.retired == [20]
+    assert diff.reassigned == {5: 10, 6: 10}
+
+
+def test_cluster_below_min_jaccard_gets_a_new_group():
+    groups = {10: set(range(1, 11))}
+    clusters = {0: {1, 2, 11, 12}}
+    note_groups = note_groups_of(groups, ungrouped={11, 12})
+
+    assert match_clusters(clusters, groups, min_jaccard=0.3) == {}
+    assert match_clusters(clusters, groups, min_jaccard=0.1) == {0: 10}
+
+    diff = diff_grouping(clusters, groups, note_groups, min_jaccard=0.3)
+
+    assert diff.matched == {}
+    assert diff.created == [0]
+    assert diff.retired == [10]
+    # Notes left out of every cluster become ungrouped
+    assert diff.reassigned == {note_id: None for note_id in range(3, 11)}
+
+
+def test_empty_and_abandoned_groups_are_retired():
+    groups = {10: {1, 2}, 20: {3}, 30: set()}
+    clusters = {0: {1, 2}}
+
+    diff = diff_grouping(clusters, groups, note_groups_of(groups))
+
+    assert diff.matched == {0: 10}
+    assert diff.retired == [20, 30]
+    assert diff.reassigned == {3: None}
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from app.core.jobs import JobStatus, JobWorker
+from app.infrastructure.jobs.sqlite_queue import SqliteJobQueue
+
+
+def test_enqueue_wakes_idle_worker(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / "jobs.db"))
+    ran = threading.Event()
+    # Without notify the job would wait for the next poll, a minute away
+    worker = JobWorker(queue, {"noop": lambda job: ran.set()}, poll_interval=60)
+    worker.start()
+    try:
+        time.sleep(0.2)
+        queue.enqueue("noop", user_id=1)
+        assert ran.wait(5)
+    finally:
+        worker.stop()
+        queue.close()
+
+
+def test_prune_removes_only_old_finished_jobs(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / "jobs.db"))
+    finished = queue.enqueue("noop", user_id=1)
+    pending = queue.enqueue("noop", user_id=1, delay_seconds=3600)
+    claimed = queue.claim()
+    queue.complete(claimed.id, claimed.attempts)
+
+    assert queue.prune(older_than_seconds=3600) == 0
+    assert queue.prune(older_than_seconds=-1) == 1
+    assert queue.get(finished.id) is None
+    assert queue.get(pending.id).status == JobStatus.PENDING
+    queue.close()
+
+
+def test_stale_attempt_cannot_overwrite_reclaimed_job(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / "jobs.db"), lease_seconds=-1)
+    job = queue.enqueue("noop", user_id=1)
+    stale = queue.claim()
+    # The lease is already over, so the job is claimed again
+    current = queue.claim()
+    assert (stale.attempts, current.attempts) == (1, 2)
+
+    assert not queue.complete(job.id, stale.attempts)
+    assert not queue.fail(job.id, stale.attempts, "late failure")
+    assert queue.get(job.id).status == JobStatus.RUNNING
+    assert queue.complete(job.id, current.attempts)
+    assert queue.get(job.id).status == JobStatus.SUCCEEDED
+    queue.close()
@@ -0,0 +1,121 @@
+import http.client
+import json
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+uvicorn = pytest.importorskip("uvicorn")
+fastapi = pytest.importorskip("fastapi")
+
+from app.api.note_import import IMPORT_BATCH_SIZE, stream_note_import
+
+
+def _make_app(imported, finished):
+    app = fastapi.FastAPI()
+    next_id = iter(range(1, 10**9))
+
+    def import_batch(notes_data):
+        imported.extend(notes_data)
+        created = [SimpleNamespace(id=next(next_id)) for note in notes_data if note["title"] != "bad"]
+        failed = [
+            {"index": i, "title": note["title"], "error": "rejected"}
+            for i, note in enumerate(notes_data) if note["title"] == "bad"
+        ]
+        return created, failed
+
+    def finish_import():
+        finished.append(True)
+        return SimpleNamespace(id=42)
+
+    @app.post("/import")
+    async def import_notes(request: fastapi.Request):
+        return stream_note_import(request, import_batch, finish_import)
+
+    return app
+
+
+@pytest.fixture
+def server():
+    imported, finished = [], []
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(_make_app(imported, finished), log_level="warning", lifespan="off")
+    uv_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uv_server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not uv_server.started:
+        assert time.time() < deadline, "uvicorn did not start"
+        time.sleep(0.01)
+    yield sock.getsockname()[1], imported, finished
+    uv_server.should_exit = True
+    thread.join(timeout=10)
+
+
+def _post_chunked(port, lines):
+    def body():
+        # Kawałki nie pokrywają się z granicami linii
+        payload = "".join(lines).encode()
+        for start in range(0, len(payload), 997):
+            yield payload[start:start + 997]
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(
+        "POST", "/import", body=body(), encode_chunked=True,
+        headers={"Content-Type": "application/x-ndjson", "Transfer-Encoding": "chunked"}
+    )
+    response = conn.getresponse()
+    assert response.status == 200
+    events = [json.loads(line) for line in response.read().decode().splitlines()]
+    conn.close()
+    return events
+
+
+def test_import_reads_whole_chunked_body_through_uvicorn(server):
+    port, imported, finished = server
+    lines = [json.dumps({"title": f"note {i}", "content": "x" * 50}) + "\n" for i in range(2000)]
+
+    events = _post_chunked(port, lines)
+
+    assert len(imported) == 2000
+    assert events[-1] == {"done": True, "received": 2000, "created": 2000, "failed": 0, "recluster_job_id": 42}
+    batches = events[:-1]
+    assert [event["batch"] for event in batches] == list(range(1, len(batches) + 1))
+    assert sum(len(event["created_ids"]) for event in batches) == 2000
+    assert all(len(event["created_ids"]) <= IMPORT_BATCH_SIZE for event in batches)
+    assert finished == [True]
+
+
+def test_import_reports_failures_by_line_index(server):
+    port, imported, _ = server
+    lines = [
+        json.dumps({"title": "ok", "content": "a"}) + "\n",
+        "not json\n",
+        "\n",
+        json.dumps({"title": "bad", "content": "b"}) + "\n",
+        json.dumps({"title": "ok", "content": "c"}),
+    ]
+
+    events = _post_chunked(port, lines)
+
+    failed = [failure for event in events[:-1] for failure in event["failed"]]
+    assert sorted(failure["index"] for failure in failed) == [1, 2]
+    assert events[-1]["received"] == 4
+    assert events[-1]["created"] == 2
+    assert events[-1]["failed"] == 2
+
+
+def test_invalid_lines_are_flushed_in_bounded_batches(server):
+    port, imported, _ = server
+    lines = ["not json\n"] * (2 * IMPORT_BATCH_SIZE + 10) + [json.dumps({"title": "ok", "content": "a"}) + "\n"]
+
+    events = _post_chunked(port, lines)
+
+    batches = events[:-1]
+    assert len(batches) == 3
+    assert all(len(event["failed"]) + len(event["created_ids"]) <= IMPORT_BATCH_SIZE for event in batches)
+    assert events[-1]["failed"] == 2 * IMPORT_BATCH_SIZE + 10
+    assert len(imported) == 1
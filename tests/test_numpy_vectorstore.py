@@ -0,0 +1,65 @@
+import math
+import os
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.core.domain.vectorstore import NoteVS
+from app.infrastructure.vectorstore.numpy_vectorstore import NumpyVectorStore
+
+VECTORS = {
+    "alpha": [1.0, 0.0, 0.0],
+    "beta": [0.0, 1.0, 0.0],
+    "alpha beta": [1.0, 1.0, 0.0],
+}
+
+
+class KeywordEmbeddings(Embeddings):
+    def _embed(self, text: str):
+        return VECTORS[text.removeprefix("query: ")]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def make_store(path, **kwargs):
+    return NumpyVectorStore(KeywordEmbeddings(), str(path), **kwargs)
+
+
+def notes(user_id, *contents):
+    return [NoteVS(id=i + 1, user_id=user_id, chunk_id=None, content=text, embedding=None) for i, text in enumerate(contents)]
+
+
+def test_scores_use_chroma_l2_relevance(tmp_path):
+    store = make_store(tmp_path)
+    store.upsert_chunked_notes(notes(1, "alpha", "alpha beta"))
+
+    hits = store.retrieve_chunks("alpha", user_id=1, threshold=-10)
+
+    cosine = 1 / math.sqrt(2)
+    assert [note.id for note, _ in hits] == [1, 2]
+    assert hits[0][1] == pytest.approx(1.0)
+    assert hits[1][1] == pytest.approx(1 - (2 - 2 * cosine) / math.sqrt(2), abs=1e-6)
+    assert store.retrieve_chunks_many(["alpha"], user_id=1, threshold=-10) == [hits]
+
+
+def test_save_writes_one_file_and_reloads(tmp_path):
+    store = make_store(tmp_path)
+    store.upsert_chunked_notes(notes(1, "alpha", "beta"))
+
+    assert sorted(os.listdir(tmp_path / "chunks")) == ["user_1.npz"]
+    reloaded = make_store(tmp_path)
+    assert [(note.id, note.content) for note in reloaded.get_chunked_notes(1)] == [(1, "alpha"), (2, "beta")]
+
+
+def test_cache_evicts_least_recently_used_users(tmp_path):
+    store = make_store(tmp_path, max_cached_users=2)
+    for user_id in (1, 2, 3):
+        store.upsert_chunked_notes(notes(user_id, "alpha"))
+
+    assert list(store._chunks) == [2, 3]
+    assert [note.content for note in store.get_chunked_notes(1)] == ["alpha"]
+    assert list(store._chunks) == [3, 1]
@@ -0,0 +1,47 @@
+import pytest
+
+from app.core.domain.database import AnswerDB, NoteDB, UserDB
+from app.core.services.answer_service import AnswerService
+from app.core.services.note_service import NoteService
+
+
+def _follow(get_page, limit):
+    pages, cursor = [], None
+    for _ in range(10):
+        items, cursor = get_page(limit, cursor)
+        pages.append([item.id for item in items])
+        if cursor is None:
+            return pages
+    pytest.fail("cursor never ran out")
+
+
+def test_answer_pages_advance_within_one_second(repository):
+    user_id = repository.create_user(UserDB(id=None, name="u", password_hash="x"))
+    for i in range(5):
+        repository.create_answer(AnswerDB(
+            id=None, user_id=user_id, question=f"q{i}", answer_text="a", title="t", references={}
+        ))
+    service = AnswerService(repository, vector_store=None, llm=None)
+
+    pages = _follow(lambda limit, cursor: service.get_answers_page(user_id, limit, cursor), 2)
+
+    assert pages == [[5, 4], [3, 2], [1]]
+
+
+def test_note_pages_with_projection(repository):
+    user_id = repository.create_user(UserDB(id=None, name="u", password_hash="x"))
+    for i in range(5):
+        repository.create_note(NoteDB(id=None, title=f"n{i}", content="long content", user_id=user_id))
+    service = NoteService(repository, vector_store=None, clusterizer=None)
+
+    pages = _follow(lambda limit, cursor: service.get_notes_page(user_id, limit, cursor, ["title"]), 2)
+    notes, _ = service.get_notes_page(user_id, 1, None, ["title"])
+
+    assert pages == [[1, 2], [3, 4], [5]]
+    assert notes[0].title == "n0" and notes[0].content is None
+
+
+def test_invalid_cursor_is_rejected(repository):
+    service = AnswerService(repository, vector_store=None, llm=None)
+    with pytest.raises(ValueError):
+        service.get_answers_page(1, 2, "not-a-cursor")
@@ -0,0 +1,28 @@
+import pytest
+from pydantic import ValidationError
+
+from app.api.schemas.note import NoteCreate, NoteUpdate
+from app.core.domain.database import NoteDB, UserDB
+
+
+def test_bulk_create_accepts_empty_title_like_single_create(repository):
+    user_id = repository.create_user(UserDB(id=None, name="u", password_hash="x"))
+    single_id = repository.create_note(NoteDB(id=None, title="", content="a", user_id=user_id))
+
+    created, failed = repository.create_notes_bulk([
+        NoteDB(id=None, title="", content="b", user_id=user_id),
+        NoteDB(id=None, title=None, content="c", user_id=user_id),
+        NoteDB(id=None, title="x" * 101, content="d", user_id=user_id),
+    ])
+
+    assert repository.get_note(single_id).title == ""
+    assert [(i, note.title) for i, note in created] == [(0, "")]
+    assert failed == [(1, "Title is required"), (2, "Title longer than 100 characters")]
+
+
+def test_note_schemas_reject_titles_the_repository_rejects():
+    NoteCreate(title="x" * 100, content="a")
+    with pytest.raises(ValidationError):
+        NoteCreate(title="x" * 101, content="a")
+    with pytest.raises(ValidationError):
+        NoteUpdate(title="x" * 101)